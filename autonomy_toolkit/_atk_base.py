@@ -5,19 +5,55 @@ The main parser will have a few commands, such as verbosity or a help menu.
 For the most part, the entrypoint will be used to access subparsers,
 such as `db` to interact with the ATK database.
 """
-# Command imports
-import autonomy_toolkit.dev as dev
-
-# Utility imports
-from autonomy_toolkit.utils.logger import set_verbosity
-
 # General imports
 import argparse
+import importlib
+from typing import List, Optional
+
+# Subcommands and the modules that implement them
+# Each module must have an `_init(subparser)` method. Modules are only imported when their subcommand is used.
+_SUBCOMMANDS = {
+    "dev": ("autonomy_toolkit.dev", "Work with the ATK development environment"),
+    "batch": (
+        "autonomy_toolkit.batch",
+        "Run several `atk dev` invocations from one process",
+    ),
+    "daemon": (
+        "autonomy_toolkit.daemon",
+        "Manage a long-lived process that runs `atk` commands with warm caches",
+    ),
+    "multi": (
+        "autonomy_toolkit.multi",
+        "Run `atk dev` in many projects at once",
+    ),
+    "build-cache": (
+        "autonomy_toolkit.build_cache",
+        "Report the hit rate of the shared build cache or prune it",
+    ),
+}
+
+
+# The options of `atk` that take a value, which must be skipped when looking for the subcommand
+_OPTIONS_WITH_VALUES = ["--log-format"]
+
+
+def _get_subcommand(argv: List[str]) -> Optional[str]:
+    """Get the subcommand that is used, i.e. the first positional argument, without parsing the arguments."""
+    argv = iter(argv)
+    for arg in argv:
+        if arg in _OPTIONS_WITH_VALUES:
+            next(argv, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
 
 
-def _init():
+def _init(argv: Optional[List[str]] = None):
     """
     The root entrypoint for the ATK CLI is `atk`. This the first command you need to access the CLI. All subsequent subcommands succeed `atk`.
+
+    Args:
+        argv (Optional[List[str]]): The command line arguments. If passed, only the module of the subcommand that is used is imported. Otherwise, all subcommands are initialized.
     """
     # Main entrypoint and initialize the cmd method
     # set_defaults specifies a method that is called if that parser is used
@@ -38,6 +74,18 @@ def _init():
         help="Level of verbosity",
         default=0,
     )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        help="The format of the logs. `json` writes one JSON object per line, which is cheaper and meant for automation. Defaults to $ATK_LOG_FORMAT or `text`.",
+        default=None,
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="Write the logs from a background thread, such that a slow consumer of stderr doesn't stall atk. Defaults to whether $ATK_LOG_QUEUE is set.",
+        default=None,
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -46,22 +94,59 @@ def _init():
     parser.set_defaults(cmd=lambda x: x)
 
     # Initialize the subparsers
+    used = _get_subcommand(argv) if argv is not None else None
     subparsers = parser.add_subparsers()
-    dev._init(
-        subparsers.add_parser(
-            "dev", description="Work with the ATK development environment"
+    for name, (module, description) in _SUBCOMMANDS.items():
+        subparser = subparsers.add_parser(
+            name, description=description, help=description
         )
-    )
+        if argv is None or name == used:
+            importlib.import_module(module)._init(subparser)
 
     return parser
 
 
+def _is_informational(argv: List[str]) -> bool:
+    """Whether only the version or a help message is printed, which is answered without `atk daemon`."""
+    for arg in argv:
+        if arg == "--":
+            break
+        if arg in ("-h", "--help", "--version"):
+            return True
+    return False
+
+
 def _main():
+    import sys
+    import signal
+
+    # Run the command in `atk daemon`, if it's running
+    if not _is_informational(sys.argv[1:]):
+        from autonomy_toolkit.utils.daemon_client import forward_to_daemon
+
+        returncode = forward_to_daemon(sys.argv[1:])
+        if returncode is not None:
+            sys.exit(returncode)
+
+    # Exit if ctrl+c is recorded in the terminal window
+    from autonomy_toolkit import _signal_handler
+
+    signal.signal(signal.SIGINT, _signal_handler)
+
+    _run(sys.argv[1:])
+
+
+def _run(argv: List[str]):
+    """Parse the command line arguments and run the used subcommand.
+
+    Args:
+        argv (List[str]): The command line arguments, without the program name.
+    """
     # Create the parser
-    parser = _init()
+    parser = _init(argv)
 
     # Parse the arguments and update logging
-    args, unknown = parser.parse_known_args()
+    args, unknown = parser.parse_known_args(argv)
     args._unknown_args = unknown
 
     # Return version if desired and exit
@@ -71,7 +156,17 @@ def _main():
         print(__version__)
         return
 
+    from autonomy_toolkit.utils.logger import (
+        configure_logging,
+        flush_logging,
+        set_verbosity,
+    )
+
+    configure_logging(args.log_format, args.log_queue)
     set_verbosity(args.verbosity)
 
     # Calls the cmd for the used subparser
-    args.cmd(args)
+    try:
+        return args.cmd(args)
+    finally:
+        flush_logging()
@@ -0,0 +1,228 @@
+# Imports from atk
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+import argparse
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Set
+
+
+@dataclass
+class _Step:
+    index: int
+    line: str
+    args: argparse.Namespace
+    services: List[str] = field(default_factory=list)
+    # The services and the services they depend on, see `_set_closures`
+    closure: Set[str] = field(default_factory=set)
+    succeeded: Optional[bool] = None
+    duration: float = 0.0
+
+
+def _parse_steps(lines: List[str], dry_run: bool) -> Optional[List[_Step]]:
+    import autonomy_toolkit.dev as dev
+
+    parser = argparse.ArgumentParser(prog="atk dev", add_help=False)
+    dev._init(parser)
+
+    steps = []
+    for line in lines:
+        tokens = shlex.split(line, comments=True)
+        if tokens[:1] == ["atk"]:
+            tokens = tokens[1:]
+        if tokens[:1] == ["dev"]:
+            tokens = tokens[1:]
+        if not tokens:
+            continue
+
+        try:
+            args, unknown = parser.parse_known_args(tokens)
+        except SystemExit:
+            LOGGER.fatal("Failed to parse step '%s'.", line.strip())
+            return None
+        args._unknown_args = unknown
+        args.dry_run = dry_run
+
+        # Watching never returns and profiles are only reported for `atk dev` itself
+        if args.watch or args.profile:
+            LOGGER.fatal(
+                "'--watch' and '--profile' can't be used in a batch step ('%s').",
+                line.strip(),
+            )
+            return None
+        steps.append(_Step(len(steps) + 1, line.strip(), args, list(args.services)))
+    return steps
+
+
+def _config_key(args: argparse.Namespace) -> Any:
+    # Steps that share these arguments can share the resolved config
+    return (
+        args.filename_override,
+        tuple(args.optionals),
+        tuple(args.compose_opts + args._unknown_args),
+        tuple(args.compose_args),
+        args.backend,
+        args.no_config_cache,
+        args.build_cache,
+        args.build_cache_max_size,
+        args.no_build_cache,
+    )
+
+
+def _set_closures(steps: List[_Step], clients: dict):
+    from autonomy_toolkit.utils.dependencies import get_closure
+
+    # `docker compose` creates (or recreates) the dependencies of the services, too
+    for step in steps:
+        config = clients[_config_key(step.args)].config.config
+        step.closure = set(step.services) | set(get_closure(config, step.services))
+
+
+def _conflicts(step: _Step, other: _Step) -> bool:
+    # Steps can't run concurrently if they touch the same containers or if either needs the terminal
+    return bool(step.closure & other.closure) or any(
+        s.args.attach or s.args.command is not None for s in (step, other)
+    )
+
+
+def _run_step(client, step: _Step) -> _Step:
+    import autonomy_toolkit.dev as dev
+
+    LOGGER.info("Running step %s: '%s'...", step.index, step.line)
+    start = time.perf_counter()
+    step_client = client.with_services(
+        step.services,
+        jobs=step.args.jobs,
+        force_build=step.args.force_build,
+        pull_jobs=step.args.pull_jobs,
+    )
+    step.succeeded = dev._run_cmds(step_client, step.args)
+    step.duration = time.perf_counter() - start
+    LOGGER.info("Finished step %s in %.2fs.", step.index, step.duration)
+    return step
+
+
+def _get_result(future, step: _Step) -> bool:
+    # A step that raised is reported as failed, like any other failed step
+    try:
+        return future.result().succeeded
+    except Exception as e:
+        LOGGER.error("Step %s ('%s') failed: %s", step.index, step.line, e)
+        step.succeeded = False
+        return False
+
+
+def _run_batch(args):
+    LOGGER.info("Running 'batch' entrypoint...")
+    import autonomy_toolkit.dev as dev
+
+    # Read the steps
+    if args.file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        try:
+            with open(args.file, "r") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            LOGGER.fatal("Failed to read '%s': %s", args.file, e)
+            return False
+    steps = _parse_steps(lines, args.dry_run)
+    if steps is None:
+        return False
+
+    # Resolve the config once per distinct set of optionals (and other config affecting arguments)
+    # Each set gets its own compose file (see `dev._load`), as the steps may run concurrently
+    groups = {}
+    for step in steps:
+        groups.setdefault(_config_key(step.args), []).append(step)
+
+    clients = {}
+    for key, group in groups.items():
+        start = time.perf_counter()
+        load_args = argparse.Namespace(**vars(group[0].args))
+        load_args.services = list(
+            dict.fromkeys(s for step in group for s in step.services)
+        )
+        load_args.compose_opts = list(load_args.compose_opts)
+        client = dev._load(load_args)
+        if client is None:
+            return False
+        clients[key] = client
+        LOGGER.info(
+            "Resolved the config for %s step(s) in %.2fs.",
+            len(group),
+            time.perf_counter() - start,
+        )
+
+    # Run the steps in order. Consecutive steps whose services (including the services they depend on) are
+    # disjoint run concurrently. Steps that attach to a container need the terminal, so they run alone.
+    _set_closures(steps, clients)
+    failed = False
+    with ThreadPoolExecutor(max_workers=max(1, args.max_parallel)) as executor:
+        running = {}
+        for step in steps:
+            while running and (
+                len(running) >= args.max_parallel
+                or any(_conflicts(step, s) for s in running.values())
+            ):
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    failed |= not _get_result(future, running.pop(future))
+            if failed and not args.keep_going:
+                break
+
+            client = clients[_config_key(step.args)]
+            running[executor.submit(_run_step, client, step)] = step
+
+        for future, step in running.items():
+            failed |= not _get_result(future, step)
+
+    # Remove the compose files that were only generated for this batch, unless another process uses them
+    if len(groups) > 1:
+        from autonomy_toolkit.utils.locks import try_remove
+
+        for client in clients.values():
+            client.config.release_compose_file()
+            try_remove(client.config.compose_file)
+
+    # Print the summary
+    print(f"{'step':>4}  {'result':<8}{'time (s)':>10}  command")
+    for step in steps:
+        result = {True: "ok", False: "FAILED", None: "skipped"}[step.succeeded]
+        print(f"{step.index:>4}  {result:<8}{step.duration:>10.2f}  {step.line}")
+
+    if failed:
+        return False
+
+    LOGGER.info("Finished running 'batch' entrypoint.")
+
+
+def _init(subparser):
+    LOGGER.debug("Initializing 'batch' entrypoint...")
+
+    subparser.add_argument(
+        "file",
+        nargs="?",
+        help="File with one `atk dev` invocation per line (e.g. `dev -s X -u`). The leading `atk` and `dev` are optional and `#` starts a comment. Reads from stdin if `-` or omitted.",
+        default="-",
+    )
+    subparser.add_argument(
+        "-p",
+        "--max-parallel",
+        type=int,
+        help="The maximum number of steps to run concurrently. Only consecutive steps that touch disjoint services run concurrently. Defaults to 4.",
+        default=4,
+    )
+    subparser.add_argument(
+        "-k",
+        "--keep-going",
+        action="store_true",
+        help="Continue running the remaining steps after a step fails.",
+        default=False,
+    )
+
+    subparser.set_defaults(cmd=_run_batch)
@@ -0,0 +1,116 @@
+# Imports from atk
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+import os
+import time
+
+
+def _get_build_cache(args):
+    from autonomy_toolkit.utils.atk_config import ATKConfig
+    from autonomy_toolkit.containers.build_cache import (
+        BuildCache,
+        DEFAULT_MAX_SIZE,
+        get_build_cache,
+        parse_size,
+    )
+
+    # An explicit directory doesn't need an ATK config file
+    if args.dir is not None:
+        max_size = parse_size(args.max_size or DEFAULT_MAX_SIZE)
+        return BuildCache(os.path.abspath(args.dir), max_size)
+
+    config = ATKConfig(args.filename_override, [])
+    cache = get_build_cache(config, max_size=args.max_size)
+    if cache is None:
+        raise ValueError(
+            f"The build cache isn't enabled in '{config.atk_yml_path}'. Set 'x-atk-build-cache' or pass '--dir'."
+        )
+    return cache
+
+
+def _report(cache) -> bool:
+    from autonomy_toolkit.containers.build_cache import format_size
+
+    entries = cache.get_entries()
+    if not entries:
+        print(f"The build cache '{cache.directory}' is empty.")
+        return True
+
+    width = max([len("cache")] + [len(e.key) for e in entries])
+    print(
+        f"{'cache':<{width}}  {'size':>8}  {'last used':<16}  {'builds':>6}  {'steps':>6}  {'cached':>6}  hit rate"
+    )
+    for e in entries:
+        last_used = (
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(e.last_used))
+            if e.last_used
+            else "evicted"
+        )
+        hit_rate = f"{e.hit_rate:.1%}" if e.hit_rate is not None else "-"
+        print(
+            f"{e.key:<{width}}  {format_size(e.size):>8}  {last_used:<16}  {e.builds:>6}  {e.steps:>6}  {e.cached:>6}  {hit_rate}"
+        )
+
+    size = sum(e.size for e in entries)
+    steps = sum(e.steps for e in entries)
+    cached = sum(e.cached for e in entries)
+    hit_rate = f"{cached / steps:.1%}" if steps else "-"
+    print(
+        f"Total: {format_size(size)} of {format_size(cache.max_size)}, {cached} of {steps} build steps cached ({hit_rate})."
+    )
+    return True
+
+
+def _prune(cache) -> bool:
+    from autonomy_toolkit.containers.build_cache import format_size
+
+    evicted = cache.evict()
+    size = sum(e.size for e in cache.get_entries())
+    print(
+        f"Evicted {len(evicted)} cache(s). The build cache is {format_size(size)} of {format_size(cache.max_size)}."
+    )
+    return True
+
+
+def _run_build_cache(args):
+    LOGGER.info("Running 'build-cache' entrypoint...")
+
+    try:
+        cache = _get_build_cache(args)
+    except (FileNotFoundError, ValueError) as e:
+        LOGGER.fatal(e)
+        return False
+
+    action = {"report": _report, "prune": _prune}[args.action]
+    if not action(cache):
+        return False
+
+    LOGGER.info("Finished running 'build-cache' entrypoint.")
+
+
+def _init(subparser):
+    LOGGER.debug("Initializing 'build-cache' entrypoint...")
+
+    subparser.add_argument(
+        "action",
+        choices=["report", "prune"],
+        help="Report the size, last use and hit rate (the fraction of build steps that were cached) of the cache of each service, or evict the least recently used caches until the build cache is no larger than its maximum size.",
+    )
+    subparser.add_argument(
+        "--dir",
+        help="The build cache directory. Defaults to the directory set with `x-atk-build-cache` in the ATK config file.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--max-size",
+        help="The maximum size of the build cache directory (e.g. `20G`), used by `prune`. Defaults to the `max_size` of `x-atk-build-cache` or 10G.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--filename-override",
+        help="Override the default ATK config filename. Will search upwards for file. Defaults to 'atk.yml'",
+        default="atk.yml",
+    )
+
+    subparser.set_defaults(cmd=_run_build_cache)
@@ -0,0 +1,370 @@
+# SPDX-License-Identifier: MIT
+"""
+A build cache on a shared disk, such that builds on ephemeral machines (e.g. CI runners) reuse each other's layers.
+
+If enabled with the ``x-atk-build-cache`` field at the root of the ``atk.yml`` file (or ``atk dev --build-cache``),
+the ``build`` section of each service is given a ``type=local`` cache import (``cache_from``) and export
+(``cache_to``, with ``mode=max``) location in the cache directory:
+
+.. highlight:: yaml
+.. code-block:: yaml
+
+    x-atk-build-cache: /mnt/shared/atk-build-cache
+
+    # or
+    x-atk-build-cache:
+      dir: /mnt/shared/atk-build-cache
+      max_size: 20G
+
+Each service has its own subdirectory, named after the compose project and the service, such that checkouts of the
+same project share it. BuildKit adds the layers of each build to it, so the cache directory is bounded by evicting
+the least recently used subdirectories once it exceeds ``max_size``. Subdirectories that are in use by a build (of
+any process) are never evicted.
+
+The number of build steps and the number of steps BuildKit reported as ``CACHED`` are recorded per subdirectory in
+``.atk-build-cache-stats.json``, such that the hit rate can be reported with ``atk build-cache report``.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.files import expand_variables
+from autonomy_toolkit.utils.locks import file_lock
+from autonomy_toolkit.containers.build_scheduler import get_project_env
+
+# External imports
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+BUILD_CACHE_KEY = "x-atk-build-cache"
+"""The key in the ``atk.yml`` file that enables the build cache."""
+
+DEFAULT_MAX_SIZE = 10 * 1024**3
+"""The default maximum size of the cache directory in bytes."""
+
+STATS_FILE = ".atk-build-cache-stats.json"
+LOCK_FILE = ".atk-build-cache.lock"
+
+# A step of a build, e.g. `#7 [dev 2/3] RUN make`, and a cached step, e.g. `#7 CACHED`
+_STEP_PATTERN = re.compile(r"^#(\d+) \[([^\]]*?)\s*\d+/\d+\]\s*(\S*)")
+_CACHED_PATTERN = re.compile(r"^#(\d+) CACHED\b")
+
+
+@dataclass
+class BuildCacheEntry:
+    """The state and statistics of the cache of a service.
+
+    Args:
+        key (str): The name of the subdirectory, see :func:`get_cache_key`.
+        size (int): The size of the subdirectory in bytes. 0 if it doesn't exist (anymore).
+        last_used (float): The time the cache was last used by a build.
+        builds (int): The number of recorded builds.
+        steps (int): The number of build steps of the recorded builds.
+        cached (int): The number of those steps that were cached.
+    """
+
+    key: str
+    size: int = 0
+    last_used: float = 0.0
+    builds: int = 0
+    steps: int = 0
+    cached: int = 0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        """The fraction of the build steps that were cached. None if no steps were recorded."""
+        return self.cached / self.steps if self.steps else None
+
+
+def parse_size(value: Any) -> int:
+    """Parse a size such as ``512M`` or ``20GB`` (powers of 1024).
+
+    Args:
+        value (Any): The size, either a number of bytes or a string with a ``k``, ``m``, ``g`` or ``t`` suffix.
+
+    Returns:
+        int: The number of bytes.
+
+    Raises:
+        ValueError: If the size is invalid.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", str(value).lower())
+    if match is None:
+        raise ValueError(f"Invalid size '{value}'.")
+    return int(float(match.group(1)) * 1024 ** " kmgt".index(match.group(2) or " "))
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes, e.g. ``1.5G``."""
+    for unit in "BKMG":
+        if size < 1024:
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size}B"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def get_cache_key(project: str, service: str) -> str:
+    """Get the name of the cache subdirectory of a service.
+
+    Args:
+        project (str): The compose project name.
+        service (str): The name of the service.
+
+    Returns:
+        str: The name.
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{project}-{service}")
+
+
+def get_build_cache(
+    config: ATKConfig,
+    *,
+    directory: Optional[str] = None,
+    max_size: Optional[str] = None,
+) -> Optional["BuildCache"]:
+    """Get the build cache set with ``x-atk-build-cache``.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        directory (Optional[str]): Overrides the cache directory (and enables the cache).
+        max_size (Optional[str]): Overrides the maximum size of the cache directory. See :func:`parse_size`.
+
+    Returns:
+        Optional[BuildCache]: The build cache or None if it isn't enabled.
+
+    Raises:
+        ValueError: If the setting is invalid.
+    """
+    setting = config.config.get(BUILD_CACHE_KEY, None)
+    if isinstance(setting, str):
+        setting = {"dir": setting}
+    elif setting is None:
+        setting = {}
+    elif not isinstance(setting, dict):
+        raise ValueError(
+            f"'{BUILD_CACHE_KEY}' must be a directory or a mapping with 'dir' and 'max_size'."
+        )
+
+    directory = directory or setting.get("dir", None)
+    if not directory:
+        return None
+    directory = Path(expand_variables(str(directory), get_project_env(config)))
+    directory = config.atk_yml_path.parent / directory.expanduser()
+    max_size = parse_size(max_size or setting.get("max_size", DEFAULT_MAX_SIZE))
+    return BuildCache(directory, max_size)
+
+
+class BuildCounter:
+    """Counts the build steps and the cached steps in the (plain) progress output of BuildKit.
+
+    Each step is attributed to the service in its name (e.g. ``[dev 2/3]``), or to ``default`` if it has none.
+    ``FROM`` steps are not counted.
+
+    Args:
+        services (Iterable[str]): The services that are built.
+        default (str): The service steps without a service in their name are attributed to.
+    """
+
+    def __init__(self, services: Iterable[str], default: str):
+        self.services = set(services)
+        self.default = default
+        self._steps: Dict[str, str] = {}
+        self._cached: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def feed(self, line: bytes):
+        """Process a line of output."""
+        text = line.decode(errors="replace").strip()
+        with self._lock:
+            match = _CACHED_PATTERN.match(text)
+            if match is not None:
+                self._cached.add(match.group(1))
+                return
+            match = _STEP_PATTERN.match(text)
+            if match is None or match.group(3).upper() == "FROM":
+                return
+            name = match.group(2).split()
+            service = name[0] if name and name[0] in self.services else self.default
+            self._steps.setdefault(match.group(1), service)
+
+    def get_counts(self) -> Dict[str, Tuple[int, int]]:
+        """Get the number of steps and cached steps of each service."""
+        counts: Dict[str, Tuple[int, int]] = {}
+        with self._lock:
+            for step, service in self._steps.items():
+                steps, cached = counts.get(service, (0, 0))
+                counts[service] = (steps + 1, cached + (step in self._cached))
+        return counts
+
+
+class BuildCache:
+    """A directory with a ``type=local`` build cache per service.
+
+    Args:
+        directory (Path): The cache directory.
+        max_size (int): The size in bytes above which the least recently used caches are evicted.
+    """
+
+    def __init__(self, directory: Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def inject(self, config: Dict[str, Any], project: str) -> List[str]:
+        """Add the cache import and export locations to the ``build`` section of each service.
+
+        Existing ``cache_from`` and ``cache_to`` entries are kept.
+
+        Args:
+            config (Dict[str, Any]): The resolved config. Modified in place.
+            project (str): The compose project name.
+
+        Returns:
+            List[str]: The services that have a ``build`` section.
+        """
+        services = []
+        for service, service_config in (config.get("services", None) or {}).items():
+            build = (service_config or {}).get("build", None)
+            if build is None:
+                continue
+            if not isinstance(build, dict):
+                build = service_config["build"] = {"context": build}
+
+            directory = self.directory / get_cache_key(project, service)
+            for field, entry in (
+                ("cache_from", f"type=local,src={directory}"),
+                ("cache_to", f"type=local,dest={directory},mode=max"),
+            ):
+                entries = list(build.get(field, None) or [])
+                if entry not in entries:
+                    entries.append(entry)
+                build[field] = entries
+            services.append(service)
+        return services
+
+    @contextmanager
+    def use(self, keys: Iterable[str]) -> Iterator[None]:
+        """Mark the caches as used and protect them from eviction while in the context."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with ExitStack() as stack:
+            for key in keys:
+                stack.enter_context(
+                    file_lock(self.directory / f".{key}.lock", shared=True)
+                )
+                self._touch(key)
+            yield
+
+    def record(self, counts: Dict[str, Tuple[int, int]]):
+        """Add the steps and cached steps of a build to the statistics.
+
+        Args:
+            counts (Dict[str, Tuple[int, int]]): The number of steps and cached steps, keyed by cache key.
+        """
+        filename = self.directory / STATS_FILE
+        try:
+            with file_lock(self.directory / LOCK_FILE):
+                stats = self._read_stats()
+                for key, (steps, cached) in counts.items():
+                    entry = stats.setdefault(key, {})
+                    entry["builds"] = entry.get("builds", 0) + 1
+                    entry["steps"] = entry.get("steps", 0) + steps
+                    entry["cached"] = entry.get("cached", 0) + cached
+                temp_filename = filename.with_name(
+                    f".{filename.name}.{os.getpid()}.tmp"
+                )
+                temp_filename.write_text(json.dumps(stats, indent=4))
+                os.replace(temp_filename, filename)
+        except OSError as e:
+            LOGGER.warn("Failed to save the build cache statistics: %s", e)
+
+    def evict(self, keep: Iterable[str] = ()) -> List[str]:
+        """Remove the least recently used caches until the cache directory is no larger than :attr:`max_size`.
+
+        Caches that are in use by a build (see :meth:`use`) are skipped.
+
+        Args:
+            keep (Iterable[str]): Cache keys that are never evicted, e.g. the ones just built.
+
+        Returns:
+            List[str]: The keys of the evicted caches.
+        """
+        keep = set(keep)
+        evicted = []
+        with file_lock(self.directory / LOCK_FILE):
+            entries = sorted(self.get_entries(), key=lambda e: e.last_used)
+            total = sum(e.size for e in entries)
+            for entry in entries:
+                if total <= self.max_size:
+                    break
+                if entry.key in keep or not entry.size:
+                    continue
+                with file_lock(
+                    self.directory / f".{entry.key}.lock", blocking=False
+                ) as locked:
+                    if not locked:
+                        LOGGER.debug("'%s' is in use. Not evicting it.", entry.key)
+                        continue
+                    shutil.rmtree(self.directory / entry.key, ignore_errors=True)
+                total -= entry.size
+                evicted.append(entry.key)
+                LOGGER.info(
+                    "Evicted the build cache '%s' (%s).",
+                    entry.key,
+                    format_size(entry.size),
+                )
+        return evicted
+
+    def get_entries(self) -> List[BuildCacheEntry]:
+        """Get the state and statistics of each cache, including evicted caches that have statistics.
+
+        Returns:
+            List[BuildCacheEntry]: The entries, sorted by key.
+        """
+        entries: Dict[str, BuildCacheEntry] = {}
+        try:
+            directories = [p for p in self.directory.iterdir() if p.is_dir()]
+        except OSError:
+            directories = []
+        for directory in directories:
+            entries[directory.name] = BuildCacheEntry(
+                directory.name, _get_size(directory), directory.stat().st_mtime
+            )
+        for key, stats in self._read_stats().items():
+            entry = entries.setdefault(key, BuildCacheEntry(key))
+            entry.builds = stats.get("builds", 0)
+            entry.steps = stats.get("steps", 0)
+            entry.cached = stats.get("cached", 0)
+        return [entries[key] for key in sorted(entries)]
+
+    def _touch(self, key: str):
+        directory = self.directory / key
+        try:
+            directory.mkdir(exist_ok=True)
+            now = time.time()
+            os.utime(directory, (now, now))
+        except OSError as e:
+            LOGGER.debug("Failed to mark the build cache '%s' as used: %s", key, e)
+
+    def _read_stats(self) -> Dict[str, Dict[str, int]]:
+        try:
+            return json.loads((self.directory / STATS_FILE).read_text())
+        except (OSError, ValueError):
+            return {}
+
+
+def _get_size(directory: Path) -> int:
+    size = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
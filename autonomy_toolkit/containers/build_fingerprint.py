@@ -0,0 +1,348 @@
+# SPDX-License-Identifier: MIT
+"""
+Computes fingerprints of the builds of individual services such that unchanged services don't have to be rebuilt.
+
+A fingerprint is computed from the service's ``build`` section in the resolved config, the name of the image, the
+Dockerfile and a walk of the build context that respects ``.dockerignore``. The walk hashes the path, mode, size and
+modification time of each file, which is much cheaper than hashing the contents and only errs on the side of
+rebuilding. Along with the fingerprint, the id of the built image is stored, such that a build isn't skipped if the
+image was removed or replaced (e.g. by a build with another set of optionals) since.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.files import file_exists, expand_variables
+from autonomy_toolkit.utils.locks import file_lock
+from autonomy_toolkit.containers.build_scheduler import (
+    ServiceBuild,
+    get_project_env,
+    get_service_build,
+)
+
+# External imports
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+class DockerIgnore:
+    """Matches paths against the patterns of a ``.dockerignore`` file.
+
+    Args:
+        patterns (List[str]): The patterns. Patterns starting with ``!`` are exceptions.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self._patterns = []
+        self.key: Tuple[str, ...] = tuple(patterns)
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            exception = pattern.startswith("!")
+            pattern = os.path.normpath(pattern.lstrip("!").strip()).lstrip("/")
+            if pattern in ("", "."):
+                continue
+            self._patterns.append((_translate(pattern.replace(os.sep, "/")), exception))
+
+        # Directories can only be pruned if no pattern could re-include their contents
+        self.has_exceptions = any(exception for _, exception in self._patterns)
+
+    @classmethod
+    def from_file(cls, filename: Path) -> "DockerIgnore":
+        """Read the patterns from a ``.dockerignore`` file. No patterns are used if the file doesn't exist."""
+        if not file_exists(filename):
+            return cls([])
+        return cls(Path(filename).read_text().splitlines())
+
+    def is_ignored(self, path: str) -> bool:
+        """Whether the passed path (relative to the context, using ``/`` separators) is ignored."""
+        parents = [path]
+        while "/" in parents[-1]:
+            parents.append(parents[-1].rsplit("/", 1)[0])
+
+        ignored = False
+        for regex, exception in self._patterns:
+            if any(regex.match(p) for p in parents):
+                ignored = not exception
+        return ignored
+
+
+def _translate(pattern: str) -> re.Pattern:
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            if pattern.startswith("/", i):
+                regex = regex[:-2] + "(?:.*/)?"
+                i += 1
+            continue
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i)
+            if end == -1:
+                regex += re.escape(c)
+            else:
+                regex += "[" + pattern[i + 1 : end].replace("^", "\\^", 1) + "]"
+                i = end
+        else:
+            regex += re.escape(c)
+        i += 1
+    return re.compile(regex + r"\Z")
+
+
+# Files generated by atk, which are often located in a build context. They're ignored, as they change on every run.
+_GENERATED_FILES = re.compile(r"\.{1,2}atk-(compose|build-fingerprints)[^/]*")
+
+
+class ContextCache:
+    """Caches the listings of the directories of build contexts, keyed by the modification time of each directory.
+
+    Creating, removing or renaming an entry updates the modification time of its directory, so a listing (with the
+    ignored entries already filtered out) stays valid until then. That saves listing the directories and matching
+    each path against the ``.dockerignore`` patterns on repeated walks, e.g. when watching. Files are still stat'ed on
+    every walk, as modifying a file in place doesn't update its directory.
+    """
+
+    def __init__(self):
+        self._listings: Dict[
+            Tuple[str, Tuple[str, ...]], Tuple[int, List[str], List[str]]
+        ] = {}
+
+    def list_directory(
+        self, directory: str, rel_root: str, dockerignore: DockerIgnore
+    ) -> Tuple[List[str], List[str]]:
+        """List the directories to descend into and the files to hash of a directory of a build context.
+
+        Args:
+            directory (str): The directory.
+            rel_root (str): The path of the directory relative to the context, with a trailing ``/`` unless empty.
+            dockerignore (DockerIgnore): The ignore patterns of the context.
+
+        Returns:
+            Tuple[List[str], List[str]]: The (sorted) names of the directories and of the files.
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return [], []
+        key = (directory, dockerignore.key)
+        listing = self._listings.get(key, None)
+        if listing is None or listing[0] != mtime:
+            listing = (mtime, *_list_directory(directory, rel_root, dockerignore))
+            self._listings[key] = listing
+        return listing[1], listing[2]
+
+
+def hash_context(
+    context: Path,
+    dockerignore: Optional[DockerIgnore] = None,
+    cache: Optional[ContextCache] = None,
+) -> str:
+    """Hash a build context by walking it and hashing the metadata of each file.
+
+    Files generated by ``atk`` (i.e. the compose file and the build fingerprints) are ignored.
+
+    Args:
+        context (Path): The build context.
+        dockerignore (Optional[DockerIgnore]): The ignore patterns. Defaults to ``<context>/.dockerignore``.
+        cache (Optional[ContextCache]): Reuses the listings of unchanged directories between walks.
+
+    Returns:
+        str: The hex digest.
+    """
+    if dockerignore is None:
+        dockerignore = DockerIgnore.from_file(context / ".dockerignore")
+
+    # Depth first, in the same order as a top down `os.walk` with sorted directories
+    digest = hashlib.sha256()
+    pending = [(str(context), "")]
+    while pending:
+        root, rel_root = pending.pop()
+        if cache is not None:
+            dirs, files = cache.list_directory(root, rel_root, dockerignore)
+        else:
+            dirs, files = _list_directory(root, rel_root, dockerignore)
+
+        for name in files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            digest.update(
+                f"{rel_root}{name}\0{stat.st_mode}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+            )
+        pending.extend(
+            (os.path.join(root, d), f"{rel_root}{d}/") for d in reversed(dirs)
+        )
+    return digest.hexdigest()
+
+
+def _list_directory(
+    directory: str, rel_root: str, dockerignore: DockerIgnore
+) -> Tuple[List[str], List[str]]:
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return [], []
+
+    # Like `os.walk`, symlinks to directories are neither descended into nor hashed
+    dirs = sorted(e.name for e in entries if e.is_dir())
+    files = sorted(e.name for e in entries if not e.is_dir())
+    dirs = [d for d in dirs if not os.path.islink(os.path.join(directory, d))]
+    if not dockerignore.has_exceptions:
+        dirs = [d for d in dirs if not dockerignore.is_ignored(rel_root + d)]
+    files = [
+        name
+        for name in files
+        if not _GENERATED_FILES.fullmatch(name)
+        and not dockerignore.is_ignored(rel_root + name)
+    ]
+    return dirs, files
+
+
+def compute_fingerprint(
+    config: ATKConfig,
+    service: str,
+    env: Optional[Dict[str, str]] = None,
+    context_cache: Optional[ContextCache] = None,
+) -> Optional[str]:
+    """Compute the build fingerprint of a service.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        service (str): The name of the service.
+        env (Optional[Dict[str, str]]): The variables used to interpolate the config. Defaults to :func:`get_project_env`.
+        context_cache (Optional[ContextCache]): Reuses the listings of unchanged directories of the build context.
+
+    Returns:
+        Optional[str]: The fingerprint or None if the service has no ``build`` section or has a remote context.
+    """
+    env = env if env is not None else get_project_env(config)
+    info: Optional[ServiceBuild] = get_service_build(config, service, env)
+    if info is None or info.context is None:
+        return None
+
+    digest = hashlib.sha256()
+
+    # The build section, interpolated such that changes to the variables it uses are detected
+    # The build cache locations don't affect the image, so enabling the cache doesn't trigger a rebuild
+    build = config.config["services"][service]["build"]
+    if isinstance(build, dict):
+        build = {k: v for k, v in build.items() if k not in ("cache_from", "cache_to")}
+    digest.update(expand_variables(json.dumps(build, sort_keys=True), env).encode())
+
+    # The (interpolated) image, such that building under another name isn't skipped
+    digest.update(f"\0{info.image}\0".encode())
+
+    # The dockerfile
+    if info.dockerfile is not None and info.dockerfile.is_file():
+        digest.update(hashlib.sha256(info.dockerfile.read_bytes()).digest())
+
+    # The build context. BuildKit prefers a <dockerfile>.dockerignore next to the dockerfile.
+    dockerignore_file = info.context / ".dockerignore"
+    if info.dockerfile is not None:
+        dockerfile_ignore = info.dockerfile.with_name(
+            info.dockerfile.name + ".dockerignore"
+        )
+        if file_exists(dockerfile_ignore):
+            dockerignore_file = dockerfile_ignore
+    if info.context.is_dir():
+        dockerignore = DockerIgnore.from_file(dockerignore_file)
+        digest.update(hash_context(info.context, dockerignore, context_cache).encode())
+
+    return digest.hexdigest()
+
+
+def get_store_key(compose_file: Path, service: str) -> str:
+    """Get the key of a service in a :class:`FingerprintStore`.
+
+    Each generated compose file (i.e. set of services, optionals and compose options) stores its own fingerprints,
+    since the same service may be built differently by each of them.
+
+    Args:
+        compose_file (Path): The generated compose file.
+        service (str): The name of the service.
+
+    Returns:
+        str: The key.
+    """
+    return f"{Path(compose_file).name}:{service}"
+
+
+class FingerprintStore:
+    """Stores the build fingerprints of the services, and the ids of the images they built, in a json file.
+
+    Args:
+        filename (Path): The json file. Typically located next to the generated compose file.
+    """
+
+    def __init__(self, filename: Path):
+        self.filename = Path(filename)
+        self._lock = threading.Lock()
+
+        self._fingerprints = self._read()
+
+        # The fingerprints stored by this object, which are merged into the file on save
+        self._updates = {}
+
+    def is_unchanged(
+        self, key: str, fingerprint: Optional[str], image_id: Optional[str]
+    ) -> bool:
+        """Whether the stored fingerprint and image id match the passed ones.
+
+        Args:
+            key (str): The key of the service. See :func:`get_store_key`.
+            fingerprint (Optional[str]): The current fingerprint.
+            image_id (Optional[str]): The id of the image the service is currently tagged as. None if it doesn't exist.
+        """
+        stored = self._fingerprints.get(key, None)
+        return (
+            fingerprint is not None
+            and image_id is not None
+            and isinstance(stored, dict)
+            and stored.get("fingerprint", None) == fingerprint
+            and stored.get("image", None) == image_id
+        )
+
+    def update(self, key: str, fingerprint: Optional[str], image_id: Optional[str]):
+        """Store the fingerprint of a service and the id of the image that was built, and save the store to disk."""
+        if fingerprint is None or image_id is None:
+            return
+
+        with self._lock:
+            entry = {"fingerprint": fingerprint, "image": image_id}
+            self._fingerprints[key] = entry
+            self._updates[key] = entry
+            self._save()
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        try:
+            return json.loads(self.filename.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        # Other processes may have stored fingerprints since the file was read, so it's re-read under the lock
+        try:
+            with file_lock(self.filename.with_name(f"{self.filename.name}.lock")):
+                self._fingerprints = {**self._read(), **self._updates}
+                temp_filename = self.filename.with_name(
+                    f".{self.filename.name}.{os.getpid()}.tmp"
+                )
+                temp_filename.write_text(json.dumps(self._fingerprints, indent=4))
+                os.replace(temp_filename, self.filename)
+        except OSError as e:
+            LOGGER.warn("Failed to save the build fingerprints: %s", e)
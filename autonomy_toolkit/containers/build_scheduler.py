@@ -0,0 +1,307 @@
+# SPDX-License-Identifier: MIT
+"""
+Schedules the builds of individual services such that independent images are built concurrently.
+
+The dependencies between services are determined from the resolved ``ATKConfig.config``: a service depends on
+another service if its Dockerfile has a ``FROM`` line that references the image of the other service,
+or if it references the other service through ``additional_contexts`` (i.e. ``service:<name>``).
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.files import read_env_file, expand_variables
+
+# External imports
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+import os
+import re
+
+_FROM_PATTERN = re.compile(
+    r"^\s*FROM\s+(?:--\S+\s+)*(?P<image>\S+)(?:\s+AS\s+(?P<stage>\S+))?",
+    re.IGNORECASE | re.MULTILINE,
+)
+_ARG_PATTERN = re.compile(
+    r"^\s*ARG\s+(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?:=(?P<default>\S*))?",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+@dataclass
+class ServiceBuild:
+    """The build information of a single service.
+
+    Args:
+        service (str): The name of the service.
+        image (str): The (normalized) image that is produced by building the service.
+        context (Optional[Path]): The build context. None if the context is not a local directory.
+        dockerfile (Optional[Path]): The Dockerfile used to build the service. None if it could not be found.
+        base_images (Set[str]): The (normalized) images referenced by ``FROM`` lines in the Dockerfile.
+        dependencies (Set[str]): The services that must be built before this service.
+    """
+
+    service: str
+    image: str
+    context: Optional[Path] = None
+    dockerfile: Optional[Path] = None
+    base_images: Set[str] = field(default_factory=set)
+    dependencies: Set[str] = field(default_factory=set)
+
+
+def normalize_image(image: str) -> str:
+    """Normalize an image reference such that equivalent references compare equal.
+
+    Args:
+        image (str): The image reference, e.g. ``ubuntu`` or ``docker.io/library/ubuntu:latest``.
+
+    Returns:
+        str: The normalized image reference, e.g. ``ubuntu:latest``.
+    """
+    for prefix in ("docker.io/library/", "docker.io/", "index.docker.io/library/"):
+        if image.startswith(prefix):
+            image = image[len(prefix) :]
+            break
+    if "@" not in image and ":" not in image.rsplit("/", 1)[-1]:
+        image += ":latest"
+    return image
+
+
+def get_project_env(config: ATKConfig) -> Dict[str, str]:
+    """Get the variables used to interpolate the config, i.e. the env files overridden by the environment.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+
+    Returns:
+        Dict[str, str]: The variables.
+    """
+    env = {}
+    for env_file in config.env_files:
+        env.update(read_env_file(env_file))
+    env.update(os.environ)
+    return env
+
+
+def get_project_name(config: ATKConfig, env: Optional[Dict[str, str]] = None) -> str:
+    """Get the compose project name, i.e. the ``name`` field or the name of the directory of the ``atk.yml`` file.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        env (Optional[Dict[str, str]]): The variables used to interpolate the name. Defaults to :func:`get_project_env`.
+
+    Returns:
+        str: The name, normalized like ``docker compose`` does.
+    """
+    name = config.config.get("name", None) or config.atk_yml_path.parent.name
+    env = env if env is not None else get_project_env(config)
+    name = expand_variables(str(name), env)
+    return re.sub(r"[^a-z0-9_-]", "", name.lower())
+
+
+def get_service_image(
+    config: ATKConfig, service: str, env: Optional[Dict[str, str]] = None
+) -> Optional[str]:
+    """Get the image the container of a service is created from.
+
+    That's the ``image`` field or, for services that are built without one, the image ``docker compose`` names after
+    the project and the service.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        service (str): The name of the service.
+        env (Optional[Dict[str, str]]): The variables used to interpolate the config. Defaults to :func:`get_project_env`.
+
+    Returns:
+        Optional[str]: The normalized image or None if the service has neither an ``image`` nor a ``build`` section.
+    """
+    env = env if env is not None else get_project_env(config)
+    service_config = config.config.get("services", {}).get(service, None) or {}
+    if service_config.get("image", None):
+        return normalize_image(expand_variables(str(service_config["image"]), env))
+    if "build" in service_config:
+        return normalize_image(f"{get_project_name(config, env)}-{service}")
+    return None
+
+
+def get_service_build(
+    config: ATKConfig, service: str, env: Optional[Dict[str, str]] = None
+) -> Optional[ServiceBuild]:
+    """Read the build information of a service from the resolved config.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        service (str): The name of the service.
+        env (Optional[Dict[str, str]]): The variables used to interpolate the config. Defaults to :func:`get_project_env`.
+
+    Returns:
+        Optional[ServiceBuild]: The build information or None if the service has no ``build`` section.
+    """
+    env = env if env is not None else get_project_env(config)
+    service_config = config.config.get("services", {}).get(service, None) or {}
+    build = service_config.get("build", None)
+    if build is None:
+        return None
+    if isinstance(build, str):
+        build = {"context": build}
+
+    # Determine the image that is produced by the build
+    info = ServiceBuild(service, get_service_image(config, service, env))
+
+    # Determine the context and the dockerfile
+    context = expand_variables(str(build.get("context", ".")), env)
+    if "://" not in context and not context.startswith("git@"):
+        info.context = config.atk_yml_path.parent / context
+        dockerfile = expand_variables(str(build.get("dockerfile", "Dockerfile")), env)
+        info.dockerfile = info.context / dockerfile
+
+    # Read the FROM lines of the dockerfile
+    if "dockerfile_inline" in build:
+        dockerfile_contents = str(build["dockerfile_inline"])
+    elif info.dockerfile is not None and info.dockerfile.is_file():
+        dockerfile_contents = info.dockerfile.read_text()
+    else:
+        dockerfile_contents = ""
+    info.base_images = _get_base_images(dockerfile_contents, build.get("args", None))
+
+    # Services referenced through additional_contexts must be built first
+    for additional_context in (build.get("additional_contexts", None) or {}).values():
+        if str(additional_context).startswith("service:"):
+            info.dependencies.add(str(additional_context)[len("service:") :])
+
+    return info
+
+
+def _get_base_images(dockerfile_contents: str, build_args) -> Set[str]:
+    # Build args may be passed either as a dict or as a list of KEY=VALUE
+    if isinstance(build_args, list):
+        build_args = dict(arg.split("=", 1) for arg in build_args if "=" in arg)
+    build_args = {k: str(v) for k, v in (build_args or {}).items() if v is not None}
+
+    args = {}
+    for match in _ARG_PATTERN.finditer(dockerfile_contents):
+        if match.group("default") is not None:
+            args[match.group("name")] = match.group("default").strip("\"'")
+    args.update(build_args)
+
+    stages = set()
+    base_images = set()
+    for match in _FROM_PATTERN.finditer(dockerfile_contents):
+        image = expand_variables(match.group("image"), args)
+        if image not in stages and image.lower() != "scratch":
+            base_images.add(normalize_image(image))
+        if match.group("stage"):
+            stages.add(match.group("stage"))
+    return base_images
+
+
+def plan_builds(config: ATKConfig, services: List[str]) -> Dict[str, ServiceBuild]:
+    """Create the build plan for the passed services.
+
+    Services without a ``build`` section are ignored. Dependencies on services that are not in ``services``
+    are dropped, as those images are expected to exist already.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        services (List[str]): The services to build.
+
+    Returns:
+        Dict[str, ServiceBuild]: The build information of each service, keyed by service name.
+    """
+    env = get_project_env(config)
+    plan = {}
+    for service in services:
+        info = get_service_build(config, service, env)
+        if info is None:
+            LOGGER.debug("Service '%s' has no 'build' section. Skipping.", service)
+            continue
+        plan[service] = info
+
+    images = {info.image: service for service, info in plan.items()}
+    for service, info in plan.items():
+        info.dependencies |= {images[i] for i in info.base_images if i in images}
+        info.dependencies &= set(plan) - {service}
+        LOGGER.debug(
+            "Service '%s' depends on %s.",
+            service,
+            sorted(info.dependencies) or "nothing",
+        )
+
+    return plan
+
+
+class BuildScheduler:
+    """Builds services concurrently while respecting the dependencies between them.
+
+    Args:
+        build_fn (Callable[[str], int]): Builds a single service and returns the returncode.
+        jobs (int): The maximum number of concurrent builds.
+    """
+
+    def __init__(self, build_fn: Callable[[str], int], jobs: int = 1):
+        self._build_fn = build_fn
+        self._jobs = max(1, jobs)
+
+    def run(self, plan: Dict[str, ServiceBuild]) -> int:
+        """Build all services in the plan.
+
+        Services whose dependencies failed to build are not built.
+
+        Args:
+            plan (Dict[str, ServiceBuild]): The build plan, see :func:`plan_builds`.
+
+        Returns:
+            int: 0 if all builds succeeded, otherwise the first non-zero returncode.
+        """
+        pending = {service: set(info.dependencies) for service, info in plan.items()}
+        returncode = 0
+
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            running = {}
+            while pending or running:
+                # Submit all services whose dependencies have been built
+                for service in [s for s, deps in pending.items() if not deps]:
+                    del pending[service]
+                    LOGGER.info("Building '%s'...", service)
+                    running[executor.submit(self._build_fn, service)] = service
+
+                if not running:
+                    LOGGER.fatal(
+                        "Detected a dependency cycle between %s.", sorted(pending)
+                    )
+                    return returncode or 1
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    service = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        LOGGER.error(
+                            "Building '%s' raised an exception: %s", service, e
+                        )
+                        result = 1
+
+                    if result:
+                        LOGGER.error("Failed to build '%s' (%s).", service, result)
+                        returncode = returncode or result
+                        self._skip_dependents(service, pending)
+                    else:
+                        LOGGER.info("Finished building '%s'.", service)
+                        for deps in pending.values():
+                            deps.discard(service)
+
+        return returncode
+
+    def _skip_dependents(self, service: str, pending: Dict[str, Set[str]]):
+        for dependent in [s for s, deps in pending.items() if service in deps]:
+            if dependent in pending:
+                LOGGER.error(
+                    "Not building '%s' because '%s' failed to build.",
+                    dependent,
+                    service,
+                )
+                del pending[dependent]
+                self._skip_dependents(dependent, pending)
@@ -4,16 +4,71 @@
 # Imports from autonomy_toolkit
 from autonomy_toolkit.utils.logger import LOGGER
 from autonomy_toolkit.utils.atk_config import ATKConfig
-from autonomy_toolkit.utils.files import file_exists
+from autonomy_toolkit.utils.files import expand_variables, file_exists
+from autonomy_toolkit.utils.profiler import PROFILER
+from autonomy_toolkit.utils.process import (
+    DEFAULT_TAIL_SIZE,
+    StreamingResult,
+    run_streaming,
+)
+from autonomy_toolkit.containers.build_scheduler import (
+    BuildScheduler,
+    get_project_env,
+    get_project_name,
+    get_service_image,
+    normalize_image,
+    plan_builds,
+)
+from autonomy_toolkit.containers.readiness import (
+    has_healthcheck,
+    report_readiness,
+    wait_for_services,
+)
+from autonomy_toolkit.containers.build_fingerprint import (
+    FingerprintStore,
+    compute_fingerprint,
+    get_store_key,
+)
+from autonomy_toolkit.containers.shell_cache import (
+    DETECT_SHELL_CMD,
+    FALLBACK_SHELL_CMD,
+    ShellCache,
+    get_shell_override,
+    is_valid_shell,
+)
+from autonomy_toolkit.containers.plan import (
+    NOOP,
+    UP_ARGS,
+    format_plan,
+    plan_services,
+)
+from autonomy_toolkit.containers.build_cache import (
+    BuildCache,
+    BuildCounter,
+    get_cache_key,
+)
+from autonomy_toolkit.containers.pull import (
+    get_always_pulled,
+    get_digest_reference,
+    get_pull_images,
+    pull_images,
+    report_pulls,
+)
+from autonomy_toolkit.utils.dependencies import get_closure
 
 # External imports
 import subprocess
+import copy
+import json
 import os
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, Callable, List, Dict, Set
 
 ENV = os.environ.copy()
 ENV["COMPOSE_IGNORE_ORPHANS"] = 1
 
+# Commands that need this process' terminal (e.g. a tty for a shell), so their output can't be streamed
+INTERACTIVE_COMMANDS = ["exec", "run", "attach"]
+
 
 class ContainerException(Exception):
     """
@@ -23,12 +78,16 @@ class ContainerException(Exception):
         message (Any): The message to be stored in the base class Exception
         stdout (str): The stdout from the command
         stderr (str): The stderr from the command
+        output (str): The last lines of the combined stdout and stderr from the command
     """
 
-    def __init__(self, message: Any, stdout: str = None, stderr: str = None):
+    def __init__(
+        self, message: Any, stdout: str = None, stderr: str = None, output: str = None
+    ):
         super().__init__(message)
         self.stdout = stdout
         self.stderr = stderr
+        self.output = output
 
 
 class DockerClient:
@@ -39,6 +98,13 @@ class DockerClient:
         dry_run (bool): Whether to actually run the commands or just print them. Use DEBUG logging level to see the commands.
         opts (List[str]): Options to pass to the ``docker compose`` command.
         args (List[str]): Arguments to pass to the ``docker compose <command>`` command.
+        jobs (int): The maximum number of services to build concurrently. If 1, the build is left to ``docker compose``.
+        force_build (bool): Whether to build services even if their build fingerprint is unchanged.
+        wait (bool): Whether ``up`` waits for the services to be running (or healthy, if they have a healthcheck).
+        wait_timeout (float): The maximum number of seconds ``up`` waits for the services.
+        pull_jobs (int): The maximum number of images :meth:`pull_images` pulls concurrently.
+        build_cache (Optional[BuildCache]): The build cache that was injected into the config. If set, its statistics are
+            recorded and it's evicted down to its maximum size after building. See :class:`BuildCache`.
     """
 
     def __init__(
@@ -48,10 +114,25 @@ class DockerClient:
         dry_run: bool = False,
         opts: List[str] = [],
         args: List[str] = [],
+        jobs: int = 1,
+        force_build: bool = False,
+        wait: bool = True,
+        wait_timeout: float = 120.0,
+        pull_jobs: int = 4,
+        build_cache: Optional[BuildCache] = None,
     ):
         self.config = config
         self.dry_run = dry_run
         self.services = config.services
+        self.jobs = jobs
+        self.force_build = force_build
+        self.wait = wait
+        self.wait_timeout = wait_timeout
+        self.pull_jobs = pull_jobs
+        self.build_cache = build_cache
+
+        # The services built by this client, see `build`
+        self.built: List[str] = []
 
         # Options passed to the compose command
         # i.e. .. compose ..opts <command>
@@ -76,18 +157,282 @@ class DockerClient:
     def build(self) -> bool:
         """Build the images.
 
+        Services whose build fingerprint (see :func:`compute_fingerprint`) is unchanged since their last successful build
+        with this compose file, and whose image is still the one that build produced, are skipped, unless
+        :attr:`force_build` is set. If :attr:`build_cache` is set, the cached build steps are
+        recorded and the least recently used caches are evicted afterwards.
+
+        If :attr:`jobs` is greater than 1, each service is built with a separate ``docker compose build`` command
+        and independent services are built concurrently. See :class:`BuildScheduler`.
+
         Returns:
             bool: Whether the command succeeded.
         """
-        return self.run_cmd("build")
+        store = FingerprintStore(
+            self.config.compose_file.with_name(".atk-build-fingerprints.json")
+        )
+        env = get_project_env(self.config)
+        fingerprints = {
+            s: compute_fingerprint(self.config, s, env) for s in self.services
+        }
+        keys = {s: get_store_key(self.config.compose_file, s) for s in self.services}
+        images = {s: get_service_image(self.config, s, env) for s in self.services}
+
+        def get_image_ids(services: List[str]) -> Dict[str, str]:
+            try:
+                ids = self._get_image_ids([images[s] for s in services if images[s]])
+            except ContainerException as e:
+                LOGGER.warn("Failed to inspect the images: %s", e)
+                return {}
+            return {s: ids[images[s]] for s in services if images[s] in ids}
+
+        services = self.services
+        if not self.force_build:
+            image_ids = get_image_ids(self.services)
+            services = []
+            for service in self.services:
+                if "build" not in self.config.config["services"].get(service, {}):
+                    LOGGER.debug(
+                        "'%s' has no 'build' section. Skipping build.", service
+                    )
+                elif store.is_unchanged(
+                    keys[service], fingerprints[service], image_ids.get(service, None)
+                ):
+                    LOGGER.info("'%s' is unchanged. Skipping build.", service)
+                else:
+                    services.append(service)
+            if not services:
+                LOGGER.info("All services are up to date. Nothing to build.")
+                return 0
+
+        def build_services(*services: str) -> int:
+            if self.build_cache is None or self.dry_run:
+                returncode = self.run_cmd("build", services=list(services))
+            else:
+                returncode = self._build_with_cache(list(services))
+            if not returncode and not self.dry_run:
+                image_ids = get_image_ids(list(services))
+                for service in services:
+                    store.update(
+                        keys[service],
+                        fingerprints[service],
+                        image_ids.get(service, None),
+                    )
+                self.built.extend(services)
+            return returncode
+
+        if self.jobs <= 1:
+            returncode = build_services(*services)
+        else:
+            plan = plan_builds(self.config, services)
+            returncode = BuildScheduler(build_services, self.jobs).run(plan)
+
+        if self.build_cache is not None and not self.dry_run:
+            project = get_project_name(self.config)
+            self.build_cache.evict(keep=[get_cache_key(project, s) for s in services])
+        return returncode
+
+    def _build_with_cache(self, services: List[str]) -> int:
+        # The caches are protected from eviction while they're in use and the cached steps are counted
+        project = get_project_name(self.config)
+        definitions = self.config.config["services"]
+        keys = {
+            s: get_cache_key(project, s)
+            for s in services
+            if "build" in (definitions.get(s, None) or {})
+        }
+        counter = BuildCounter(keys, next(iter(keys), services[0]))
+        with self.build_cache.use(keys.values()):
+            returncode = self.run_cmd("build", services=services, on_line=counter.feed)
+        if not returncode:
+            counts = counter.get_counts()
+            self.build_cache.record({keys[s]: counts[s] for s in keys if s in counts})
+            for service, (steps, cached) in counts.items():
+                if service not in keys:
+                    continue
+                LOGGER.info(
+                    "'%s' reused %d of %d build steps from the build cache.",
+                    service,
+                    cached,
+                    steps,
+                )
+        return returncode
+
+    def pull_images(self) -> int:
+        """Pull the images of the services (and the services they depend on) that have an ``image`` but no ``build``.
+
+        The unique images are pulled concurrently, at most :attr:`pull_jobs` at a time, and images that are already
+        present are skipped. The time each pull took is logged. If :attr:`dry_run` is set, the images that would be
+        pulled are printed. See :mod:`autonomy_toolkit.containers.pull`.
+
+        Returns:
+            int: The returncode. 0 if successful.
+        """
+        services = get_closure(self.config.config, self.services)
+        images = get_pull_images(
+            self.config.config, services, get_project_env(self.config)
+        )
+        if not images:
+            LOGGER.info("No services use a prebuilt image. Nothing to pull.")
+            return 0
+
+        try:
+            present = self._get_present_images(list(images))
+        except ContainerException as e:
+            LOGGER.warn("Failed to list the images, pulling all of them: %s", e)
+            present = set()
+        present -= get_always_pulled(self.config.config, images)
+
+        if self.dry_run:
+            lines = [
+                f"  {image}: {'present' if image in present else 'pull'}"
+                for image in images
+            ]
+            print("Images:\n" + "\n".join(lines))
+            return 0
+
+        results = pull_images(self._pull_image, images, present, jobs=self.pull_jobs)
+        return report_pulls(results)
 
     def up(self) -> bool:
         """Bring up the containers.
 
+        If :attr:`wait` is set, waits until the services are ready. See :meth:`wait_until_ready`.
+
         Returns:
             bool: Whether the command succeeded.
         """
-        return self.run_cmd("up", "-d")
+        returncode = self.run_cmd("up", "-d")
+        if returncode or not self.wait or self.dry_run:
+            return returncode
+        return self.wait_until_ready()
+
+    def plan(self) -> Dict[str, str]:
+        """Plan the actions that bring the containers in line with the resolved config.
+
+        The services they depend on are planned, too, since ``up`` brings them up along with the services. Services
+        whose image changed since their container was created (e.g. it was pulled or built outside of ``atk``) are
+        recreated. The containers are listed even if :attr:`dry_run` is set, such that the plan can be printed.
+        See :func:`plan_services`.
+
+        Returns:
+            Dict[str, str]: The action of each service.
+        """
+        services = get_closure(self.config.config, self.services)
+        try:
+            containers = self.get_service_states(services)
+        except ContainerException as e:
+            LOGGER.warn("Failed to list the containers, planning to create them: %s", e)
+            containers = {}
+        try:
+            outdated = self._get_outdated_images(containers)
+        except ContainerException as e:
+            LOGGER.warn("Failed to inspect the images of the containers: %s", e)
+            outdated = set()
+        return plan_services(
+            self.config.config, services, containers, set(self.built) | outdated
+        )
+
+    def apply(self, plan: Optional[Dict[str, str]] = None) -> int:
+        """Bring up only the services whose containers are out of date, as planned by :meth:`plan`.
+
+        Services are grouped by their action and each group is brought up with a separate ``up`` command. If
+        :attr:`dry_run` is set, the plan is printed.
+
+        Args:
+            plan (Optional[Dict[str, str]]): The action of each service. Defaults to :meth:`plan`.
+
+        Returns:
+            int: The returncode. 0 if successful.
+        """
+        plan = self.plan() if plan is None else plan
+        if self.dry_run:
+            print(f"Plan:\n{format_plan(plan)}")
+        else:
+            LOGGER.info("Plan:\n%s", format_plan(plan))
+
+        for action, args in UP_ARGS.items():
+            services = [s for s, a in plan.items() if a == action]
+            if not services:
+                continue
+            client = self.with_services(services, wait=False)
+            client._args.extend(a for a in args if a not in client._args)
+            returncode = client.up()
+            if returncode:
+                return returncode
+
+        if all(action == NOOP for action in plan.values()):
+            LOGGER.info("All containers are up to date. Nothing to bring up.")
+        if not self.wait or self.dry_run:
+            return 0
+        return self.wait_until_ready()
+
+    def wait_until_ready(self) -> int:
+        """Wait until the containers of the services are running or, if they have a healthcheck, healthy.
+
+        All services are waited on concurrently, for at most :attr:`wait_timeout` seconds in total.
+        The time each service took to become ready is printed.
+
+        Returns:
+            int: 0 if all services are ready, 1 otherwise.
+        """
+        services = self.config.config.get("services", {})
+        healthchecks = [
+            s for s in self.services if has_healthcheck(services.get(s, None) or {})
+        ]
+
+        def get_states(services: List[str]) -> Dict[str, Dict[str, Any]]:
+            # A failed poll is retried on the next one
+            try:
+                return self.get_service_states(services)
+            except ContainerException as e:
+                LOGGER.debug("Failed to list the containers: %s", e)
+                return {}
+
+        LOGGER.info("Waiting for %s to be ready...", self.services)
+        results = wait_for_services(
+            get_states,
+            self.services,
+            healthchecks,
+            timeout=self.wait_timeout,
+        )
+        return report_readiness(results)
+
+    def get_service_states(self, services: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the state of the container of each of the passed services.
+
+        Args:
+            services (List[str]): The services.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The ``State``, ``Health``, ``ExitCode`` and ``Labels`` of each service's container, keyed by service. Services without a container are omitted.
+
+        Raises:
+            ContainerException: If the containers couldn't be listed.
+        """
+        stdout, _ = self.run_compose_cmd(
+            *self._opts,
+            "ps",
+            "-a",
+            "--format",
+            "json",
+            *services,
+            return_output=True,
+            read_only=True,
+            check=True,
+        )
+        stdout = stdout.strip()
+        if not stdout:
+            return {}
+
+        # Newer compose versions print one json object per line, older ones a json array
+        try:
+            containers = json.loads(stdout)
+        except ValueError:
+            containers = [json.loads(line) for line in stdout.splitlines() if line]
+        if isinstance(containers, dict):
+            containers = [containers]
+        return {c.get("Service", ""): c for c in containers}
 
     def run(self) -> bool:
         """Run a command in a container.
@@ -102,71 +447,326 @@ class DockerClient:
 
         NOTE: We assume a shell session is desired.
 
-        This is somewhat difficult, as we don't know the default shell of the user in the container. We therefore have to determine this at runtime with a pretty nasty command.
+        This is somewhat difficult, as we don't know the default shell of the user in the container. See :meth:`get_shell`.
 
         Returns:
             bool: Whether the command succeeded.
         """
-        # fmt: off
-        exec_cmd = "($(awk -F: -v user=\"$(whoami)\" '$1 == user {print $NF}' /etc/passwd) || true)"
-        # fmt: on
-        self._args += ["sh", "-c", exec_cmd]
+        client = self.with_services(self.services)
+        client._args += self.get_shell(self.services[0])
+
+        return client.run_cmd("exec")
+
+    def get_shell(self, service: str) -> List[str]:
+        """Get the command that executes the login shell of the user in the container of a service.
+
+        The shell is set with ``x-atk-shell`` or detected once per image and cached. The image of the container is
+        looked up with ``docker container inspect``, so a cache hit doesn't run ``docker compose``. If the shell can't
+        be detected, a command that detects and executes the shell in the container is returned.
+        See :mod:`autonomy_toolkit.containers.shell_cache`.
+
+        Args:
+            service (str): The name of the service.
+
+        Returns:
+            List[str]: The command.
+        """
+        shell = get_shell_override(self.config.config, service)
+        if shell is not None:
+            LOGGER.debug("Using the shell '%s' set in the config.", " ".join(shell))
+            return shell
+        if self.dry_run:
+            return FALLBACK_SHELL_CMD
+
+        try:
+            image_id = self._get_image_id(service)
+            if not image_id:
+                return FALLBACK_SHELL_CMD
+            user = str(self.config.config["services"].get(service, {}).get("user", ""))
+
+            cache = ShellCache()
+            shell = cache.get(image_id, user)
+            if shell is not None:
+                LOGGER.debug("Using the cached shell '%s' of '%s'.", shell, image_id)
+                return [shell]
+
+            shell = self._detect_shell(service)
+        except ContainerException as e:
+            LOGGER.debug("Failed to detect the shell: %s", e)
+            return FALLBACK_SHELL_CMD
+
+        if not is_valid_shell(shell):
+            LOGGER.debug("Detected the shell '%s', which can't be cached.", shell)
+            return FALLBACK_SHELL_CMD
+        LOGGER.info("Detected the shell '%s' of '%s'.", shell, image_id)
+        cache.set(image_id, user, shell)
+        return [shell]
+
+    def _get_present_images(self, images: List[str]) -> Set[str]:
+        # Images that aren't present make `image inspect` fail, but the present ones are still printed
+        stdout, _ = self._run_cmd(
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            "{{range .RepoTags}}{{println .}}{{end}}{{range .RepoDigests}}{{println .}}{{end}}",
+            *images,
+            return_output=True,
+            read_only=True,
+        )
+        references = {normalize_image(line) for line in stdout.split() if line}
+        return {image for image in images if get_digest_reference(image) in references}
+
+    def _get_outdated_images(self, containers: Dict[str, Dict[str, Any]]) -> Set[str]:
+        """Get the services whose container wasn't created from the image their image reference currently points to.
+
+        Args:
+            containers (Dict[str, Dict[str, Any]]): The container of each service. See :meth:`get_service_states`.
+
+        Returns:
+            Set[str]: The services.
+        """
+        env = get_project_env(self.config)
+        images = {s: get_service_image(self.config, s, env) for s in containers}
+        images = {s: image for s, image in images.items() if image is not None}
+        container_ids = {s: containers[s].get("ID", "") for s in images}
+        container_ids = {s: i for s, i in container_ids.items() if i}
+        if not container_ids:
+            return set()
+
+        stdout, _ = self._run_cmd(
+            "docker",
+            "container",
+            "inspect",
+            "--format",
+            "{{.Id}} {{.Image}}",
+            *container_ids.values(),
+            return_output=True,
+            read_only=True,
+            check=True,
+        )
+        created_from = dict(line.split() for line in stdout.splitlines() if line)
+
+        image_ids = self._get_image_ids(list(set(images[s] for s in container_ids)))
+
+        outdated = set()
+        for service, container_id in container_ids.items():
+            image_id = image_ids.get(images[service], None)
+            container_image = next(
+                (v for k, v in created_from.items() if k.startswith(container_id)),
+                None,
+            )
+            if image_id and container_image and image_id != container_image:
+                LOGGER.info("The image of '%s' changed.", service)
+                outdated.add(service)
+        return outdated
+
+    def _get_image_ids(self, images: List[str]) -> Dict[str, str]:
+        """Get the ids of the images that are present.
+
+        Args:
+            images (List[str]): The normalized image references.
+
+        Returns:
+            Dict[str, str]: The id of each image that is present.
+        """
+        if not images:
+            return {}
+
+        # Images that aren't present make `image inspect` fail, but the present ones are still printed
+        stdout, _ = self._run_cmd(
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            "{{.Id}}{{range .RepoTags}} {{.}}{{end}}{{range .RepoDigests}} {{.}}{{end}}",
+            *images,
+            return_output=True,
+            read_only=True,
+        )
+        ids = {}
+        for line in stdout.splitlines():
+            if not line.strip():
+                continue
+            image_id, *references = line.split()
+            ids.update({normalize_image(r): image_id for r in references})
+        return {
+            image: ids[get_digest_reference(image)]
+            for image in images
+            if get_digest_reference(image) in ids
+        }
+
+    def _pull_image(self, image: str) -> int:
+        try:
+            self._run_cmd(
+                "docker", "pull", "--quiet", image, return_output=True, check=True
+            )
+        except ContainerException as e:
+            LOGGER.error("Failed to pull '%s': %s", image, e.output)
+            return 1
+        return 0
+
+    def _get_image_id(self, service: str) -> Optional[str]:
+        # A plain `docker` command doesn't start the compose plugin, which would double the time an attach takes
+        stdout, _ = self._run_cmd(
+            "docker",
+            "container",
+            "inspect",
+            "--format",
+            "{{.Image}}",
+            self._get_container_name(service),
+            return_output=True,
+            read_only=True,
+        )
+        return next(iter(stdout.split()), None)
+
+    def _get_container_name(self, service: str) -> str:
+        service_config = self.config.config["services"].get(service, None) or {}
+        name = service_config.get("container_name", None)
+        if name is None:
+            return f"{get_project_name(self.config)}-{service}-1"
+        return expand_variables(str(name), get_project_env(self.config))
+
+    def _detect_shell(self, service: str) -> str:
+        stdout, _ = self.run_compose_cmd(
+            *self._opts,
+            "exec",
+            "-T",
+            service,
+            "sh",
+            "-c",
+            DETECT_SHELL_CMD,
+            return_output=True,
+            check=True,
+        )
+        return stdout.strip()
 
-        return self.run_cmd("exec")
+    def with_services(self, services: List[str], **kwargs) -> "DockerClient":
+        """Create a shallow copy of this client that operates on other services.
 
-    def run_cmd(self, cmd, *args, without_ots: bool = False, **kwargs) -> bool:
+        The copy shares the config (and any connections) with this client.
+
+        Args:
+            services (List[str]): The services the copy operates on.
+
+        Other keyword arguments override attributes of the copy (e.g. ``jobs``).
+
+        Returns:
+            DockerClient: The copy.
+        """
+        client = copy.copy(self)
+        client.services = list(services)
+        client._args = list(self._args)
+        for key, value in kwargs.items():
+            setattr(client, key, value)
+        return client
+
+    def run_cmd(
+        self,
+        cmd,
+        *args,
+        without_ots: bool = False,
+        services: Optional[List[str]] = None,
+        **kwargs,
+    ) -> bool:
         """Run a command using the system wide ``compose`` command
 
         Additional positional args (``*args``) will be passed as command arguments when running the command.
-        Named arguments will be passed to :meth:`subprocess.run`
-        (`see their docs <https://docs.python.org/3/library/subprocess.html#subprocess.run>`_).
+        Named arguments will be passed to :meth:`_run_cmd`. Commands in ``INTERACTIVE_COMMANDS`` are run attached
+        to this process' terminal, unless ``interactive`` is passed explicitly.
 
         Args:
             cmd (str): The command to run.
+            services (Optional[List[str]]): The services to run the command for. Defaults to :attr:`services`.
 
         Returns:
             Bool: Whether the command succeeded.
         """
-
+        services = self.services if services is None else services
+        kwargs.setdefault("interactive", cmd in INTERACTIVE_COMMANDS)
         return self.run_compose_cmd(
-            *self._opts, cmd, *args, *self.services, *self._args, **kwargs
+            *self._opts, cmd, *args, *services, *self._args, **kwargs
         )
 
     def run_compose_cmd(self, *args, **kwargs) -> bool:
         """Run a docker compose command."""
         return self._run_cmd("docker", "compose", *args, **kwargs)
 
-    def _run_cmd(self, *args, return_output=False, **kwargs):
-        if return_output:
-            kwargs["stdout"] = subprocess.PIPE
-            kwargs["stderr"] = subprocess.PIPE
-
-        cmd = " ".join([str(arg) for arg in args])
-        LOGGER.debug(f"{cmd}")
+    def _run_cmd(
+        self,
+        *args,
+        return_output: bool = False,
+        interactive: bool = False,
+        check: bool = False,
+        read_only: bool = False,
+        tail_size: int = DEFAULT_TAIL_SIZE,
+        on_line: Optional[Callable[[bytes], None]] = None,
+        **kwargs,
+    ):
+        """Run a command.
 
-        def post_process_stream(stream: Optional[bytes]):
-            if stream is None:
-                return ""
-            stream = stream.decode()
-            if len(stream) != 0 and stream[-1] == "\n":
-                stream = stream[:-1]
-            return stream
+        Unless ``interactive`` is set, the output is streamed line-by-line: it's passed through to this process'
+        stdout/stderr (or, if ``return_output`` is set, logged at the DEBUG level) and the last ``tail_size`` bytes
+        are kept for error reports. Other named arguments are passed to :class:`subprocess.Popen`.
 
-        args = [arg for arg in args if arg]
-        if not self.dry_run:
-            completed_process = subprocess.run(args, **kwargs)
-        else:
-            LOGGER.info(f"'dry_run' set to true. Not running command.")
-            return "", ""
+        Args:
+            return_output (bool): Whether to capture and return the stdout and stderr instead of the returncode.
+            interactive (bool): Whether to attach the command to this process' terminal. The output is then not captured.
+            check (bool): Whether to raise a :class:`ContainerException` if the command fails.
+            read_only (bool): Whether the command only inspects state. Such commands are run even if :attr:`dry_run` is set.
+            tail_size (int): The number of bytes of output to keep for error reports.
+            on_line (Optional[Callable[[bytes], None]]): Called with each line of output. Ignored for interactive commands.
 
-        stdout = post_process_stream(completed_process.stdout)
-        stderr = post_process_stream(completed_process.stderr)
+        Returns:
+            Union[int, Tuple[str, str]]: The returncode, or the stdout and stderr if ``return_output`` is set.
+        """
+        cmd = _CommandLine(args)
+        LOGGER.debug("%s", cmd, extra={"command": cmd})
 
-        if completed_process.returncode:
+        args = [arg for arg in args if arg]
+        if self.dry_run and not read_only:
+            LOGGER.info("'dry_run' set to true. Not running command.")
+            return ("", "") if return_output else 0
+
+        with PROFILER.span("DockerClient._run_cmd", cmd=cmd):
+            if interactive and not return_output:
+                result = StreamingResult(subprocess.run(args, **kwargs).returncode)
+            else:
+                result = run_streaming(
+                    args,
+                    capture=return_output,
+                    passthrough=not return_output,
+                    tail_size=tail_size,
+                    on_line=on_line,
+                    **kwargs,
+                )
+
+        if result.returncode:
             LOGGER.debug(
-                f"Got an error code of '{completed_process.returncode}': {cmd}: {stdout}: {stderr}",
+                "Got an error code of '%s': %s: %s",
+                result.returncode,
+                cmd,
+                result.tail,
+                extra={"command": cmd, "returncode": result.returncode},
             )
+            if check:
+                raise ContainerException(
+                    f"'{cmd}' failed with returncode {result.returncode}.",
+                    stdout=result.stdout,
+                    stderr=result.stderr,
+                    output=result.tail,
+                )
 
         if return_output:
-            return stdout, stderr
-        return completed_process.returncode
+            return result.stdout, result.stderr
+        return result.returncode
+
+
+class _CommandLine:
+    """The arguments of a command, which are only joined when formatted (e.g. if the command is actually logged)."""
+
+    def __init__(self, args):
+        self.args = args
+
+    def __str__(self) -> str:
+        return " ".join([str(arg) for arg in self.args])
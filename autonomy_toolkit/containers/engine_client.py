@@ -0,0 +1,1041 @@
+# SPDX-License-Identifier: MIT
+"""Client that talks directly to the Docker Engine API over its unix socket.
+
+Forking ``docker compose`` starts the compose plugin for every command, which takes hundreds of milliseconds before any
+real work begins. :class:`EngineClient` instead implements ``down``, ``up``, ``attach`` and ``inspect`` with requests to
+the Engine API over a pooled keep-alive connection. All other commands (e.g. ``build``) fall back to ``docker compose``,
+as does ``up`` if a service uses a field the Engine API backend doesn't translate (see :data:`SUPPORTED_FIELDS`).
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.files import read_env_file
+from autonomy_toolkit.utils.interpolation import InterpolationError, interpolate_config
+from autonomy_toolkit.containers.docker_client import DockerClient, ContainerException
+from autonomy_toolkit.containers.build_scheduler import (
+    get_project_env,
+    get_project_name,
+    get_service_image,
+)
+from autonomy_toolkit.containers.plan import (
+    CONFIG_HASH_LABEL,
+    get_container_config_hash,
+    get_stamped_config_hash,
+)
+from autonomy_toolkit.containers.shell_cache import DETECT_SHELL_CMD
+
+# External imports
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, urlencode
+import http.client
+import threading
+import socket
+import shlex
+import json
+import os
+import re
+
+DEFAULT_SOCKET_PATH = "/var/run/docker.sock"
+
+SUPPORTED_FIELDS = {
+    "build",
+    "cap_add",
+    "cap_drop",
+    "command",
+    "container_name",
+    "devices",
+    "entrypoint",
+    "env_file",
+    "environment",
+    "extra_hosts",
+    "healthcheck",
+    "hostname",
+    "image",
+    "ipc",
+    "labels",
+    "network_mode",
+    "networks",
+    "pid",
+    "ports",
+    "privileged",
+    "profiles",
+    "pull_policy",
+    "runtime",
+    "shm_size",
+    "stdin_open",
+    "tty",
+    "user",
+    "volumes",
+    "working_dir",
+}
+"""The service fields that :class:`EngineClient` translates to the Engine API. Extensions (``x-*``) are ignored."""
+
+
+def get_socket_path() -> str:
+    """Get the path of the docker daemon socket, respecting ``DOCKER_HOST`` if it is a ``unix://`` url."""
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://") :]
+    return DEFAULT_SOCKET_PATH
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class EngineAPI:
+    """Minimal HTTP client for the Docker Engine API over a unix socket.
+
+    Connections are kept alive and reused between requests. Up to ``pool_size`` idle connections are kept.
+
+    Args:
+        socket_path (str): The path to the docker daemon socket. Defaults to :func:`get_socket_path`.
+        pool_size (int): The maximum number of idle connections to keep.
+        timeout (Optional[float]): The socket timeout in seconds. Defaults to no timeout.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        *,
+        pool_size: int = 4,
+        timeout: Optional[float] = None,
+    ):
+        self.socket_path = socket_path or get_socket_path()
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._pool: List[_UnixHTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, Any]:
+        """Send a request to the engine.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the endpoint, e.g. ``/containers/json``.
+            body (Any): The body, which will be json encoded. Defaults to no body.
+            params (Optional[Dict[str, Any]]): The query parameters. Dicts and lists are json encoded.
+
+        Returns:
+            Tuple[int, Any]: The status code and the (json decoded, if possible) response body.
+        """
+        if params:
+            params = {
+                k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                for k, v in params.items()
+            }
+            path = f"{path}?{urlencode(params)}"
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+
+        LOGGER.debug("%s %s", method, path)
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError) as e:
+                # A pooled connection may have been closed by the daemon. Retry once with a new one.
+                conn.close()
+                if attempt:
+                    raise ContainerException(f"{method} {path} failed: {e}")
+                continue
+            except OSError as e:
+                conn.close()
+                raise ContainerException(
+                    f"Failed to connect to the docker daemon at '{self.socket_path}': {e}"
+                )
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            break
+
+        try:
+            data = json.loads(data) if data else None
+        except ValueError:
+            data = data.decode(errors="replace")
+        return response.status, data
+
+    def connect_raw(self) -> _UnixHTTPConnection:
+        """Create a new, unpooled connection. Used for requests that hijack the connection (e.g. exec)."""
+        conn = _UnixHTTPConnection(self.socket_path)
+        conn.connect()
+        return conn
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+    def _acquire(self) -> _UnixHTTPConnection:
+        with self._lock:
+            if self._pool:
+                return self._pool.pop()
+        return _UnixHTTPConnection(self.socket_path, timeout=self._timeout)
+
+    def _release(self, conn: _UnixHTTPConnection):
+        with self._lock:
+            if len(self._pool) < self._pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+
+class EngineClient(DockerClient):
+    """Client interface that talks to the Docker Engine API directly instead of forking ``docker compose``.
+
+    ``down``, ``up``, ``attach`` (:meth:`exec_in_container`), :meth:`inspect_containers` and the image pulls of :meth:`pull_images` are implemented with the Engine API. Containers, networks and volumes
+    are labeled like ``docker compose`` would label them, so ``docker compose`` (and :class:`DockerClient`) lists,
+    attaches to and removes them. Whether a container is out of date is decided with the ``dev.atk.config-hash``
+    label, which both clients set, so containers created by ``docker compose`` aren't recreated by this client.
+    The reverse doesn't hold: ``docker compose`` computes its own ``com.docker.compose.config-hash``, so it recreates
+    containers created by this client the next time it brings them up.
+
+    If a service uses a field that isn't in :data:`SUPPORTED_FIELDS` (e.g. ``depends_on`` or ``restart``), ``up``
+    falls back to ``docker compose``. All other commands fall back to ``docker compose``, too.
+
+    Args:
+        config (ATKConfig): The ATK configuration object.
+        socket_path (Optional[str]): The path to the docker daemon socket. Defaults to :func:`get_socket_path`.
+
+    Other arguments are passed to :class:`DockerClient`.
+    """
+
+    def __init__(
+        self, config: ATKConfig, *, socket_path: Optional[str] = None, **kwargs
+    ):
+        super().__init__(config, **kwargs)
+
+        self.api = EngineAPI(socket_path)
+
+    @property
+    def project(self) -> str:
+        """The compose project name."""
+        return get_project_name(self.config)
+
+    def down(self) -> int:
+        """Stop and remove the containers of the services, and the project's unused networks.
+
+        Returns:
+            int: The returncode. 0 if successful.
+        """
+        try:
+            for container in self._list_containers(self.services, all=True):
+                name = container["Names"][0].lstrip("/")
+                if self.dry_run:
+                    LOGGER.info("'dry_run' set to true. Not removing '%s'.", name)
+                    continue
+                LOGGER.info("Removing '%s'...", name)
+                self._check(
+                    self.api.request("POST", f"/containers/{container['Id']}/stop"),
+                    304,
+                    404,
+                )
+                self._check(
+                    self.api.request("DELETE", f"/containers/{container['Id']}"),
+                    404,
+                )
+
+            if self.dry_run:
+                return 0
+            networks = self._check(
+                self.api.request("GET", "/networks", params=self._filters())
+            )
+            for network in networks:
+                # Networks that are still in use can't be removed. That's expected.
+                status, _ = self.api.request("DELETE", f"/networks/{network['Id']}")
+                if status < 300:
+                    LOGGER.info("Removed network '%s'.", network["Name"])
+        except ContainerException as e:
+            LOGGER.error(e)
+            return 1
+        return 0
+
+    def up(self) -> int:
+        """Create (if necessary) and start the containers of the services.
+
+        Containers whose ``dev.atk.config-hash`` label differs from the resolved config are recreated. If a service
+        uses a field that isn't in :data:`SUPPORTED_FIELDS`, all services are brought up with ``docker compose``.
+        Images are pulled or built according to ``pull_policy``, like ``docker compose up`` does: services with a
+        ``build`` section are built if their image is missing (or always, with ``pull_policy: build``), other images
+        are pulled if they're missing (or always, with ``pull_policy: always``, or never, with ``pull_policy: never``).
+
+        Returns:
+            int: The returncode. 0 if successful.
+        """
+        unsupported = {
+            service: get_unsupported_fields(self.config.config["services"][service])
+            for service in self.services
+        }
+        unsupported = {s: fields for s, fields in unsupported.items() if fields}
+        if unsupported:
+            for service, fields in unsupported.items():
+                LOGGER.info(
+                    "'%s' uses %s, which the engine backend doesn't support.",
+                    service,
+                    ", ".join(repr(f) for f in fields),
+                )
+            LOGGER.info("Falling back to 'docker compose up'...")
+            return super().up()
+
+        env = get_project_env(self.config)
+        try:
+            service_configs = {
+                service: interpolate_config(
+                    self.config.config["services"][service], env
+                )
+                for service in self.services
+            }
+        except InterpolationError as e:
+            LOGGER.error("Failed to interpolate the config: %s", e)
+            return 1
+
+        returncode = self._build_images(service_configs)
+        if returncode:
+            return returncode
+
+        # The services are brought up concurrently, each over its own pooled connection
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(self.services))) as executor:
+                futures = [
+                    executor.submit(self._up_service, s, service_configs[s])
+                    for s in self.services
+                ]
+                for future in futures:
+                    future.result()
+        except (ContainerException, KeyError) as e:
+            LOGGER.error("Failed to bring up the containers: %s", e)
+            return 1
+
+        if not self.wait or self.dry_run:
+            return 0
+        return self.wait_until_ready()
+
+    def _build_images(self, service_configs: Dict[str, Dict[str, Any]]) -> int:
+        # Like `docker compose up`, services with a `build` section are built if their image is missing or if
+        # `pull_policy: build` is set. Their images are never pulled.
+        forced, missing = [], []
+        for service, service_config in service_configs.items():
+            if "build" not in service_config:
+                continue
+            if str(service_config.get("pull_policy", "")) == "build":
+                forced.append(service)
+            elif not self._get_present_images(
+                [self._get_image(service, service_config)]
+            ):
+                missing.append(service)
+
+        for services, force_build in ((forced, True), (missing, self.force_build)):
+            if services:
+                returncode = self.with_services(
+                    services, force_build=force_build
+                ).build()
+                if returncode:
+                    return returncode
+        return 0
+
+    def get_service_states(self, services: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the state of the container of each of the passed services.
+
+        See :meth:`DockerClient.get_service_states`.
+        """
+        states = {}
+        for container in self._list_containers(services, all=True):
+            status = container.get("Status", "")
+            health = re.search(r"\((healthy|unhealthy|health: starting)\)", status)
+            exit_code = re.search(r"Exited \((\d+)\)", status)
+            states[container["Labels"]["com.docker.compose.service"]] = {
+                "State": container.get("State", ""),
+                "Health": health.group(1).replace("health: ", "") if health else "",
+                "ExitCode": int(exit_code.group(1)) if exit_code else 0,
+                "Labels": container.get("Labels", None) or {},
+                "ImageID": container.get("ImageID", ""),
+            }
+        return states
+
+    def attach(self) -> int:
+        """Attach to a container by executing the user's shell in it.
+
+        See :meth:`DockerClient.attach`.
+
+        Returns:
+            int: The returncode of the shell.
+        """
+        return self.exec_in_container(self.get_shell(self.services[0]))
+
+    def _get_image_id(self, service: str) -> Optional[str]:
+        containers = self._list_containers([service])
+        return containers[0]["ImageID"] if containers else None
+
+    def _detect_shell(self, service: str) -> str:
+        containers = self._list_containers([service])
+        if not containers:
+            raise ContainerException(f"'{service}' is not running.")
+
+        exec_config = {
+            "AttachStdout": True,
+            "Tty": False,
+            "Cmd": ["sh", "-c", DETECT_SHELL_CMD],
+        }
+        exec_id = self._check(
+            self.api.request(
+                "POST", f"/containers/{containers[0]['Id']}/exec", exec_config
+            )
+        )["Id"]
+        return _read_exec(self.api, exec_id).decode(errors="replace").strip()
+
+    def exec_in_container(self, cmd: List[str]) -> int:
+        """Execute a command in the container of the (single) service, attached to this terminal.
+
+        Args:
+            cmd (List[str]): The command to execute.
+
+        Returns:
+            int: The returncode of the command.
+        """
+        if self.dry_run:
+            LOGGER.info("'dry_run' set to true. Not executing '%s'.", " ".join(cmd))
+            return 0
+
+        try:
+            containers = self._list_containers(self.services[:1])
+            if not containers:
+                raise ContainerException(f"'{self.services[0]}' is not running.")
+
+            tty = os.isatty(0) and os.isatty(1)
+            exec_config = {
+                "AttachStdin": True,
+                "AttachStdout": True,
+                "AttachStderr": True,
+                "Tty": tty,
+                "Cmd": cmd,
+            }
+            exec_id = self._check(
+                self.api.request(
+                    "POST", f"/containers/{containers[0]['Id']}/exec", exec_config
+                )
+            )["Id"]
+            _stream_exec(self.api, exec_id, tty)
+            return (
+                self._check(self.api.request("GET", f"/exec/{exec_id}/json"))[
+                    "ExitCode"
+                ]
+                or 0
+            )
+        except ContainerException as e:
+            LOGGER.error(e)
+            return 1
+
+    def inspect_containers(self) -> List[Dict[str, Any]]:
+        """Inspect the containers of the services.
+
+        Returns:
+            List[Dict[str, Any]]: The ``/containers/{id}/json`` response for each container.
+        """
+        return [
+            self._check(self.api.request("GET", f"/containers/{container['Id']}/json"))
+            for container in self._list_containers(self.services, all=True)
+        ]
+
+    def _up_service(self, service: str, service_config: Dict[str, Any]):
+        config_hash = get_stamped_config_hash(self.config.config, service)
+
+        # Like `docker compose up --force-recreate`, which is passed as a compose arg
+        force_recreate = "--force-recreate" in self._args
+        for container in self._list_containers([service], all=True):
+            if force_recreate or get_container_config_hash(container) != config_hash:
+                LOGGER.info("'%s' is out of date. Recreating...", service)
+                if not self.dry_run:
+                    self._check(
+                        self.api.request(
+                            "DELETE",
+                            f"/containers/{container['Id']}",
+                            params={"force": "true"},
+                        ),
+                        404,
+                    )
+            elif container["State"] == "running":
+                LOGGER.info("'%s' is already running.", service)
+                return
+            else:
+                LOGGER.info("Starting '%s'...", service)
+                if not self.dry_run:
+                    self._check(
+                        self.api.request(
+                            "POST", f"/containers/{container['Id']}/start"
+                        ),
+                        304,
+                    )
+                return
+
+        body, networks = self._create_container_config(
+            service, service_config, config_hash
+        )
+        name = (
+            service_config.get("container_name", None) or f"{self.project}-{service}-1"
+        )
+        if self.dry_run:
+            LOGGER.info("'dry_run' set to true. Not creating '%s'.", name)
+            return
+
+        for network in networks:
+            self._ensure_network(network)
+        self._ensure_image(service, service_config, body["Image"])
+
+        LOGGER.info("Creating '%s'...", name)
+        container_id = self._check(
+            self.api.request("POST", "/containers/create", body, params={"name": name})
+        )["Id"]
+        for network in networks[1:]:
+            self._check(
+                self.api.request(
+                    "POST",
+                    f"/networks/{quote(self._get_network_name(network), safe='')}/connect",
+                    {
+                        "Container": container_id,
+                        "EndpointConfig": {"Aliases": [service]},
+                    },
+                )
+            )
+        self._check(self.api.request("POST", f"/containers/{container_id}/start"), 304)
+
+    def _create_container_config(
+        self, service: str, service_config: Dict[str, Any], config_hash: str
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        labels = _to_dict(service_config.get("labels", {}))
+        labels.update(
+            {
+                CONFIG_HASH_LABEL: config_hash,
+                "com.docker.compose.project": self.project,
+                "com.docker.compose.service": service,
+                "com.docker.compose.container-number": "1",
+                "com.docker.compose.oneoff": "False",
+                "com.docker.compose.config-hash": config_hash,
+                "com.docker.compose.project.working_dir": str(
+                    self.config.atk_yml_path.parent
+                ),
+            }
+        )
+
+        environment = {}
+        env_files = service_config.get("env_file", [])
+        for env_file in [env_files] if isinstance(env_files, str) else env_files:
+            env_file = env_file["path"] if isinstance(env_file, dict) else env_file
+            environment.update(
+                read_env_file(self.config.atk_yml_path.parent / env_file)
+            )
+        environment.update(_to_dict(service_config.get("environment", {})))
+
+        host_config = {
+            "Binds": [],
+            "Mounts": [],
+            "PortBindings": {},
+            "Devices": [],
+            "Privileged": bool(service_config.get("privileged", False)),
+            "CapAdd": service_config.get("cap_add", None),
+            "CapDrop": service_config.get("cap_drop", None),
+            "ExtraHosts": service_config.get("extra_hosts", None),
+        }
+        for key, host_key in (
+            ("runtime", "Runtime"),
+            ("ipc", "IpcMode"),
+            ("pid", "PidMode"),
+            ("network_mode", "NetworkMode"),
+        ):
+            if key in service_config:
+                host_config[host_key] = service_config[key]
+        if "shm_size" in service_config:
+            host_config["ShmSize"] = _parse_bytes(service_config["shm_size"])
+
+        for volume in service_config.get("volumes", []):
+            if isinstance(volume, dict):
+                mount = {
+                    "Type": volume.get("type", "volume"),
+                    "Target": volume["target"],
+                    "ReadOnly": bool(volume.get("read_only", False)),
+                }
+                if "source" in volume:
+                    mount["Source"] = self._resolve_volume_source(
+                        volume["source"], mount["Type"] == "bind"
+                    )
+                host_config["Mounts"].append(mount)
+            else:
+                source, _, target = str(volume).partition(":")
+                if not target:
+                    host_config["Mounts"].append({"Type": "volume", "Target": source})
+                    continue
+                is_bind = source.startswith(("/", ".", "~"))
+                host_config["Binds"].append(
+                    f"{self._resolve_volume_source(source, is_bind)}:{target}"
+                )
+
+        exposed_ports = {}
+        for port in service_config.get("ports", []):
+            for host_ip, host_port, container_port in _parse_port(port):
+                exposed_ports[container_port] = {}
+                host_config["PortBindings"].setdefault(container_port, []).append(
+                    {"HostIp": host_ip, "HostPort": host_port}
+                )
+
+        for device in service_config.get("devices", []):
+            parts = str(device).split(":")
+            host_config["Devices"].append(
+                {
+                    "PathOnHost": parts[0],
+                    "PathInContainer": parts[1] if len(parts) > 1 else parts[0],
+                    "CgroupPermissions": parts[2] if len(parts) > 2 else "rwm",
+                }
+            )
+
+        networks = []
+        if "network_mode" not in service_config:
+            networks = list(service_config.get("networks", None) or ["default"])
+        endpoints = (
+            {self._get_network_name(networks[0]): {"Aliases": [service]}}
+            if networks
+            else {}
+        )
+
+        body = {
+            "Image": self._get_image(service, service_config),
+            "Hostname": service_config.get("hostname", None),
+            "User": service_config.get("user", None),
+            "WorkingDir": service_config.get("working_dir", None),
+            "Env": [f"{k}={v}" for k, v in environment.items() if v is not None],
+            "Labels": labels,
+            "Tty": bool(service_config.get("tty", False)),
+            "OpenStdin": bool(service_config.get("stdin_open", False)),
+            "ExposedPorts": exposed_ports,
+            "HostConfig": host_config,
+            "NetworkingConfig": {"EndpointsConfig": endpoints},
+        }
+        for key, body_key in (("command", "Cmd"), ("entrypoint", "Entrypoint")):
+            if key in service_config:
+                value = service_config[key]
+                body[body_key] = shlex.split(value) if isinstance(value, str) else value
+        if "healthcheck" in service_config:
+            body["Healthcheck"] = _create_healthcheck(service_config["healthcheck"])
+        return body, networks
+
+    def _get_image(self, service: str, service_config: Dict[str, Any]) -> str:
+        return service_config.get("image", None) or f"{self.project}-{service}"
+
+    def _get_resource_config(self, kind: str, key: str) -> Dict[str, Any]:
+        return (self.config.config.get(kind, None) or {}).get(key, None) or {}
+
+    def _get_resource_name(self, kind: str, key: str) -> str:
+        # Like `docker compose`, external resources without a `name` are named after their key
+        resource_config = self._get_resource_config(kind, key)
+        if resource_config.get("name", None):
+            return resource_config["name"]
+        return (
+            key if resource_config.get("external", False) else f"{self.project}_{key}"
+        )
+
+    def _get_network_name(self, network: str) -> str:
+        return self._get_resource_name("networks", network)
+
+    def _resolve_volume_source(self, source: str, is_bind: bool) -> str:
+        if not is_bind:
+            self._ensure_volume(source)
+            return self._get_resource_name("volumes", source)
+        source = os.path.expanduser(source)
+        return str((self.config.atk_yml_path.parent / source).resolve())
+
+    def _ensure_volume(self, volume: str):
+        volume_config = self._get_resource_config("volumes", volume)
+        name = self._get_resource_name("volumes", volume)
+        if self.dry_run or volume_config.get("external", False):
+            return
+        status, _ = self.api.request("GET", f"/volumes/{quote(name, safe='')}")
+        if status == 404:
+            labels = {
+                "com.docker.compose.project": self.project,
+                "com.docker.compose.volume": volume,
+            }
+            self._check(
+                self.api.request(
+                    "POST", "/volumes/create", {"Name": name, "Labels": labels}
+                )
+            )
+
+    def _ensure_network(self, network: str):
+        name = self._get_network_name(network)
+        status, _ = self.api.request("GET", f"/networks/{quote(name, safe='')}")
+        if status != 404:
+            return
+        if self._get_resource_config("networks", network).get("external", False):
+            raise ContainerException(
+                f"The external network '{name}' doesn't exist. Create it with 'docker network create {name}'."
+            )
+        LOGGER.info("Creating network '%s'...", name)
+        # `docker compose` checks that the label matches the key of the network
+        labels = {
+            "com.docker.compose.project": self.project,
+            "com.docker.compose.network": network,
+        }
+        self._check(
+            self.api.request(
+                "POST",
+                "/networks/create",
+                {"Name": name, "CheckDuplicate": True, "Labels": labels},
+            ),
+            409,  # Created concurrently for another service
+        )
+
+    def _ensure_image(self, service: str, service_config: Dict[str, Any], image: str):
+        # The images of services with a `build` section were built by `up`, if necessary
+        if "build" in service_config:
+            return
+        pull_policy = str(service_config.get("pull_policy", "missing"))
+        if pull_policy != "always" and self._get_present_images([image]):
+            return
+        if pull_policy == "never":
+            raise ContainerException(
+                f"'{image}' isn't present and '{service}' sets 'pull_policy: never'."
+            )
+        LOGGER.info("Pulling '%s'...", image)
+        self._request_pull(image)
+
+    def _get_outdated_images(self, containers: Dict[str, Dict[str, Any]]) -> Set[str]:
+        env = get_project_env(self.config)
+        images = {s: get_service_image(self.config, s, env) for s in containers}
+        image_ids = self._get_image_ids([i for i in images.values() if i])
+        outdated = set()
+        for service, container in containers.items():
+            image_id = image_ids.get(images[service], None)
+            if image_id and container.get("ImageID", "") not in ("", image_id):
+                LOGGER.info("The image of '%s' changed.", service)
+                outdated.add(service)
+        return outdated
+
+    def _get_image_ids(self, images: List[str]) -> Dict[str, str]:
+        image_ids = {}
+        for image in images:
+            status, data = self.api.request(
+                "GET", f"/images/{quote(image, safe='')}/json"
+            )
+            if status == 200:
+                image_ids[image] = data["Id"]
+        return image_ids
+
+    def _get_present_images(self, images: List[str]) -> Set[str]:
+        # The engine resolves references by tag and by digest
+        present = set()
+        for image in images:
+            status, _ = self.api.request("GET", f"/images/{quote(image, safe='')}/json")
+            if status == 200:
+                present.add(image)
+        return present
+
+    def _pull_image(self, image: str) -> int:
+        try:
+            self._request_pull(image)
+        except ContainerException as e:
+            LOGGER.error(e)
+            return 1
+        return 0
+
+    def _request_pull(self, image: str):
+        if "@" in image:
+            params = {"fromImage": image}
+        elif ":" in image.rsplit("/", 1)[-1]:
+            name, _, tag = image.rpartition(":")
+            params = {"fromImage": name, "tag": tag}
+        else:
+            params = {"fromImage": image, "tag": "latest"}
+        # Errors that occur while pulling are reported in the (streamed) body
+        data = self._check(self.api.request("POST", "/images/create", params=params))
+        if "errorDetail" in str(data):
+            raise ContainerException(f"Failed to pull '{image}'.")
+
+    def _list_containers(
+        self, services: List[str], all: bool = False
+    ) -> List[Dict[str, Any]]:
+        containers = self._check(
+            self.api.request(
+                "GET",
+                "/containers/json",
+                params={"all": str(all).lower(), **self._filters()},
+            )
+        )
+        return [
+            c
+            for c in containers
+            if c["Labels"].get("com.docker.compose.service") in services
+        ]
+
+    def _filters(self) -> Dict[str, Any]:
+        return {"filters": {"label": [f"com.docker.compose.project={self.project}"]}}
+
+    @staticmethod
+    def _check(response: Tuple[int, Any], *allowed: int) -> Any:
+        status, data = response
+        if status >= 300 and status not in allowed:
+            message = data.get("message", data) if isinstance(data, dict) else data
+            raise ContainerException(f"Docker engine returned {status}: {message}")
+        return data
+
+
+def get_unsupported_fields(service_config: Dict[str, Any]) -> List[str]:
+    """Get the fields of a service that :class:`EngineClient` can't translate to the Engine API.
+
+    Args:
+        service_config (Dict[str, Any]): The definition of the service.
+
+    Returns:
+        List[str]: The unsupported fields, sorted.
+    """
+    fields = {
+        key
+        for key in service_config or {}
+        if key not in SUPPORTED_FIELDS and not key.startswith("x-")
+    }
+    # Only the network names are used, not the per network settings (e.g. aliases or static addresses)
+    networks = (service_config or {}).get("networks", None)
+    if isinstance(networks, dict) and any(networks.values()):
+        fields.add("networks")
+    return sorted(fields)
+
+
+def _to_dict(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return {k: (str(v) if v is not None else None) for k, v in value.items()}
+    result = {}
+    for item in value or []:
+        key, sep, val = str(item).partition("=")
+        result[key] = val if sep else os.environ.get(key, None)
+    return result
+
+
+def _parse_port(port: Any) -> List[Tuple[str, str, str]]:
+    """Parse a port mapping into a host ip, host port and container port for each container port.
+
+    A range of container ports (e.g. ``8000-8010:8000-8010``) is mapped one to one onto a range of host ports of the
+    same length. A single container port may be published on a range of host ports, of which the engine picks one.
+    """
+    if isinstance(port, dict):
+        host_ip = port.get("host_ip", "")
+        host_port = str(port.get("published", "") or "")
+        container_port = str(port["target"])
+        protocol = port.get("protocol", None) or "tcp"
+    else:
+        port, _, protocol = str(port).partition("/")
+        parts = port.rsplit(":", 2)
+        container_port = parts[-1]
+        host_port = parts[-2] if len(parts) > 1 else ""
+        host_ip = parts[-3].strip("[]") if len(parts) > 2 else ""
+
+    container_ports = _parse_port_range(container_port)
+    if len(container_ports) == 1:
+        return [(host_ip, host_port, f"{container_ports[0]}/{protocol or 'tcp'}")]
+    host_ports = _parse_port_range(host_port) if host_port else []
+    if host_ports and len(host_ports) != len(container_ports):
+        raise ContainerException(
+            f"Invalid port mapping '{port}': the host and container port ranges differ in length."
+        )
+    return [
+        (host_ip, str(host_ports[i]) if host_ports else "", f"{p}/{protocol or 'tcp'}")
+        for i, p in enumerate(container_ports)
+    ]
+
+
+def _parse_port_range(ports: str) -> List[int]:
+    match = re.fullmatch(r"(\d+)(?:-(\d+))?", ports.strip())
+    if match is None:
+        raise ContainerException(f"Invalid port '{ports}'.")
+    start = int(match.group(1))
+    end = int(match.group(2) or start)
+    if end < start:
+        raise ContainerException(f"Invalid port range '{ports}'.")
+    return list(range(start, end + 1))
+
+
+def _create_healthcheck(healthcheck: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate the ``healthcheck`` of a service to the ``Healthcheck`` of the Engine API."""
+    if healthcheck.get("disable", False):
+        return {"Test": ["NONE"]}
+
+    result = {}
+    test = healthcheck.get("test", None)
+    if isinstance(test, str):
+        result["Test"] = ["CMD-SHELL", test]
+    elif test is not None:
+        result["Test"] = [str(t) for t in test]
+    for key, result_key in (
+        ("interval", "Interval"),
+        ("timeout", "Timeout"),
+        ("start_period", "StartPeriod"),
+        ("start_interval", "StartInterval"),
+    ):
+        if key in healthcheck:
+            result[result_key] = _parse_duration(healthcheck[key])
+    if "retries" in healthcheck:
+        result["Retries"] = int(healthcheck["retries"])
+    return result
+
+
+def _parse_duration(value: Any) -> int:
+    """Parse a duration like ``1m30s`` (or a number of seconds) into nanoseconds."""
+    if isinstance(value, (int, float)):
+        return int(value * 10**9)
+    units = {"ns": 1, "us": 10**3, "µs": 10**3, "ms": 10**6, "s": 10**9}
+    units.update({"m": 60 * 10**9, "h": 3600 * 10**9})
+    parts = re.findall(r"(\d+(?:\.\d*)?|\.\d+)(ns|us|µs|ms|s|m|h)", str(value))
+    if not parts or "".join(n + u for n, u in parts) != str(value).strip():
+        raise ContainerException(f"Invalid duration '{value}'.")
+    return int(sum(float(n) * units[u] for n, u in parts))
+
+
+def _parse_bytes(value: Any) -> int:
+    match = re.fullmatch(r"\s*(\d+)\s*([kmg]?)b?\s*", str(value).lower())
+    if match is None:
+        raise ContainerException(f"Invalid size '{value}'.")
+    return int(match.group(1)) * 1024 ** " kmg".index(match.group(2) or " ")
+
+
+def _start_exec(
+    api: EngineAPI, exec_id: str, tty: bool
+) -> Tuple[_UnixHTTPConnection, bytes]:
+    """Start an exec instance on a hijacked connection.
+
+    Returns:
+        Tuple[_UnixHTTPConnection, bytes]: The connection and the output that was read along with the response headers.
+    """
+    conn = api.connect_raw()
+    sock = conn.sock
+    body = json.dumps({"Detach": False, "Tty": tty}).encode()
+    request = (
+        f"POST /exec/{exec_id}/start HTTP/1.1\r\n"
+        "Host: docker\r\n"
+        "Content-Type: application/json\r\n"
+        "Connection: Upgrade\r\n"
+        "Upgrade: tcp\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    sock.sendall(request.encode() + body)
+
+    # Read the response headers. Anything after them is already output of the exec instance.
+    response = b""
+    while b"\r\n\r\n" not in response:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+    headers, _, output = response.partition(b"\r\n\r\n")
+    status_line = headers.split(b"\r\n", 1)[0].decode(errors="replace")
+    if not re.match(r"HTTP/1\.[01] (101|200)", status_line):
+        conn.close()
+        raise ContainerException(f"Failed to start exec instance: {status_line}")
+    return conn, output
+
+
+def _read_exec(api: EngineAPI, exec_id: str) -> bytes:
+    """Start an exec instance without a tty and return its stdout once it exits."""
+    conn, data = _start_exec(api, exec_id, False)
+    try:
+        while True:
+            chunk = conn.sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        conn.close()
+    return b"".join(frame for stream, frame in _Demuxer().feed(data) if stream == 1)
+
+
+def _stream_exec(api: EngineAPI, exec_id: str, tty: bool):
+    """Start an exec instance and connect this process' stdin/stdout to it until it exits."""
+    import select
+
+    conn, output = _start_exec(api, exec_id, tty)
+    sock = conn.sock
+
+    old_settings = None
+    if tty:
+        import termios
+        import tty as tty_module
+
+        size = os.get_terminal_size()
+        api.request(
+            "POST",
+            f"/exec/{exec_id}/resize",
+            params={"h": size.lines, "w": size.columns},
+        )
+        old_settings = termios.tcgetattr(0)
+        tty_module.setraw(0)
+
+    # Without a tty, the output is multiplexed with an 8 byte header per frame
+    demuxer = _Demuxer() if not tty else None
+    try:
+        if output:
+            _write_output(output, demuxer)
+        stdin_open = True
+        while True:
+            readers = [sock, 0] if stdin_open else [sock]
+            ready, _, _ = select.select(readers, [], [])
+            if sock in ready:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                _write_output(data, demuxer)
+            if 0 in ready:
+                data = os.read(0, 65536)
+                if data:
+                    sock.sendall(data)
+                else:
+                    stdin_open = False
+                    sock.shutdown(socket.SHUT_WR)
+    finally:
+        if old_settings is not None:
+            import termios
+
+            termios.tcsetattr(0, termios.TCSADRAIN, old_settings)
+        conn.close()
+
+
+class _Demuxer:
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        self._buffer += data
+        frames = []
+        while len(self._buffer) >= 8:
+            stream, size = self._buffer[0], int.from_bytes(self._buffer[4:8], "big")
+            if len(self._buffer) < 8 + size:
+                break
+            frames.append((stream, self._buffer[8 : 8 + size]))
+            self._buffer = self._buffer[8 + size :]
+        return frames
+
+
+def _write_output(data: bytes, demuxer: Optional[_Demuxer]):
+    if demuxer is None:
+        os.write(1, data)
+        return
+    for stream, frame in demuxer.feed(data):
+        os.write(2 if stream == 2 else 1, frame)
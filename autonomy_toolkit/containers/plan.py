@@ -0,0 +1,233 @@
+# SPDX-License-Identifier: MIT
+"""
+Plans the minimal set of actions that bring the containers of the services in line with the resolved config.
+
+Each service in the compose file written by ``atk`` is stamped with the ``dev.atk.config-hash`` label, a digest of
+its interpolated definition (and the top-level networks, volumes, secrets and configs it references, and the
+variables of its ``env_file``). Since the label ends up on the containers, comparing it with the digest of the
+current definition tells whether a container is out of date, without asking ``docker compose`` to recreate it.
+Each service gets one of the following actions:
+
+- ``create``: The service has no container.
+- ``recreate``: The definition changed, or the image was rebuilt or changed since the container was created.
+- ``start``: The container is up to date, but not running.
+- ``no-op``: The container is up to date and running.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.dependencies import get_references
+from autonomy_toolkit.utils.files import read_env_file
+from autonomy_toolkit.utils.interpolation import InterpolationError, interpolate_config
+
+# External imports
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+import hashlib
+import json
+import re
+
+CONFIG_HASH_LABEL = "dev.atk.config-hash"
+"""The label of a service (and its containers) that holds the digest of its resolved definition."""
+
+CREATE = "create"
+RECREATE = "recreate"
+START = "start"
+NOOP = "no-op"
+
+# The arguments of `docker compose up` for each action
+UP_ARGS = {CREATE: [], RECREATE: ["--force-recreate"], START: ["--no-recreate"]}
+
+
+def get_config_hash(
+    config: Dict[str, Any],
+    service: str,
+    env: Optional[Mapping[str, str]] = None,
+    directory: Optional[Union[Path, str]] = None,
+) -> str:
+    """Compute the digest of the resolved definition of a service.
+
+    The ``dev.atk.config-hash`` label itself (and an empty ``labels`` field) is ignored, such that the digest is the
+    same before and after stamping. So are the ``cache_from`` and ``cache_to`` fields of the ``build`` section.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        service (str): The name of the service.
+        env (Optional[Mapping[str, str]]): The variables used to interpolate the definition. If None, the definition
+            isn't interpolated and the ``env_file`` of the service isn't read.
+        directory (Optional[Union[Path, str]]): The directory relative ``env_file`` paths are relative to. Defaults to
+            the current directory.
+
+    Returns:
+        str: The digest.
+    """
+    service_config = dict(config["services"][service] or {})
+    labels = service_config.get("labels", None)
+    if isinstance(labels, dict):
+        service_config["labels"] = {
+            k: v for k, v in labels.items() if k != CONFIG_HASH_LABEL
+        }
+    elif isinstance(labels, list):
+        service_config["labels"] = [
+            label
+            for label in labels
+            if str(label).split("=", 1)[0] != CONFIG_HASH_LABEL
+        ]
+    if not service_config.get("labels", None):
+        service_config.pop("labels", None)
+
+    # Where the build cache is imported from and exported to doesn't affect the container
+    build = service_config.get("build", None)
+    if isinstance(build, dict):
+        service_config["build"] = {
+            k: v for k, v in build.items() if k not in ("cache_from", "cache_to")
+        }
+
+    # Only the referenced resources, such that the digest doesn't depend on which services the config was pruned to
+    shared = {}
+    for field, names in get_references(service_config).items():
+        resources = config.get(field, None)
+        resources = resources if isinstance(resources, dict) else {}
+        shared[field] = {name: resources.get(name, None) for name in sorted(names)}
+
+    content = [service_config, shared]
+    if env is not None:
+        content = _interpolate(content, env)
+        content.append(_read_env_files(content[0], Path(directory or ".")))
+    content = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _interpolate(value: Any, env: Mapping[str, str]) -> Any:
+    try:
+        return interpolate_config(value, env, keep_undefined=True)
+    except InterpolationError:
+        # Invalid templates are reported by `docker compose`. The digest just has to be stable.
+        return value
+
+
+def get_env_files(service_config: Dict[str, Any], directory: Path) -> List[Path]:
+    """Get the ``env_file`` paths of a service.
+
+    Args:
+        service_config (Dict[str, Any]): The (interpolated) definition of the service.
+        directory (Path): The directory relative paths are relative to.
+
+    Returns:
+        List[Path]: The paths.
+    """
+    env_files = service_config.get("env_file", None) or []
+    return [
+        directory / str(env_file["path"] if isinstance(env_file, dict) else env_file)
+        for env_file in ([env_files] if isinstance(env_files, str) else env_files)
+    ]
+
+
+def _read_env_files(service_config: Dict[str, Any], directory: Path) -> Dict[str, str]:
+    environment = {}
+    for env_file in get_env_files(service_config, directory):
+        environment.update(read_env_file(env_file))
+    return environment
+
+
+def stamp_config_hashes(
+    config: Dict[str, Any],
+    env: Optional[Mapping[str, str]] = None,
+    directory: Optional[Union[Path, str]] = None,
+):
+    """Set the ``dev.atk.config-hash`` label of each service in the resolved config.
+
+    Args:
+        config (Dict[str, Any]): The resolved config. Modified in place.
+        env (Optional[Mapping[str, str]]): The variables used to interpolate the config. See :func:`get_config_hash`.
+        directory (Optional[Union[Path, str]]): The directory relative ``env_file`` paths are relative to.
+    """
+    for service, service_config in (config.get("services", None) or {}).items():
+        if service_config is None:
+            service_config = config["services"][service] = {}
+        config_hash = get_config_hash(config, service, env, directory)
+        labels = service_config.setdefault("labels", {})
+        if isinstance(labels, list):
+            labels[:] = [
+                label
+                for label in labels
+                if str(label).split("=", 1)[0] != CONFIG_HASH_LABEL
+            ]
+            labels.append(f"{CONFIG_HASH_LABEL}={config_hash}")
+        else:
+            labels[CONFIG_HASH_LABEL] = config_hash
+
+
+def get_stamped_config_hash(config: Dict[str, Any], service: str) -> str:
+    """Get the ``dev.atk.config-hash`` label stamped on a service by :func:`stamp_config_hashes`.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        service (str): The name of the service.
+
+    Returns:
+        str: The label or, if the service wasn't stamped, the digest of its uninterpolated definition.
+    """
+    labels = (config["services"][service] or {}).get("labels", None) or {}
+    if isinstance(labels, list):
+        labels = dict(str(label).split("=", 1) for label in labels if "=" in str(label))
+    return labels.get(CONFIG_HASH_LABEL, None) or get_config_hash(config, service)
+
+
+def get_container_config_hash(container: Dict[str, Any]) -> Optional[str]:
+    """Get the ``dev.atk.config-hash`` label of a container.
+
+    Args:
+        container (Dict[str, Any]): The container, as listed by ``docker compose ps --format json`` (where the labels
+            are a comma separated string) or the Engine API (where they're a dict).
+
+    Returns:
+        Optional[str]: The label or None if the container doesn't have it.
+    """
+    labels = container.get("Labels", None) or {}
+    if isinstance(labels, dict):
+        return labels.get(CONFIG_HASH_LABEL, None)
+    match = re.search(rf"(?:^|,){re.escape(CONFIG_HASH_LABEL)}=([0-9a-f]+)", labels)
+    return match.group(1) if match else None
+
+
+def plan_services(
+    config: Dict[str, Any],
+    services: List[str],
+    containers: Dict[str, Dict[str, Any]],
+    rebuilt: Iterable[str] = (),
+) -> Dict[str, str]:
+    """Get the action that brings the container of each service in line with the resolved config.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        services (List[str]): The services.
+        containers (Dict[str, Dict[str, Any]]): The container of each service that has one, with its ``State`` and ``Labels``.
+        rebuilt (Iterable[str]): The services whose image was just rebuilt or changed since the container was created.
+
+    Returns:
+        Dict[str, str]: The action of each service, in the order of ``services``.
+    """
+    rebuilt = set(rebuilt)
+    plan = {}
+    for service in services:
+        container = containers.get(service, None)
+        if container is None:
+            plan[service] = CREATE
+            continue
+
+        config_hash = get_stamped_config_hash(config, service)
+        if service in rebuilt or get_container_config_hash(container) != config_hash:
+            plan[service] = RECREATE
+        elif container.get("State", "") != "running":
+            plan[service] = START
+        else:
+            plan[service] = NOOP
+    return plan
+
+
+def format_plan(plan: Dict[str, str]) -> str:
+    """Format a plan as a table of services and actions."""
+    if not plan:
+        return "Nothing to do."
+    width = max(len(s) for s in plan)
+    return "\n".join(f"  {s:<{width}}  {action}" for s, action in plan.items())
@@ -0,0 +1,172 @@
+# SPDX-License-Identifier: MIT
+"""
+Pulls the images of the services that aren't built, before they're brought up.
+
+``docker compose up`` pulls missing images lazily, one after another. Instead, the unique image references of the
+services (and the services they depend on) are collected and pulled concurrently, with a bounded number of workers.
+Images that are already present are skipped: references with a digest (``image@sha256:...``) are matched by digest,
+others by tag. Services with ``pull_policy: always`` are always pulled, those with ``pull_policy: never`` or
+``build`` never.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.files import expand_variables
+from autonomy_toolkit.containers.build_scheduler import normalize_image
+
+# External imports
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Set
+import time
+
+# A function that pulls an image and returns the returncode
+PullImage = Callable[[str], int]
+
+
+@dataclass
+class PullResult:
+    """The result of pulling an image.
+
+    Args:
+        image (str): The normalized image reference.
+        services (List[str]): The services that use the image.
+        status (str): ``pulled``, ``present`` or ``failed``.
+        elapsed (float): The seconds the pull took. 0 if the image was present.
+    """
+
+    image: str
+    services: List[str] = field(default_factory=list)
+    status: str = "present"
+    elapsed: float = 0.0
+
+
+def get_pull_images(
+    config: Dict[str, Any], services: Iterable[str], env: Dict[str, str]
+) -> Dict[str, List[str]]:
+    """Collect the unique images of the services that have an ``image`` but no ``build`` section.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        services (Iterable[str]): The services.
+        env (Dict[str, str]): The variables used to interpolate the image references.
+
+    Returns:
+        Dict[str, List[str]]: The services that use each image, keyed by the normalized image reference.
+    """
+    images: Dict[str, List[str]] = {}
+    for service in services:
+        service_config = config.get("services", {}).get(service, None) or {}
+        if "build" in service_config or not service_config.get("image", None):
+            continue
+        if str(service_config.get("pull_policy", "")) in ("never", "build"):
+            LOGGER.debug("'%s' has 'pull_policy' set. Skipping pull.", service)
+            continue
+        image = normalize_image(expand_variables(str(service_config["image"]), env))
+        images.setdefault(image, []).append(service)
+    return images
+
+
+def get_always_pulled(config: Dict[str, Any], images: Dict[str, List[str]]) -> Set[str]:
+    """Get the images that are pulled even if they're present, i.e. used by a service with ``pull_policy: always``.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        images (Dict[str, List[str]]): The services that use each image. See :func:`get_pull_images`.
+
+    Returns:
+        Set[str]: The images.
+    """
+    services = config.get("services", {})
+    return {
+        image
+        for image, users in images.items()
+        if any(
+            str((services.get(s, None) or {}).get("pull_policy", "")) == "always"
+            for s in users
+        )
+    }
+
+
+def get_digest_reference(image: str) -> str:
+    """Strip the tag of an image reference that has a digest, e.g. ``ubuntu:22.04@sha256:...`` to ``ubuntu@sha256:...``.
+
+    Image ids only list the digests of a repository (``RepoDigests``) without their tags.
+
+    Args:
+        image (str): The normalized image reference.
+
+    Returns:
+        str: The reference without the tag. References without a digest are returned as is.
+    """
+    name, separator, digest = image.partition("@")
+    if not separator:
+        return image
+    repository, _, tag = name.rpartition(":")
+    if repository and "/" not in tag:
+        name = repository
+    return f"{name}@{digest}"
+
+
+def pull_images(
+    pull: PullImage,
+    images: Dict[str, List[str]],
+    present: Set[str],
+    *,
+    jobs: int = 4,
+) -> List[PullResult]:
+    """Pull the images that aren't present, at most ``jobs`` at a time.
+
+    Args:
+        pull (PullImage): Pulls an image and returns the returncode.
+        images (Dict[str, List[str]]): The services that use each image. See :func:`get_pull_images`.
+        present (Set[str]): The images that are skipped.
+        jobs (int): The maximum number of concurrent pulls.
+
+    Returns:
+        List[PullResult]: The result for each image, in the order of ``images``.
+    """
+    results = {image: PullResult(image, services) for image, services in images.items()}
+
+    def pull_image(image: str):
+        LOGGER.info("Pulling '%s'...", image)
+        start = time.perf_counter()
+        returncode = pull(image)
+        results[image].elapsed = time.perf_counter() - start
+        results[image].status = "failed" if returncode else "pulled"
+
+    missing = [image for image in images if image not in present]
+    if missing:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(jobs, len(missing)))
+        ) as executor:
+            for future in [executor.submit(pull_image, i) for i in missing]:
+                future.result()
+
+    return list(results.values())
+
+
+def report_pulls(results: List[PullResult]) -> int:
+    """Log the result of each pull.
+
+    Returns:
+        int: 0 if all images are present or were pulled, 1 otherwise.
+    """
+    returncode = 0
+    for result in results:
+        services = ", ".join(f"'{s}'" for s in result.services)
+        if result.status == "present":
+            LOGGER.info("'%s' (%s) is present. Skipped pull.", result.image, services)
+        elif result.status == "pulled":
+            LOGGER.info(
+                "Pulled '%s' (%s) in %.2fs.", result.image, services, result.elapsed
+            )
+        else:
+            LOGGER.error(
+                "Failed to pull '%s' (%s) after %.2fs.",
+                result.image,
+                services,
+                result.elapsed,
+            )
+            returncode = 1
+    return returncode
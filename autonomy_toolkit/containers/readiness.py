@@ -0,0 +1,146 @@
+# SPDX-License-Identifier: MIT
+"""
+Waits for services to become ready after they were brought up.
+
+A service is ready when its container is running and, if it has a healthcheck (either in the resolved config or in the
+image), when the container is healthy. Containers that exited with returncode 0 (i.e. one-off tasks) are also ready.
+All services are polled together, with exponential backoff between polls.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+import time
+
+# A function that returns the state of the container of each of the passed services
+# Each state is a dict with the (docker inspect style) ``State``, ``Health`` and ``ExitCode`` keys
+GetStates = Callable[[List[str]], Dict[str, Dict[str, Any]]]
+
+
+@dataclass
+class ServiceReadiness:
+    """The result of waiting for a service.
+
+    Args:
+        service (str): The name of the service.
+        status (str): ``ready``, ``failed`` or ``timeout``.
+        elapsed (float): The seconds it took to reach the status.
+        state (str): The last seen container state (e.g. ``running``).
+        health (str): The last seen container health (e.g. ``healthy``). Empty if there is no healthcheck.
+    """
+
+    service: str
+    status: str
+    elapsed: float
+    state: str = ""
+    health: str = ""
+
+
+def has_healthcheck(service_config: dict) -> bool:
+    """Whether the service defines an enabled healthcheck in the config."""
+    healthcheck = service_config.get("healthcheck", None)
+    if not isinstance(healthcheck, dict) or healthcheck.get("disable", False):
+        return False
+    test = healthcheck.get("test", None)
+    return test not in (None, "NONE", ["NONE"])
+
+
+def wait_for_services(
+    get_states: GetStates,
+    services: List[str],
+    healthchecks: List[str],
+    *,
+    timeout: float = 120.0,
+    min_interval: float = 0.1,
+    max_interval: float = 2.0,
+) -> List[ServiceReadiness]:
+    """Poll the services until all of them are ready, failed or the timeout is reached.
+
+    Args:
+        get_states (GetStates): Returns the state of the container of each of the passed services.
+        services (List[str]): The services to wait for.
+        healthchecks (List[str]): The services that have a healthcheck in the config. These must become healthy.
+        timeout (float): The maximum number of seconds to wait for all services.
+        min_interval (float): The initial number of seconds between polls.
+        max_interval (float): The maximum number of seconds between polls.
+
+    Returns:
+        List[ServiceReadiness]: The result for each service, in the order of ``services``.
+    """
+    start = time.perf_counter()
+    results: Dict[str, ServiceReadiness] = {}
+    last_seen: Dict[str, Tuple[str, str]] = {}
+    interval = min_interval
+
+    while True:
+        pending = [s for s in services if s not in results]
+        elapsed = time.perf_counter() - start
+        if not pending:
+            break
+        if elapsed > timeout:
+            for service in pending:
+                state, health = last_seen.get(service, ("", ""))
+                results[service] = ServiceReadiness(
+                    service, "timeout", elapsed, state, health
+                )
+            break
+
+        states = get_states(pending)
+        elapsed = time.perf_counter() - start
+        for service in pending:
+            container = states.get(service, None) or {}
+            state = str(container.get("State", "")).lower()
+            health = str(container.get("Health", "") or "").lower()
+            last_seen[service] = (state, health)
+
+            status = None
+            if state == "exited" and not container.get("ExitCode", 1):
+                status = "ready"
+            elif state in ("exited", "dead") or health == "unhealthy":
+                status = "failed"
+            elif state == "running":
+                if health == "healthy" or (
+                    health == "" and service not in healthchecks
+                ):
+                    status = "ready"
+            if status is not None:
+                LOGGER.debug("'%s' is %s after %.2fs.", service, status, elapsed)
+                results[service] = ServiceReadiness(
+                    service, status, elapsed, state, health
+                )
+
+        if len(results) < len(services):
+            time.sleep(min(interval, max(0.0, timeout - elapsed)))
+            interval = min(interval * 1.5, max_interval)
+
+    return [results[service] for service in services]
+
+
+def report_readiness(results: List[ServiceReadiness]) -> int:
+    """Print the time each service took to become ready. Services that failed or timed out are logged as errors.
+
+    Returns:
+        int: 0 if all services are ready, 1 otherwise.
+    """
+    returncode = 0
+    for result in results:
+        description = result.state or "not created"
+        if result.health:
+            description += f", {result.health}"
+        if result.status == "ready":
+            print(
+                f"'{result.service}' is ready ({description}) after {result.elapsed:.2f}s."
+            )
+        else:
+            LOGGER.error(
+                "'%s' %s (%s) after %.2fs.",
+                result.service,
+                "timed out" if result.status == "timeout" else "failed",
+                description,
+                result.elapsed,
+            )
+            returncode = 1
+    return returncode
@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: MIT
+"""
+Caches the login shell of the user in a container, such that ``atk dev --attach`` can execute it directly.
+
+The shell is detected once per image (and user) by reading ``/etc/passwd`` in the container and stored in
+``$ATK_CACHE_DIR/shells.json``, keyed by the image ID. Since the ID is the digest of the image, a rebuilt image is
+detected again. Detection is skipped entirely if the shell is set with the ``x-atk-shell`` field, either at the root
+of the ``atk.yml`` file or in a service (which takes precedence):
+
+.. highlight:: yaml
+.. code-block:: yaml
+
+    x-atk-shell: /bin/bash
+
+    services:
+      dev:
+        x-atk-shell: [/bin/zsh, -l]
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.cache import get_cache_dir
+from autonomy_toolkit.utils.locks import file_lock
+
+# External imports
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import os
+import re
+import shlex
+
+SHELL_KEY = "x-atk-shell"
+"""The key in the ``atk.yml`` file (or a service) that overrides the shell."""
+
+# Prints the login shell of the current user in the container
+DETECT_SHELL_CMD = "awk -F: -v user=\"$(whoami)\" '$1 == user {print $NF}' /etc/passwd"
+
+# Detects and executes the login shell in one go. Used if the shell can't be cached.
+FALLBACK_SHELL_CMD = ["sh", "-c", f"($({DETECT_SHELL_CMD}) || true)"]
+
+# The maximum number of cached shells
+MAX_CACHED_SHELLS = 256
+
+
+def get_shell_override(config: Dict[str, Any], service: str) -> Optional[List[str]]:
+    """Get the shell set with ``x-atk-shell`` for a service.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        service (str): The name of the service.
+
+    Returns:
+        Optional[List[str]]: The command to execute the shell or None if it isn't set.
+    """
+    service_config = config.get("services", {}).get(service, None) or {}
+    shell = service_config.get(SHELL_KEY, config.get(SHELL_KEY, None))
+    if not shell:
+        return None
+    return shlex.split(shell) if isinstance(shell, str) else [str(s) for s in shell]
+
+
+def is_valid_shell(shell: str) -> bool:
+    """Whether a detected shell can be cached, i.e. it's an absolute path to a shell that allows logging in."""
+    return re.fullmatch(r"/\S+", shell) is not None and os.path.basename(shell) not in (
+        "nologin",
+        "false",
+    )
+
+
+class ShellCache:
+    """Stores the detected shells in a json file.
+
+    Args:
+        filename (Optional[Path]): The json file. Defaults to ``shells.json`` in the cache directory.
+    """
+
+    def __init__(self, filename: Optional[Path] = None):
+        self.filename = Path(filename or get_cache_dir() / "shells.json")
+
+        self._shells = self._read()
+
+    def get(self, image_id: str, user: str = "") -> Optional[str]:
+        """Get the cached shell for an image and user, or None if it isn't cached."""
+        return self._shells.get(self._key(image_id, user), None)
+
+    def set(self, image_id: str, user: str, shell: str):
+        """Cache the shell for an image and user and save the cache to disk."""
+        key = self._key(image_id, user)
+
+        # Other processes may have cached shells since the file was read, so it's re-read under the lock
+        try:
+            with file_lock(self.filename.with_name(f"{self.filename.name}.lock")):
+                self._shells = self._read()
+                self._shells.pop(key, None)
+                self._shells[key] = shell
+
+                # Drop the oldest entries, dicts are ordered by insertion
+                for stale_key in list(self._shells)[:-MAX_CACHED_SHELLS]:
+                    del self._shells[stale_key]
+
+                temp_filename = self.filename.with_name(
+                    f".{self.filename.name}.{os.getpid()}.tmp"
+                )
+                temp_filename.write_text(json.dumps(self._shells, indent=4))
+                os.replace(temp_filename, self.filename)
+        except OSError as e:
+            LOGGER.warn("Failed to save the shell cache: %s", e)
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            return json.loads(self.filename.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _key(image_id: str, user: str) -> str:
+        return f"{image_id}/{user}" if user else image_id
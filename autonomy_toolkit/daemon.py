@@ -0,0 +1,372 @@
+# Imports from atk
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+import contextlib
+import io
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+
+# The number of seconds to wait for the daemon to start listening
+_START_TIMEOUT = 10.0
+
+# The number of seconds a client may take to send its request
+_REQUEST_TIMEOUT = 5.0
+
+
+class _Daemon:
+    """Accepts requests on the unix socket and runs each command in a forked process.
+
+    The daemon is single-threaded, such that it's safe to fork. Before forking, the config of ``atk dev`` commands
+    is resolved in the daemon itself and kept in memory (see :attr:`ATKConfig.keep_in_memory`), keyed by the path
+    of the ``atk.yml`` file and the contents of all the files it depends on. The forked process inherits the resolved
+    configs, the imported modules and the parsed ``atk.yml`` files, so it only has to check the digest of the files.
+    An entry is replaced as soon as one of its files changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.requests = 0
+        self.running = True
+
+    def serve(self) -> bool:
+        # Import everything the commands need once, so the forked processes don't have to
+        import autonomy_toolkit._atk_base as atk_base
+        import autonomy_toolkit.dev  # noqa: F401
+        from autonomy_toolkit.utils.atk_config import ATKConfig
+        from autonomy_toolkit.containers.docker_client import DockerClient  # noqa: F401
+        from autonomy_toolkit.containers.engine_client import EngineClient  # noqa: F401
+
+        ATKConfig.keep_in_memory = True
+        self._atk_base = atk_base
+
+        # Only the current user may connect
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(str(self.path))
+        except OSError as e:
+            LOGGER.fatal("Failed to listen on '%s': %s", self.path, e)
+            return False
+        finally:
+            os.umask(umask)
+        server.listen(16)
+        LOGGER.info("Listening on '%s' (pid %s).", self.path, os.getpid())
+
+        signal.signal(signal.SIGTERM, lambda sig, frame: self.stop())
+        try:
+            while self.running:
+                readable, _, _ = select.select([server], [], [], 1.0)
+                if readable:
+                    conn, _ = server.accept()
+                    with conn:
+                        self._handle(server, conn)
+                self._reap()
+        finally:
+            server.close()
+            self.path.unlink(missing_ok=True)
+            LOGGER.info("Stopped the daemon.")
+        return True
+
+    def stop(self):
+        self.running = False
+
+    def _reap(self):
+        # Collect the forked processes that exited
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+    def _handle(self, server: socket.socket, conn: socket.socket):
+        from autonomy_toolkit import __version__
+        from autonomy_toolkit.utils.daemon_client import send_message, recv_message
+        from autonomy_toolkit.utils.atk_config import _RESOLVED_CONFIGS
+
+        conn.settimeout(_REQUEST_TIMEOUT)
+        fds = []
+        try:
+            if not self._is_same_user(conn):
+                LOGGER.warn("Rejected a connection from another user.")
+                return
+
+            request, fds = recv_message(conn, max_fds=3)
+            if request is None:
+                return
+            op = request.get("op", None)
+            LOGGER.debug("Received a '%s' request.", op)
+
+            if op == "status":
+                send_message(
+                    conn,
+                    {
+                        "pid": os.getpid(),
+                        "version": __version__,
+                        "uptime": time.time() - self.started,
+                        "requests": self.requests,
+                        "configs": len(_RESOLVED_CONFIGS),
+                    },
+                )
+            elif op == "stop":
+                send_message(conn, {"pid": os.getpid()})
+                self.stop()
+            elif op == "run":
+                if (
+                    request.get("version", None) != __version__
+                    or len(fds) != 3
+                    or not self._can_run(request["argv"])
+                ):
+                    send_message(conn, {"fallback": True})
+                    return
+                self.requests += 1
+                self._warm(request)
+                self._fork(server, conn, request, fds)
+        except (OSError, ValueError, KeyError) as e:
+            LOGGER.warn("Failed to handle a request: %s", e)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _is_same_user(self, conn: socket.socket) -> bool:
+        if not hasattr(socket, "SO_PEERCRED"):
+            # The socket is only accessible by the current user anyways
+            return True
+        creds = conn.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def _parse(self, argv):
+        # Parse quietly, the forked process will report errors to the client
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+                io.StringIO()
+            ):
+                parser = self._atk_base._init(argv)
+                args, unknown = parser.parse_known_args(argv)
+        except SystemExit:
+            return None
+        args._unknown_args = unknown
+        return args
+
+    def _can_run(self, argv) -> bool:
+        import autonomy_toolkit.dev as dev
+        from autonomy_toolkit.containers.docker_client import INTERACTIVE_COMMANDS
+
+        # Only `atk dev` benefits from the daemon. Commands that attach to a container need the controlling terminal
+        # of the client, so they're run in-process.
+        args = self._parse(argv)
+        if args is None:
+            return True
+        if args.cmd is not dev._run_dev:
+            return False
+        return not args.attach and args.command not in INTERACTIVE_COMMANDS
+
+    def _warm(self, request):
+        import autonomy_toolkit.dev as dev
+        from autonomy_toolkit.utils.atk_config import ATKConfig
+        from autonomy_toolkit.containers.docker_client import DockerClient
+
+        args = self._parse(request["argv"])
+        if (
+            args is None
+            or args.cmd is not dev._run_dev
+            or args.dry_run
+            or args.no_config_cache
+            or args.invalidate_config_cache
+        ):
+            return
+
+        # Resolve the config in the environment of the client
+        cwd, environ = os.getcwd(), dict(os.environ)
+        try:
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+
+            start = time.perf_counter()
+            config = ATKConfig(args.filename_override, args.services)
+            opts = args.compose_opts + args._unknown_args
+            client = DockerClient(config, dry_run=False, opts=opts)
+            if config.load(client, opts):
+                LOGGER.info(
+                    "Resolved the config of '%s' in %.3fs (cache %s).",
+                    config.atk_yml_path,
+                    time.perf_counter() - start,
+                    "hit" if config.cache_hit else "miss",
+                )
+        except Exception as e:
+            LOGGER.debug("Failed to resolve the config: %s", e)
+        finally:
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def _fork(self, server: socket.socket, conn: socket.socket, request, fds):
+        from autonomy_toolkit import _signal_handler
+        from autonomy_toolkit.utils.daemon_client import send_message
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return
+
+        # In the forked process. Never return to the accept loop.
+        returncode = 1
+        try:
+            server.close()
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, _signal_handler)
+
+            # Use the standard streams, working directory and environment of the client
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            os.chdir(request["cwd"])
+            os.environ.clear()
+            os.environ.update(request["env"])
+            send_message(conn, {"pid": os.getpid()})
+
+            conn.settimeout(None)
+            returncode = 0
+            try:
+                self._atk_base._run(request["argv"])
+            except SystemExit as e:
+                returncode = (
+                    e.code if isinstance(e.code, int) else int(e.code is not None)
+                )
+            except Exception as e:
+                LOGGER.fatal(e)
+                returncode = 1
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send_message(conn, {"returncode": returncode})
+        finally:
+            os._exit(returncode)
+
+
+def _start(args) -> bool:
+    from autonomy_toolkit.utils.daemon_client import connect, get_socket_path
+
+    path = get_socket_path()
+    sock = connect()
+    if sock is not None:
+        sock.close()
+        LOGGER.error("The daemon is already running ('%s').", path)
+        return False
+
+    if args.foreground:
+        return _Daemon(path).serve()
+
+    from autonomy_toolkit.utils.cache import get_cache_dir
+
+    log_file = get_cache_dir("daemon") / "daemon.log"
+
+    # Detach from the terminal by forking twice
+    pid = os.fork()
+    if pid == 0:
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+
+        with open(os.devnull, "rb") as devnull, open(log_file, "ab") as log:
+            os.dup2(devnull.fileno(), 0)
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+        os._exit(0 if _Daemon(path).serve() else 1)
+    os.waitpid(pid, 0)
+
+    # Wait until the daemon listens
+    deadline = time.perf_counter() + _START_TIMEOUT
+    while time.perf_counter() < deadline:
+        sock = connect()
+        if sock is not None:
+            sock.close()
+            print(f"Started the daemon ('{path}'). Logs are written to '{log_file}'.")
+            return True
+        time.sleep(0.05)
+
+    LOGGER.error("The daemon did not start. See '%s'.", log_file)
+    return False
+
+
+def _request(op: str):
+    from autonomy_toolkit.utils.daemon_client import connect, send_message, recv_message
+
+    sock = connect()
+    if sock is None:
+        return None
+    with sock:
+        try:
+            send_message(sock, {"op": op})
+            reply, _ = recv_message(sock)
+        except OSError as e:
+            LOGGER.error("Failed to reach the daemon: %s", e)
+            return None
+    return reply
+
+
+def _stop(args) -> bool:
+    reply = _request("stop")
+    if reply is None:
+        LOGGER.error("The daemon is not running.")
+        return False
+    print(f"Stopped the daemon (pid {reply['pid']}).")
+    return True
+
+
+def _status(args) -> bool:
+    from autonomy_toolkit.utils.daemon_client import get_socket_path
+
+    reply = _request("status")
+    if reply is None:
+        print("The daemon is not running.")
+        return False
+    print(f"socket:   {get_socket_path()}")
+    print(f"pid:      {reply['pid']}")
+    print(f"version:  {reply['version']}")
+    print(f"uptime:   {reply['uptime']:.0f}s")
+    print(f"requests: {reply['requests']}")
+    print(f"configs:  {reply['configs']}")
+    return True
+
+
+def _run_daemon(args):
+    LOGGER.info("Running 'daemon' entrypoint...")
+
+    action = {"start": _start, "stop": _stop, "status": _status}[args.action]
+    if not action(args):
+        return False
+
+    LOGGER.info("Finished running 'daemon' entrypoint.")
+
+
+def _init(subparser):
+    LOGGER.debug("Initializing 'daemon' entrypoint...")
+
+    subparser.add_argument(
+        "action",
+        choices=["start", "stop", "status"],
+        help="Start the daemon, stop it or show its status. While the daemon is running, `atk` commands are forwarded to it, unless $ATK_NO_DAEMON is set.",
+    )
+    subparser.add_argument(
+        "--foreground",
+        action="store_true",
+        help="Don't detach from the terminal when starting the daemon.",
+        default=False,
+    )
+
+    subparser.set_defaults(cmd=_run_daemon)
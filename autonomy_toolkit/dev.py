@@ -1,21 +1,27 @@
 # Imports from atk
+# NOTE: The config and container modules pull in heavy dependencies (yaml, etc.), so they're
+# imported in `_load` to keep `atk dev --help` fast.
 from autonomy_toolkit.utils.logger import LOGGER
-from autonomy_toolkit.utils.atk_config import ATKConfig
-from autonomy_toolkit.containers.docker_client import DockerClient
+from autonomy_toolkit.utils.profiler import PROFILER
 
 # External imports
 import inspect
+import os
 from functools import partial
+from typing import Optional
 
 
 def _run_cmd(client, cmd, num_required_services=-1):
     if num_required_services >= 0 and num_required_services != len(client.services):
         LOGGER.fatal(
-            f"The command '{cmd}' requires {num_required_services} service(s). You provided {len(client.services)}."
+            "The command '%s' requires %d service(s). You provided %d.",
+            cmd,
+            num_required_services,
+            len(client.services),
         )
         return False
 
-    LOGGER.info(f"Running '{cmd}'...")
+    LOGGER.info("Running '%s'...", cmd)
     try:
         method = getattr(client, cmd)
         if not inspect.ismethod(method):
@@ -23,54 +29,147 @@ def _run_cmd(client, cmd, num_required_services=-1):
     except AttributeError:
         method = partial(client.run_cmd, cmd)
 
-    if returncode := method():
-        LOGGER.fatal(f"Failed to run '{cmd}' with returncode {returncode}.")
+    with PROFILER.span(cmd, services=" ".join(client.services)):
+        returncode = method()
+    if returncode:
+        LOGGER.fatal("Failed to run '%s' with returncode %s.", cmd, returncode)
         return False
 
-    LOGGER.info(f"Finished running '{cmd}'.")
+    LOGGER.info("Finished running '%s'.", cmd)
     return True
 
 
-def _run_dev(args):
-    LOGGER.info("Running 'dev' entrypoint...")
+def _create_client(args, config):
+    """Create the docker client for the passed `dev` arguments and config.
 
-    # Find the atk.yml file
-    try:
-        config = ATKConfig(args.filename_override, args.services)
-    except Exception as e:
-        LOGGER.fatal(e)
-        return False
+    The unknown arguments are passed on to `docker compose`, so they're added to `args.compose_opts`.
+
+    Returns:
+        DockerClient: The client.
+    """
+    with PROFILER.span("import"):
+        from autonomy_toolkit.containers.docker_client import DockerClient
+        from autonomy_toolkit.containers.engine_client import EngineClient
 
-    # Create the docker client
     args.compose_opts.extend(args._unknown_args)
-    client = DockerClient(
+    client_cls = EngineClient if args.backend == "engine" else DockerClient
+    return client_cls(
         config,
         dry_run=args.dry_run,
         opts=args.compose_opts,
         args=args.compose_args,
+        jobs=args.jobs,
+        force_build=args.force_build,
+        wait=not args.no_wait,
+        wait_timeout=args.wait_timeout,
+        pull_jobs=args.pull_jobs,
     )
 
+
+def _load(args, *, compose_file: Optional[str] = None):
+    """Create the config and the client for the passed `dev` arguments, then load, update and write the config.
+
+    Each set of services, optionals and compose options gets its own compose file (see `get_compose_file_name`),
+    unless `compose_file` is passed. Stale compose files of the project are removed afterwards.
+
+    Returns:
+        DockerClient: The client or None if an error occurred.
+    """
+    with PROFILER.span("import"):
+        from autonomy_toolkit.utils.atk_config import ATKConfig, get_compose_file_name
+        from autonomy_toolkit.containers.plan import stamp_config_hashes
+        from autonomy_toolkit.containers.build_cache import get_build_cache
+        from autonomy_toolkit.containers.build_scheduler import (
+            get_project_env,
+            get_project_name,
+        )
+
+    # Find the atk.yml file
+    build_cache = os.path.abspath(args.build_cache) if args.build_cache else None
+    if compose_file is None:
+        opts = args.compose_opts + args._unknown_args
+        variant = "no-build-cache" if args.no_build_cache else build_cache or ""
+        compose_file = get_compose_file_name(
+            args.services, args.optionals, opts, variant
+        )
+    try:
+        config = ATKConfig(
+            args.filename_override, args.services, compose_file=compose_file
+        )
+    except Exception as e:
+        LOGGER.fatal(e)
+        return None
+
+    # Create the docker client
+    client = _create_client(args, config)
+
+    # Invalidate the resolved config cache, if desired
+    if args.invalidate_config_cache:
+        config.invalidate_cache()
+
     # Load the config with the docker client before updating the services
-    if not config.load(client, args.compose_opts):
-        return False
+    if not config.load(client, args.compose_opts, use_cache=not args.no_config_cache):
+        return None
+    if not config.resolved_in_process:
+        LOGGER.info("Config cache %s.", "hit" if config.cache_hit else "miss")
 
     # Update the config with optionals
     if not config.update_services_with_optionals(args.optionals):
-        return False
+        return None
+
+    # Only keep the services that are used
+    config.prune()
+
+    # Import and export the layers of the builds from and to the build cache, if enabled
+    if not args.no_build_cache:
+        try:
+            client.build_cache = get_build_cache(
+                config,
+                directory=build_cache,
+                max_size=args.build_cache_max_size,
+            )
+        except ValueError as e:
+            LOGGER.fatal(e)
+            return None
+        if client.build_cache is not None:
+            client.build_cache.inject(config.config, get_project_name(config))
+
+    # Label the services with the digest of their definition, such that out of date containers can be found
+    stamp_config_hashes(
+        config.config, get_project_env(config), config.atk_yml_path.parent
+    )
 
     # Write the new configuration file
     if not config.write():
-        return False
+        return None
+    if config.written:
+        LOGGER.info("Wrote '%s'.", config.compose_file)
+    else:
+        LOGGER.info("'%s' is unchanged. Skipped writing it.", config.compose_file)
+    config.remove_stale_compose_files()
 
-    # Run the commands
-    # Will do in this order: down, build, up, attach
+    return client
+
+
+def _run_cmds(client, args) -> bool:
+    """Run the commands selected by the passed `dev` arguments.
+
+    Will do in this order: down, pull, build, up, attach, command
+
+    Unless `--no-plan` is passed, `up` only acts on the services whose containers are out of date (see
+    `DockerClient.apply`). After an explicit `down`, that's all of them.
+    """
+    plan = args.up and not args.no_plan
     if args.down and not _run_cmd(client, "down"):
         return False
 
+    if args.pull and not _run_cmd(client, "pull_images"):
+        return False
+
     if args.build and not _run_cmd(client, "build"):
         return False
 
-    if args.up and not _run_cmd(client, "up"):
+    if args.up and not _run_cmd(client, "apply" if plan else "up"):
         return False
 
     if args.attach and not _run_cmd(client, "attach", 1):
@@ -79,9 +178,168 @@ def _run_dev(args):
     if args.command and not _run_cmd(client, args.command, 1):
         return False
 
+    return True
+
+
+def _run_dev(args):
+    if args.profile:
+        PROFILER.enable()
+
+    try:
+        with PROFILER.span("dev"):
+            if not _dev(args):
+                return False
+    finally:
+        if args.profile:
+            _report_profile(args.profile)
+
     LOGGER.info("Finished running 'dev' entrypoint.")
 
 
+def _dev(args) -> bool:
+    LOGGER.info("Running 'dev' entrypoint...")
+
+    if args.watch and (args.attach or args.command):
+        LOGGER.fatal("'--watch' can't be combined with '--attach' or '--cmd'.")
+        return False
+
+    with PROFILER.span("load"):
+        client = _load(args)
+    if client is None:
+        return False
+
+    # Run the commands
+    if not _run_cmds(client, args) and not args.watch:
+        return False
+
+    if args.watch:
+        return _watch(client, args)
+    return True
+
+
+def _watch(client, args) -> bool:
+    """Watch the files the config depends on and the build contexts of the services until interrupted.
+
+    After a burst of changes, the config is reloaded and compared with the previous one. Only the services whose
+    interpolated definition (including their env files) or build fingerprint changed are rebuilt (if ``--build`` is
+    passed) and recreated (if ``--up`` is passed).
+    """
+    import argparse
+    from autonomy_toolkit.utils.interpolation import (
+        InterpolationError,
+        interpolate_config,
+    )
+    from autonomy_toolkit.utils.watcher import Watcher, diff_services, stat_files
+    from autonomy_toolkit.containers.build_fingerprint import (
+        ContextCache,
+        compute_fingerprint,
+    )
+    from autonomy_toolkit.containers.build_scheduler import get_project_env
+    from autonomy_toolkit.containers.plan import get_env_files
+
+    # The compose options already include the unknown args, see `_load`
+    load_args = argparse.Namespace(**vars(args))
+    load_args._unknown_args = []
+    load_args.invalidate_config_cache = False
+
+    # The build contexts are walked on every snapshot. Unchanged directories don't have to be listed again.
+    context_cache = ContextCache()
+
+    def get_fingerprints(client):
+        config, env = client.config, get_project_env(client.config)
+        services = config.config.get("services", {})
+        return {
+            s: compute_fingerprint(config, s, env, context_cache)
+            for s in client.services
+            if "build" in services.get(s, {})
+        }
+
+    def get_definitions(client):
+        # Interpolated, such that edits of the env files are detected. The `dev.atk.config-hash` label stamped on
+        # each service covers the variables of its `env_file`, too.
+        try:
+            return interpolate_config(
+                client.config.config,
+                get_project_env(client.config),
+                keep_undefined=True,
+            )
+        except InterpolationError:
+            return client.config.config
+
+    def get_snapshot(client):
+        files = client.config.get_dependent_files(args.compose_opts)
+        definitions = get_definitions(client)
+        for service in client.services:
+            service_config = definitions.get("services", {}).get(service, None) or {}
+            files.extend(
+                get_env_files(service_config, client.config.atk_yml_path.parent)
+            )
+
+        def snapshot():
+            tokens = stat_files(files)
+            for service, fingerprint in get_fingerprints(client).items():
+                tokens[f"build context of '{service}'"] = fingerprint
+            return tokens
+
+        return snapshot
+
+    watcher = Watcher(
+        get_snapshot(client), interval=args.watch_interval, debounce=args.watch_debounce
+    )
+    definitions = get_definitions(client)
+    fingerprints = get_fingerprints(client)
+    print(f"Watching for changes to {client.services}. Press ctrl+c to stop.")
+    while True:
+        changed = watcher.wait()
+        print(f"Detected changes to {', '.join(sorted(changed))}.")
+
+        # Reload the config. If it's invalid, keep the previous state and wait for the next change.
+        new_client = _load(argparse.Namespace(**vars(load_args)))
+        if new_client is None:
+            LOGGER.error("Failed to reload the config. Waiting for the next change...")
+            continue
+        client = new_client
+        watcher.reset(get_snapshot(client))
+
+        new_definitions = get_definitions(client)
+        services = diff_services(definitions, new_definitions, client.services)
+        new_fingerprints = get_fingerprints(client)
+        rebuild = [
+            s for s in new_fingerprints if new_fingerprints[s] != fingerprints.get(s)
+        ]
+        definitions, fingerprints = new_definitions, new_fingerprints
+        LOGGER.info("Changed definitions: %s. Changed builds: %s.", services, rebuild)
+
+        if args.build and rebuild:
+            if not _run_cmd(client.with_services(rebuild), "build"):
+                continue
+
+        # Rebuilt images require the containers to be recreated, even if their definition is unchanged
+        if args.up:
+            recreate = [s for s in client.services if s in rebuild and args.build]
+            services = [s for s in services if s not in recreate]
+            if recreate:
+                recreate_client = client.with_services(recreate)
+                recreate_client._args.append("--force-recreate")
+                _run_cmd(recreate_client, "up")
+            if services:
+                _run_cmd(client.with_services(services), "up")
+
+        if not services and not (args.build and rebuild):
+            print("No services are affected by the changes.")
+        else:
+            print("Finished updating. Waiting for the next change...")
+
+
+def _report_profile(filename: str):
+    print(PROFILER.format_table())
+    try:
+        PROFILER.write_trace(filename)
+        print(f"Wrote the profile to '{filename}'.")
+    except OSError as e:
+        LOGGER.error("Failed to write the profile to '%s': %s", filename, e)
+
+
 def _init(subparser):
     LOGGER.debug("Initializing 'dev' entrypoint...")
 
@@ -98,6 +356,49 @@ def _init(subparser):
     subparser.add_argument(
         "-b", "--build", action="store_true", help="Build the image(s).", default=False
     )
+    subparser.add_argument(
+        "--force-build",
+        action="store_true",
+        help="Build the image(s) even if the build fingerprint (i.e. the `build` section, the Dockerfile and the build context) of a service is unchanged since its last successful build.",
+        default=False,
+    )
+    subparser.add_argument(
+        "--build-cache",
+        metavar="DIR",
+        help="Import and export the build cache of each service from and to a subdirectory of this directory (as `type=local` `cache_from` and `cache_to` entries), such that builds on different machines or checkouts that share a disk reuse each other's layers. Overrides `x-atk-build-cache`. Requires a BuildKit builder that supports cache export (e.g. the `docker-container` driver). See `atk build-cache`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--build-cache-max-size",
+        metavar="SIZE",
+        help="The maximum size of the build cache directory (e.g. `20G`). After building, the least recently used caches are evicted until it's no larger. Overrides the `max_size` of `x-atk-build-cache`. Defaults to 10G.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--no-build-cache",
+        action="store_true",
+        help="Don't use the build cache, even if `x-atk-build-cache` is set.",
+        default=False,
+    )
+    subparser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The maximum number of services to build concurrently. If greater than 1, each service is built separately and services that don't depend on each other (through their Dockerfile's `FROM` lines) are built in parallel. Defaults to 1, which leaves the scheduling to `docker compose build`.",
+        default=1,
+    )
+    subparser.add_argument(
+        "--pull",
+        action="store_true",
+        help="Pull the images of the services (and the services they depend on) that have an `image` but no `build` section, after `x-optionals` are applied. Unique images are pulled concurrently and images that are already present (by digest, for `image@sha256:...` references) are skipped, unless a service sets `pull_policy: always`. The time each pull took is logged. With `--dry-run`, the images are printed.",
+        default=False,
+    )
+    subparser.add_argument(
+        "--pull-jobs",
+        type=int,
+        help="The maximum number of images to pull concurrently with `--pull`. Defaults to 4.",
+        default=4,
+    )
     subparser.add_argument(
         "-u",
         "--up",
@@ -105,6 +406,24 @@ def _init(subparser):
         help="Spin up the container(s).",
         default=False,
     )
+    subparser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="Don't wait for the container(s) to be running (or healthy, if they have a `healthcheck`) after spinning them up.",
+        default=False,
+    )
+    subparser.add_argument(
+        "--wait-timeout",
+        type=float,
+        help="The maximum number of seconds to wait for the container(s) to be ready after spinning them up. Defaults to 120.",
+        default=120.0,
+    )
+    subparser.add_argument(
+        "--no-plan",
+        action="store_true",
+        help="Always run `--up` for all services. By default, the containers are compared with the resolved config (through the `dev.atk.config-hash` label) and only the services (and the services they depend on) whose containers are missing, out of date, rebuilt or whose image changed are (re)created, and stopped ones are started. With `--dry-run`, the plan is printed.",
+        default=False,
+    )
     subparser.add_argument(
         "-d",
         "--down",
@@ -127,11 +446,55 @@ def _init(subparser):
         help="A tool to circumvent the atk interface and directly run a docker compose command. Example: `atk dev -c config -s dev` is equivalent to `docker compose -f <path-in-parent>/atk.yml config dev`.",
         default=None,
     )
+    subparser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="After running the other commands, watch the ATK config file, the files it depends on (includes, env files) and the build contexts of the services. On changes, the compose file is regenerated and only the services whose definition or build context changed are rebuilt (with `--build`) and recreated (with `--up`). Runs until interrupted.",
+        default=False,
+    )
+    subparser.add_argument(
+        "--watch-interval",
+        type=float,
+        help="The number of seconds between polls for changes in `--watch` mode. Defaults to 0.5.",
+        default=0.5,
+    )
+    subparser.add_argument(
+        "--watch-debounce",
+        type=float,
+        help="The number of seconds without further changes to wait for before updating in `--watch` mode, such that a burst of edits causes a single update. Defaults to 0.5.",
+        default=0.5,
+    )
     subparser.add_argument(
         "--filename-override",
         help="Override the default ATK config filename. Will search upwards for file. Defaults to 'atk.yml'",
         default="atk.yml",
     )
+    subparser.add_argument(
+        "--profile",
+        nargs="?",
+        const="atk-profile.json",
+        help="Time each phase (config discovery, loading, writing, down/build/up, every `docker` command, etc.). Prints a table and writes a JSON Chrome trace (viewable at `chrome://tracing`) to the passed file. Defaults to `atk-profile.json`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--backend",
+        choices=["compose", "engine"],
+        help="The container backend to use. `compose` forks `docker compose` for each command. `engine` talks to the Docker Engine API over its unix socket for `down`, `up` and `attach` (respecting `DOCKER_HOST`) and falls back to `docker compose` for everything else. Defaults to `compose`.",
+        default="compose",
+    )
+    subparser.add_argument(
+        "--no-config-cache",
+        action="store_true",
+        help="Don't use the cache of resolved configs. `docker compose config` will always be run to resolve the ATK config file.",
+        default=False,
+    )
+    subparser.add_argument(
+        "--invalidate-config-cache",
+        action="store_true",
+        help="Remove the cached resolved configs for the ATK config file before loading it.",
+        default=False,
+    )
     subparser.add_argument(
         "-o",
         "--optionals",
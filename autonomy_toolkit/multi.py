@@ -0,0 +1,296 @@
+# Imports from atk
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+import argparse
+import glob
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# The phases that are run for each project, in order
+_PHASES = ["down", "pull", "build", "up"]
+
+
+@dataclass
+class _Project:
+    directory: Path
+    error: str = ""
+    resolved: Any = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    results: Dict[str, bool] = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.error and all(self.results.values())
+
+
+def _find_projects(patterns: List[str], filename: str) -> List[Path]:
+    # Each pattern is a directory, a glob of directories or a glob of ATK config files
+    directories = []
+    for pattern in patterns:
+        pattern = os.path.expanduser(pattern)
+        is_glob = any(c in pattern for c in "*?[")
+        matches = sorted(glob.glob(pattern, recursive=True)) if is_glob else [pattern]
+        for match in matches:
+            path = Path(match).absolute()
+            if path.name == filename and path.is_file():
+                path = path.parent
+            if (path / filename).is_file():
+                if path not in directories:
+                    directories.append(path)
+            elif not is_glob:
+                LOGGER.warn("'%s' has no '%s' file. Skipping.", match, filename)
+    return directories
+
+
+def _parse_dev_args(
+    dev_args: str, directory: Path, filename: str, dry_run: bool
+) -> Optional[argparse.Namespace]:
+    import autonomy_toolkit.dev as dev
+
+    parser = argparse.ArgumentParser(prog="atk dev", add_help=False)
+    dev._init(parser)
+
+    tokens = shlex.split(dev_args)
+    if tokens[:1] == ["atk"]:
+        tokens = tokens[1:]
+    if tokens[:1] == ["dev"]:
+        tokens = tokens[1:]
+    try:
+        args, unknown = parser.parse_known_args(tokens)
+    except SystemExit:
+        return None
+    args._unknown_args = unknown
+    args.dry_run = dry_run
+
+    # The config is found by its absolute path, such that the working directory doesn't matter
+    args.filename_override = str(directory / filename)
+    return args
+
+
+def _resolve_project(
+    directory: Path, dev_args: str, filename: str, dry_run: bool
+) -> Tuple[float, Any]:
+    """Resolve, update and write the config of a project. Runs in a separate process.
+
+    Returns:
+        Tuple[float, Any]: The seconds it took (negative if the config could not be resolved) and the loaded
+        ``ATKConfig`` and ``BuildCache`` of the client, which the main process creates its client with.
+    """
+    import autonomy_toolkit.dev as dev
+
+    start = time.perf_counter()
+    args = _parse_dev_args(dev_args, directory, filename, dry_run)
+    client = dev._load(args) if args is not None else None
+    if client is None:
+        return -1.0, None
+    return time.perf_counter() - start, (client.config, client.build_cache)
+
+
+def _run_project(
+    project: _Project,
+    dev_args: str,
+    filename: str,
+    dry_run: bool,
+    limits: Dict[str, threading.Semaphore],
+) -> _Project:
+    import autonomy_toolkit.dev as dev
+
+    args = _parse_dev_args(dev_args, project.directory, filename, dry_run)
+    config, build_cache = project.resolved
+    client = dev._create_client(args, config)
+    client.build_cache = build_cache
+
+    # Like `atk dev`, a planned `up` only acts on out of date containers and makes `down` unnecessary
+    plan = args.up and not args.no_plan
+    for phase in _PHASES:
+        if not getattr(args, phase) or (phase == "down" and plan):
+            continue
+        with limits[phase]:
+            LOGGER.info("Running '%s' for '%s'...", phase, project.directory)
+            start = time.perf_counter()
+            cmd = {"pull": "pull_images", "up": "apply" if plan else "up"}.get(
+                phase, phase
+            )
+            project.results[phase] = dev._run_cmd(client, cmd)
+            project.timings[phase] = time.perf_counter() - start
+        if not project.results[phase]:
+            break
+    return project
+
+
+def _print_report(projects: List[_Project]):
+    width = max([len("project")] + [len(str(p.directory)) for p in projects])
+    header = f"{'project':<{width}}  {'resolve':>8}"
+    header += "".join(f"{phase:>8}" for phase in _PHASES)
+    print(f"{header}  result")
+    for project in projects:
+        line = f"{str(project.directory):<{width}}"
+        for phase in ["resolve"] + _PHASES:
+            if phase in project.timings:
+                line += (
+                    f"{project.timings[phase]:>{10 if phase == 'resolve' else 8}.2f}"
+                )
+            else:
+                line += f"{'-':>{10 if phase == 'resolve' else 8}}"
+        failed = [phase for phase, ok in project.results.items() if not ok]
+        result = "ok" if project.succeeded else project.error
+        if failed:
+            result = f"'{failed[0]}' failed"
+        print(f"{line}  {result}")
+
+    succeeded = sum(p.succeeded for p in projects)
+    print(f"{succeeded}/{len(projects)} project(s) succeeded.")
+
+
+def _run_multi(args):
+    LOGGER.info("Running 'multi' entrypoint...")
+
+    directories = _find_projects(args.paths, args.filename)
+    if not directories:
+        LOGGER.fatal("No projects were found.")
+        return False
+    if (
+        _parse_dev_args(args.dev_args, directories[0], args.filename, args.dry_run)
+        is None
+    ):
+        LOGGER.fatal("Failed to parse the `atk dev` arguments '%s'.", args.dev_args)
+        return False
+    projects = [_Project(directory) for directory in directories]
+    LOGGER.info("Found %s project(s).", len(projects))
+
+    # Resolve the configs in parallel. Parsing the yaml files is CPU bound, so a process pool is used.
+    # The loaded configs are sent back, such that the projects aren't loaded again.
+    workers = min(len(projects), args.resolve_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _resolve_project,
+                p.directory,
+                args.dev_args,
+                args.filename,
+                args.dry_run,
+            )
+            for p in projects
+        ]
+        for project, future in zip(projects, futures):
+            try:
+                duration, project.resolved = future.result()
+            except Exception as e:
+                LOGGER.error(
+                    "Failed to resolve the config of '%s': %s", project.directory, e
+                )
+                duration = -1.0
+            if duration < 0:
+                project.error = "Failed to resolve the config."
+            else:
+                project.timings["resolve"] = duration
+
+    # Run the phases. Each project runs its phases in order, while the number of projects running at once
+    # and the number of projects in each phase are bounded.
+    limits = {
+        "down": threading.Semaphore(
+            args.max_downs if args.max_downs is not None else args.max_parallel
+        ),
+        "pull": threading.Semaphore(
+            args.max_pulls if args.max_pulls is not None else args.max_parallel
+        ),
+        "build": threading.Semaphore(
+            args.max_builds if args.max_builds is not None else args.max_parallel
+        ),
+        "up": threading.Semaphore(
+            args.max_ups if args.max_ups is not None else args.max_parallel
+        ),
+    }
+    with ThreadPoolExecutor(max_workers=max(1, args.max_parallel)) as executor:
+        futures = [
+            executor.submit(
+                _run_project, p, args.dev_args, args.filename, args.dry_run, limits
+            )
+            for p in projects
+            if not p.error
+        ]
+        for future in futures:
+            future.result()
+
+    _print_report(projects)
+
+    if not all(p.succeeded for p in projects):
+        return False
+
+    LOGGER.info("Finished running 'multi' entrypoint.")
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"'{value}' isn't a positive integer.")
+    return number
+
+
+def _init(subparser):
+    LOGGER.debug("Initializing 'multi' entrypoint...")
+
+    subparser.add_argument(
+        "paths",
+        nargs="+",
+        help="The project directories. May be globs (quote them to prevent expansion by the shell), such as `'repos/*'` or `'repos/**/atk.yml'`. Directories without an ATK config file are skipped.",
+    )
+    subparser.add_argument(
+        "--dev-args",
+        required=True,
+        help="The `atk dev` arguments to run in each project, e.g. `--dev-args='-s dev -b -u'`. Only `--down`, `--pull`, `--build` and `--up` are run.",
+    )
+    subparser.add_argument(
+        "--filename",
+        help="The name of the ATK config file in each project. Defaults to 'atk.yml'.",
+        default="atk.yml",
+    )
+    subparser.add_argument(
+        "-p",
+        "--max-parallel",
+        type=_positive_int,
+        help="The maximum number of projects to run at once. Defaults to 4.",
+        default=4,
+    )
+    subparser.add_argument(
+        "--max-downs",
+        type=_positive_int,
+        help="The maximum number of projects to tear down at once. Defaults to `--max-parallel`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--max-pulls",
+        type=_positive_int,
+        help="The maximum number of projects to pull images for at once. Defaults to `--max-parallel`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--max-builds",
+        type=_positive_int,
+        help="The maximum number of projects to build at once. Defaults to `--max-parallel`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--max-ups",
+        type=_positive_int,
+        help="The maximum number of projects to spin up at once. Defaults to `--max-parallel`.",
+        default=None,
+    )
+    subparser.add_argument(
+        "--resolve-workers",
+        type=_positive_int,
+        help="The number of processes that resolve the configs of the projects. Defaults to the number of CPUs.",
+        default=None,
+    )
+
+    subparser.set_defaults(cmd=_run_multi)
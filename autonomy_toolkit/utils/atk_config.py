@@ -6,14 +6,199 @@ Abstracted helper class :class:`ATKConfig` used for reading/writing configuratio
 # Imports from atk
 from autonomy_toolkit.utils.logger import LOGGER
 from autonomy_toolkit.utils.files import search_upwards_for_file, read_file, file_exists
+from autonomy_toolkit.utils.cache import get_cache_dir, hash_files, hash_string
+from autonomy_toolkit.utils.profiler import profile
+from autonomy_toolkit.utils.optionals import (
+    SERVICES_KEY,
+    compile_patches,
+    apply_patches,
+)
+from autonomy_toolkit.utils.locks import hold_file, try_remove
+from autonomy_toolkit.utils.dependencies import prune_config
 
 # Other imports
 import tempfile
-from typing import Union, List, Optional
+from typing import Any, Dict, Union, List, Optional
+from copy import deepcopy
 from pathlib import Path
 import yaml
-import mergedeep
+import hashlib
 import os
+import re
+import threading
+import time
+
+# Use the libyaml bindings, if available, as they're significantly faster than the pure python implementation
+try:
+    from yaml import CSafeLoader as YAMLLoader, CSafeDumper as YAMLDumper
+except ImportError:
+    from yaml import SafeLoader as YAMLLoader, SafeDumper as YAMLDumper
+
+
+class _ComposeLoader(YAMLLoader):
+    """Parses yaml like ``docker compose`` (i.e. go-yaml v3) does.
+
+    Plain scalars are resolved with the rules of go-yaml v3 rather than YAML 1.1:
+
+    - Only ``true``/``True``/``TRUE`` and ``false``/``False``/``FALSE`` are booleans, so ``yes`` and ``on`` are strings.
+    - Integers are parsed like go's ``strconv.ParseInt`` with base 0 after removing ``_``, so ``0440`` and ``0o440``
+      are octal, ``0x1F`` is hexadecimal, ``0b101`` is binary and ``1_000`` is 1000. ``22:22`` is a string.
+    - Timestamps (e.g. ``2024-01-01``) are recorded in :attr:`compose_scalars` and kept as strings, as only
+      ``docker compose`` knows how it writes them back. See :meth:`ATKConfig.load`.
+
+    Anchors, aliases and merge keys (``<<``) work like in YAML 1.1.
+    """
+
+    yaml_implicit_resolvers = {
+        first: [
+            (tag, regexp)
+            for tag, regexp in resolvers
+            if tag.rsplit(":", 1)[-1] not in ("bool", "int", "float", "timestamp")
+        ]
+        for first, resolvers in YAMLLoader.yaml_implicit_resolvers.items()
+    }
+
+    def __init__(self, stream):
+        super().__init__(stream)
+
+        # The plain scalars that can't be resolved in-process
+        self.compose_scalars: List[str] = []
+
+
+# The tag of the plain scalars that go-yaml v3 resolves as a number (or timestamp), if it can
+_COMPOSE_NUMBER_TAG = "tag:atk,2024:number"
+
+_GO_INT_PATTERN = re.compile(
+    r"([-+]?)(0[xX][0-9a-fA-F]+|0[bB][01]+|0[oO][0-7]+|0[0-7]+|[1-9][0-9]*|0)"
+)
+_GO_FLOAT_PATTERN = re.compile(
+    r"[-+]?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)(?:[eE][-+]?[0-9]+)?"
+)
+_GO_SPECIAL_FLOATS = {
+    **{v: float("nan") for v in (".nan", ".NaN", ".NAN")},
+    **{v: float("inf") for v in (".inf", ".Inf", ".INF", "+.inf", "+.Inf", "+.INF")},
+    **{v: float("-inf") for v in ("-.inf", "-.Inf", "-.INF")},
+}
+# The timestamp formats of go-yaml v3, e.g. `2024-1-2`, `2024-01-02 03:04:05` and `2024-01-02T03:04:05.5+01:00`
+_GO_TIMESTAMP_PATTERN = re.compile(
+    r"[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}"
+    r"(?:[Tt][0-9]{1,2}:[0-9]{1,2}:[0-9]{1,2}(?:\.[0-9]+)?(?:Z|[-+][0-9]{2}:[0-9]{2})"
+    r"| [0-9]{1,2}:[0-9]{1,2}:[0-9]{1,2}(?:\.[0-9]+)?)?"
+)
+
+
+def _parse_go_int(value: str) -> Optional[int]:
+    match = _GO_INT_PATTERN.fullmatch(value)
+    if match is None:
+        return None
+    sign, digits = match.groups()
+    base = {"0x": 16, "0b": 2, "0o": 8}.get(digits[:2].lower(), None)
+    if base is not None:
+        number = int(digits[2:], base)
+    else:
+        number = int(digits, 8 if len(digits) > 1 and digits[0] == "0" else 10)
+    number = -number if sign == "-" else number
+    # Larger numbers are parsed as floats
+    return number if -(2**63) <= number < 2**64 else None
+
+
+def _resolve_compose_number(value: str) -> Any:
+    # The number a plain scalar is resolved to, or the scalar itself if it isn't a number (or is a timestamp)
+    if value in _GO_SPECIAL_FLOATS:
+        return _GO_SPECIAL_FLOATS[value]
+    plain = value.replace("_", "")
+    number = _parse_go_int(plain)
+    if number is not None:
+        return number
+    if _GO_FLOAT_PATTERN.fullmatch(plain):
+        return float(plain)
+    return value
+
+
+def _construct_compose_number(loader: _ComposeLoader, node: yaml.ScalarNode) -> Any:
+    value = loader.construct_scalar(node)
+    if _GO_TIMESTAMP_PATTERN.fullmatch(value):
+        loader.compose_scalars.append(value)
+        return value
+    return _resolve_compose_number(value)
+
+
+def _construct_compose_int(loader: _ComposeLoader, node: yaml.ScalarNode) -> int:
+    # Explicitly tagged (`!!int`) scalars
+    number = _parse_go_int(loader.construct_scalar(node).replace("_", ""))
+    if number is None:
+        raise yaml.constructor.ConstructorError(
+            None, None, f"invalid integer '{node.value}'", node.start_mark
+        )
+    return number
+
+
+_ComposeLoader.add_implicit_resolver(
+    "tag:yaml.org,2002:bool",
+    re.compile(r"^(?:true|True|TRUE|false|False|FALSE)$"),
+    list("tTfF"),
+)
+_ComposeLoader.add_implicit_resolver(
+    _COMPOSE_NUMBER_TAG, re.compile(r"^[-+.0-9]"), list("-+.0123456789")
+)
+_ComposeLoader.add_constructor(_COMPOSE_NUMBER_TAG, _construct_compose_number)
+_ComposeLoader.add_constructor("tag:yaml.org,2002:int", _construct_compose_int)
+
+
+class _ComposeDumper(YAMLDumper):
+    """Writes yaml such that ``docker compose`` (i.e. go-yaml v3) reads it back as written.
+
+    Strings that go-yaml v3 would resolve as a number or timestamp, but YAML 1.1 wouldn't (e.g. ``0o17`` or ``1e3``),
+    are quoted.
+    """
+
+    def resolve(self, kind, value, implicit):
+        tag = super().resolve(kind, value, implicit)
+        if (
+            kind is yaml.ScalarNode
+            and implicit[0]
+            and tag == "tag:yaml.org,2002:str"
+            and (
+                _GO_TIMESTAMP_PATTERN.fullmatch(value)
+                or not isinstance(_resolve_compose_number(value), str)
+            )
+        ):
+            return _COMPOSE_NUMBER_TAG
+        return tag
+
+
+# The maximum number of resolved configs that are cached per project
+MAX_CACHED_CONFIGS = 8
+
+# The number of seconds after which an unused generated compose file is removed, see `remove_stale_compose_files`
+MAX_COMPOSE_FILE_AGE = 24 * 60 * 60
+
+# Resolved configs kept in memory, keyed like the on-disk cache. Only filled if :attr:`ATKConfig.keep_in_memory` is set
+# (i.e. by ``atk daemon``), as a short-lived process would never read them again
+_RESOLVED_CONFIGS: Dict[str, dict] = {}
+
+
+def get_compose_file_name(
+    services: List[str], optionals: List[str], opts: List[str] = [], variant: str = ""
+) -> str:
+    """Get the name of the generated compose file for a set of services, optionals and compose options.
+
+    Each combination gets its own compose file, such that concurrent ``atk`` processes in one project don't overwrite
+    each other's compose file.
+
+    Args:
+        services (List[str]): The services.
+        optionals (List[str]): The optionals.
+        opts (List[str]): Options passed to the ``docker compose`` command.
+        variant (str): Other settings that change the generated compose file, e.g. the build cache.
+
+    Returns:
+        str: The name of the compose file, i.e. ``.atk-compose.<digest>.yml``.
+    """
+    key = (sorted(services), sorted(optionals), [str(opt) for opt in opts])
+    if variant:
+        key += (variant,)
+    return f".atk-compose.{hash_string(repr(key), 12)}.yml"
 
 
 class ATKConfig:
@@ -28,6 +213,9 @@ class ATKConfig:
         env_files (List[Union[Path, str]]): env_files that are passed to docker compose using the ``--env-file`` flag. Defaults to ``[atk.env, .env]``.
     """
 
+    keep_in_memory = False
+    """If True, resolved configs are also cached in memory. Set by long-lived processes, such as ``atk daemon``."""
+
     def __init__(
         self,
         filename: Union[Path, str],
@@ -39,7 +227,7 @@ class ATKConfig:
         self.services = services
 
         # Search for the atk.yml file
-        self.atk_yml_path = search_upwards_for_file(filename)
+        self.atk_yml_path = search_upwards_for_file(filename, use_cache=True)
         if self.atk_yml_path is None:
             raise FileNotFoundError(
                 f"No '{filename}' file was found in this directory or any parent directories. Make sure you are running this command in an autonomy-toolkit compatible repository. Cannot continue."
@@ -49,18 +237,53 @@ class ATKConfig:
         self.compose_file = self.atk_yml_path.parent / compose_file
         self.env_files = [self.atk_yml_path.parent / env_file for env_file in env_files]
 
+        # Whether the last call to load used the cached config
+        self.cache_hit = False
+
+        # Whether the last call to load resolved the config in-process
+        self.resolved_in_process = False
+
+        # Whether the last call to write actually wrote the file
+        self.written = False
+
+        # The compose file, opened and locked such that other processes don't remove it while it's in use
+        self._held_compose_file = None
+
         # Parse the atk yml file
-        self.read()
+        if not self.read():
+            raise ValueError(f"Failed to parse '{self.atk_yml_path}'. Cannot continue.")
+
+    def __getstate__(self) -> dict:
+        # The lock on the compose file belongs to this process. The receiving process takes its own, see `__setstate__`.
+        state = dict(self.__dict__)
+        state["_held_compose_file"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._hold_compose_file()
+
+    def update_services(self, *args):
+        """Deep merges the given arguments into the services
 
-    def update_services(self, arg):
-        """Uses ``mergedeep`` to update the services with the given argument
+        Each argument is compiled into patches once, which are then applied to each service in a single pass.
+        Lists are extended with the entries that aren't present yet. See :mod:`autonomy_toolkit.utils.optionals`.
 
         Args:
-            arg (Any): The argument to update the services with. This can be a dictionary, list, or any other type that ``mergedeep`` supports.
+            *args (dict): The arguments to update the services with. May contain an ``x-services`` field to only update some services.
+
+        Raises:
+            ValueError: If an argument is not a dict or its ``x-services`` field is invalid. Services that are listed
+                in ``x-services`` but don't exist are warned about.
         """
-        for service in self.config["services"].values():
-            mergedeep.merge(service, arg, strategy=mergedeep.Strategy.ADDITIVE)
+        patches = [patch for arg in args for patch in compile_patches(arg)]
+        targets = {s for patch in patches for s in patch.services or []}
+        for target in sorted(targets - set(self.config["services"])):
+            LOGGER.warn(f"'{SERVICES_KEY}' lists '{target}', which isn't a service.")
+        for name, service in self.config["services"].items():
+            apply_patches(name, service, patches)
 
+    @profile()
     def update_services_with_optionals(self, optionals: List[str]) -> bool:
         """Updates the services with the given optionals.
 
@@ -81,42 +304,166 @@ class ATKConfig:
                     f"Optional '{opt}' was not found in the 'x-optionals' field."
                 )
                 return False
-            self.update_services(self.config["x-optionals"][opt])
+
+        try:
+            self.update_services(
+                *[self.config["x-optionals"][opt] for opt in optionals]
+            )
+        except ValueError as e:
+            LOGGER.error(f"Failed to apply the optionals: {e}")
+            return False
 
         return True
 
-    def write(self, filename: Optional[Union[Path, str]] = None) -> bool:
-        """Dump the config to the compose file to be read by docker compose"""
-        filename = filename or self.compose_file
+    def prune(self):
+        """Prune the config to :attr:`services`, the services they depend on and the resources they reference.
+
+        This keeps the compose file small, such that ``docker compose`` doesn't have to parse and validate the whole
+        project on every command. See :func:`prune_config`.
+        """
+        self.config = prune_config(self.config, self.services)
+
+    @profile()
+    def write(
+        self, filename: Optional[Union[Path, str]] = None, *, force: bool = False
+    ) -> bool:
+        """Dump the config to the compose file to be read by docker compose
+
+        The config is rendered in memory and the file is only replaced (atomically) if its contents changed,
+        such that the file's mtime is left untouched otherwise. Whether the file was written is stored in :attr:`written`.
+        The compose file is then locked (shared) until this object is garbage collected, such that other processes
+        don't remove it (see :meth:`remove_stale_compose_files`).
+
+        Args:
+            filename (Optional[Union[Path, str]]): The file to write to. Defaults to the compose file.
+            force (bool): If True, the file is written even if its contents are unchanged. Defaults to False.
+        """
+        filename = Path(filename or self.compose_file)
+        is_compose_file = filename == self.compose_file
+        self.written = False
 
         try:
-            with open(self.compose_file, "w") as f:
-                yaml.dump(self.config, f)
+            content = yaml.dump(self.config, Dumper=_ComposeDumper).encode()
+            if not force and _digest_file(filename) == _digest(content):
+                # Unless it was removed in the meantime
+                if not is_compose_file or self._hold_compose_file():
+                    LOGGER.debug(f"'{filename}' is unchanged. Not writing.")
+                    return True
+
+            temp_filename = filename.with_name(
+                f".{filename.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            temp_filename.write_bytes(content)
+            os.replace(temp_filename, filename)
         except Exception as e:
             LOGGER.fatal(f"Failed to write compose file: {e}")
             return False
 
+        if is_compose_file:
+            self._hold_compose_file()
+        self.written = True
         return True
 
+    def remove_stale_compose_files(self, max_age: float = MAX_COMPOSE_FILE_AGE) -> int:
+        """Remove the generated compose files of this project that are no longer in use.
+
+        A compose file is stale if it wasn't written for ``max_age`` seconds and no other process holds it. Leftover
+        temporary files of interrupted writes are removed, too.
+
+        Args:
+            max_age (float): The number of seconds after which an unused compose file is stale.
+
+        Returns:
+            int: The number of removed files.
+        """
+        removed = 0
+        now = time.time()
+        directory = self.atk_yml_path.parent
+        candidates = list(directory.glob(".atk-compose*.yml"))
+        candidates += list(directory.glob("..atk-compose*.tmp"))
+        for filename in candidates:
+            if filename == self.compose_file:
+                continue
+            try:
+                if now - filename.stat().st_mtime < max_age:
+                    continue
+            except OSError:
+                continue
+            if try_remove(filename):
+                LOGGER.debug(f"Removed the stale compose file '{filename}'.")
+                removed += 1
+        return removed
+
+    def release_compose_file(self):
+        """Release the lock on the compose file taken by :meth:`write`, such that it may be removed."""
+        if self._held_compose_file is not None:
+            self._held_compose_file.close()
+            self._held_compose_file = None
+
+    def _hold_compose_file(self) -> bool:
+        if self._held_compose_file is not None:
+            self._held_compose_file.close()
+        self._held_compose_file = hold_file(self.compose_file)
+        return self._held_compose_file is not None
+
+    @profile()
     def read(self, filename: Optional[Union[Path, str]] = None) -> bool:
         """Read the config to the compose file to be used by docker compose"""
         filename = filename or self.atk_yml_path
 
         try:
-            self.config = yaml.safe_load(read_file(filename))
+            self.config = yaml.load(read_file(filename), Loader=YAMLLoader)
         except yaml.YAMLError as e:
             LOGGER.fatal(f"Failed to read compose file: {e}")
             return False
         return True
 
-    def load(self, client: "DockerClient", opts: List[str]) -> bool:
+    @profile()
+    def load(
+        self, client: "DockerClient", opts: List[str], *, use_cache: bool = True
+    ) -> bool:
         """Loads the config file using `docker compose config`
 
         This allows us to use docker's multi-file loading (e.g. `-f <file1>.yaml -f <file2>.yaml`), `include` and other docker compose features.
 
+        If the config uses none of these features (see :meth:`get_compose_features`), it's resolved in-process instead,
+        which only requires parsing the ``atk.yml`` file like ``docker compose`` would. Like with ``docker compose config``,
+        variables are not interpolated, that's left to the ``docker compose`` commands that read the compose file.
+
+        Otherwise, the resolved config is cached on disk, keyed by the contents of the ``atk.yml`` file, every included
+        or ``-f`` file, the env files and ``opts``. If a cached config exists, ``docker compose config`` is not run.
+        Whether the cache was used is stored in :attr:`cache_hit`.
+
         Args:
             client (DockerClient): The docker client to use to write the compose file.
+            opts (List[str]): Options passed to the ``docker compose`` command.
+            use_cache (bool): Whether to use the resolved config cache. Defaults to True.
         """
+        self.cache_hit = False
+        self.resolved_in_process = False
+
+        config = self._resolve_in_process(opts)
+        if config is not None:
+            self.config = config
+            self.resolved_in_process = True
+            return True
+
+        cache_file = self._get_cache_file(opts) if use_cache else None
+        if cache_file is not None and cache_file.name in _RESOLVED_CONFIGS:
+            LOGGER.debug(f"Found resolved config '{cache_file.name}' in memory.")
+            self.config = deepcopy(_RESOLVED_CONFIGS[cache_file.name])
+            self.cache_hit = True
+            return True
+        if cache_file is not None and file_exists(cache_file):
+            LOGGER.debug(f"Found cached config '{cache_file}'.")
+            if self.read(cache_file) and isinstance(self.config, dict):
+                LOGGER.info("Loaded the resolved config from the cache.")
+                self.cache_hit = True
+                self._keep_in_memory(cache_file)
+                return True
+            LOGGER.warn(f"Cached config '{cache_file}' is invalid. Reloading.")
+            self.read()
+
         with tempfile.NamedTemporaryFile("w") as temp_file:
             if not self.write(temp_file.name):
                 return False
@@ -137,4 +484,189 @@ class ATKConfig:
                 return False
             if not self.read(temp_file.name):
                 return False
+
+            if cache_file is not None and not client.dry_run:
+                self._fill_cache(temp_file.name, cache_file)
+                self._keep_in_memory(cache_file)
         return True
+
+    def get_compose_features(
+        self, opts: List[str], config: Optional[dict] = None
+    ) -> List[str]:
+        """Get the features that require ``docker compose config`` to resolve the config.
+
+        These are ``include``, ``extends`` and any ``docker compose`` options (e.g. ``-f`` or ``--profile``).
+        Resolving with ``docker compose`` can also be forced by setting ``$ATK_RESOLVER`` to ``compose``.
+
+        Args:
+            opts (List[str]): Options passed to the ``docker compose`` command.
+            config (Optional[dict]): The parsed ``atk.yml`` file. Defaults to :attr:`config`.
+
+        Returns:
+            List[str]: The features. Empty if the config can be resolved in-process.
+        """
+        config = self.config if config is None else config
+        features = []
+        if os.environ.get("ATK_RESOLVER", "auto") == "compose":
+            features.append("$ATK_RESOLVER")
+        if opts:
+            features.append("compose options")
+        if not isinstance(config, dict) or not isinstance(
+            config.get("services", None) or {}, dict
+        ):
+            # Let `docker compose` report the error
+            features.append("invalid config")
+            return features
+        if "include" in config:
+            features.append("include")
+        services = config.get("services", None) or {}
+        if any(isinstance(s, dict) and "extends" in s for s in services.values()):
+            features.append("extends")
+        return features
+
+    def _resolve_in_process(self, opts: List[str]) -> Optional[dict]:
+        loader = _ComposeLoader(read_file(self.atk_yml_path))
+        try:
+            config = loader.get_single_data()
+        except yaml.YAMLError as e:
+            LOGGER.debug(f"Failed to parse '{self.atk_yml_path}' in-process: {e}")
+            return None
+        finally:
+            loader.dispose()
+
+        features = self.get_compose_features(opts, config)
+        if loader.compose_scalars:
+            features.append(f"timestamps ({', '.join(loader.compose_scalars[:3])})")
+        if features:
+            LOGGER.debug(f"Resolving with 'docker compose config' due to {features}.")
+            return None
+
+        LOGGER.info("Resolved the config in-process.")
+        return config
+
+    def invalidate_cache(self) -> int:
+        """Removes all cached configs for this ``atk.yml`` file.
+
+        Returns:
+            int: The number of cache entries that were removed.
+        """
+        removed = 0
+        for key in [k for k in _RESOLVED_CONFIGS if k.startswith(self._cache_prefix)]:
+            del _RESOLVED_CONFIGS[key]
+        for cache_file in self._get_cached_files():
+            try:
+                cache_file.unlink()
+                removed += 1
+            except OSError as e:
+                LOGGER.warn(f"Failed to remove cached config '{cache_file}': {e}")
+
+        LOGGER.info(f"Removed {removed} cached config(s).")
+        return removed
+
+    def get_dependent_files(self, opts: List[str] = []) -> List[Path]:
+        """Get the files that the resolved config depends on.
+
+        This includes the ``atk.yml`` file, files passed with ``-f``/``--file`` in ``opts``,
+        files referenced (recursively) by ``include`` and the env files.
+
+        Args:
+            opts (List[str]): Options passed to the ``docker compose`` command.
+
+        Returns:
+            List[Path]: The files the resolved config depends on.
+        """
+        files = [self.atk_yml_path]
+
+        opts = [str(opt) for opt in opts]
+        for i, opt in enumerate(opts):
+            if opt in ("-f", "--file", "--env-file") and i + 1 < len(opts):
+                files.append(Path(opts[i + 1]).absolute())
+            elif opt.startswith(("--file=", "--env-file=")):
+                files.append(Path(opt.split("=", 1)[1]).absolute())
+
+        for filename in list(files):
+            config = self.config if filename == self.atk_yml_path else None
+            self._find_included_files(filename, config, files)
+
+        files.extend(self.env_files)
+        return files
+
+    def _find_included_files(
+        self, filename: Path, config: Optional[dict], files: List[Path]
+    ):
+        if config is None:
+            try:
+                config = yaml.load(read_file(filename), Loader=YAMLLoader)
+            except yaml.YAMLError:
+                return
+        if not isinstance(config, dict):
+            return
+
+        for include in config.get("include", None) or []:
+            if isinstance(include, dict):
+                paths = include.get("path", [])
+                paths = [paths] if isinstance(paths, str) else paths
+                env_files = include.get("env_file", [])
+                env_files = [env_files] if isinstance(env_files, str) else env_files
+            else:
+                paths, env_files = [include], []
+
+            for env_file in env_files:
+                files.append(filename.parent / env_file)
+            for path in paths:
+                path = filename.parent / path
+                if path not in files:
+                    files.append(path)
+                    self._find_included_files(path, None, files)
+
+    def _get_cache_file(self, opts: List[str]) -> Path:
+        digest = hash_files(self.get_dependent_files(opts), extra=opts)
+        return get_cache_dir("configs") / f"{self._cache_prefix}-{digest}.yml"
+
+    def _get_cached_files(self) -> List[Path]:
+        cache_dir = get_cache_dir("configs", create=False)
+        return sorted(
+            cache_dir.glob(f"{self._cache_prefix}-*.yml"),
+            key=lambda f: f.stat().st_mtime,
+            reverse=True,
+        )
+
+    @property
+    def _cache_prefix(self) -> str:
+        return hash_string(self.atk_yml_path)
+
+    def _keep_in_memory(self, cache_file: Path):
+        if not self.keep_in_memory:
+            return
+
+        # Entries of this project whose files changed since are replaced, the cache key is different now
+        for key in [k for k in _RESOLVED_CONFIGS if k.startswith(self._cache_prefix)]:
+            del _RESOLVED_CONFIGS[key]
+        _RESOLVED_CONFIGS[cache_file.name] = deepcopy(self.config)
+
+    def _fill_cache(self, filename: Union[Path, str], cache_file: Path):
+        try:
+            temp_cache_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            temp_cache_file.write_bytes(Path(filename).read_bytes())
+            os.replace(temp_cache_file, cache_file)
+        except OSError as e:
+            LOGGER.debug(f"Failed to cache the resolved config: {e}")
+            return
+
+        # Only keep the most recent entries for this project
+        for stale_file in self._get_cached_files()[MAX_CACHED_CONFIGS:]:
+            try:
+                stale_file.unlink()
+            except OSError:
+                pass
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _digest_file(filename: Path) -> Optional[str]:
+    try:
+        return _digest(filename.read_bytes())
+    except OSError:
+        return None
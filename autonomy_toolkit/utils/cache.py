@@ -0,0 +1,81 @@
+# SPDX-License-Identifier: MIT
+"""
+Provides helper methods for the on-disk cache used by ``autonomy-toolkit``.
+
+The cache is located at ``$ATK_CACHE_DIR`` if set, otherwise at ``$XDG_CACHE_HOME/autonomy-toolkit``
+(which defaults to ``~/.cache/autonomy-toolkit``).
+"""
+
+# Import some utils
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External library imports
+from typing import Union, Iterable
+from pathlib import Path
+import hashlib
+import os
+
+
+def get_cache_dir(*subdirs: str, create: bool = True) -> Path:
+    """Get the directory where ``autonomy-toolkit`` stores cached data.
+
+    Args:
+        *subdirs (str): Subdirectories to append to the root cache directory.
+        create (bool): If True, the directory will be created if it doesn't exist. Defaults to True.
+
+    Returns:
+        Path: The path to the cache directory.
+    """
+    if "ATK_CACHE_DIR" in os.environ:
+        root = Path(os.environ["ATK_CACHE_DIR"])
+    else:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+        root = Path(xdg_cache_home) / "autonomy-toolkit"
+
+    path = root.joinpath(*subdirs)
+    if create:
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            LOGGER.debug("Failed to create cache directory '%s': %s", path, e)
+    return path
+
+
+def hash_files(files: Iterable[Union[Path, str]], extra: Iterable[str] = []) -> str:
+    """Compute a digest of the passed files and additional strings.
+
+    The path and the contents of each file contribute to the digest. Files that don't exist
+    contribute their path and a marker, such that creating the file changes the digest.
+
+    Args:
+        files (Iterable[Union[Path, str]]): The files to hash.
+        extra (Iterable[str]): Additional strings to include in the digest.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    for filename in files:
+        digest.update(str(filename).encode())
+        try:
+            with open(filename, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b"\0missing")
+    for value in extra:
+        digest.update(b"\0")
+        digest.update(str(value).encode())
+    return digest.hexdigest()
+
+
+def hash_string(value: Union[Path, str], length: int = 16) -> str:
+    """Compute a short digest of a string.
+
+    Args:
+        value (Union[Path, str]): The value to hash.
+        length (int): The number of hex characters to return. Defaults to 16.
+
+    Returns:
+        str: The truncated hex digest.
+    """
+    return hashlib.sha256(str(value).encode()).hexdigest()[:length]
@@ -0,0 +1,182 @@
+# SPDX-License-Identifier: MIT
+"""
+Thin client for ``atk daemon``.
+
+If the daemon is running, the ``atk`` entrypoint forwards its arguments, working directory, environment and standard
+streams (as file descriptors) over a unix socket. The daemon runs the command in a forked process, which writes directly
+to the passed streams, and replies with its returncode. If the daemon isn't running, can't handle the command or
+``$ATK_NO_DAEMON`` is set, the command is run in-process as usual.
+
+This module is imported by every ``atk`` invocation, so it should stay cheap to import.
+"""
+
+# External library imports
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import array
+import json
+import os
+import signal
+import socket
+import struct
+
+# The size of the length prefix of a message
+_HEADER = struct.Struct("!I")
+
+
+def get_socket_path() -> Path:
+    """Get the path of the unix socket the daemon listens on.
+
+    The path is ``$ATK_DAEMON_SOCKET`` if set, otherwise ``$XDG_RUNTIME_DIR/atk-daemon.sock`` or, if that isn't set,
+    ``daemon.sock`` in the cache directory.
+    """
+    if "ATK_DAEMON_SOCKET" in os.environ:
+        return Path(os.environ["ATK_DAEMON_SOCKET"])
+    if "XDG_RUNTIME_DIR" in os.environ:
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / "atk-daemon.sock"
+
+    # Like `get_cache_dir("daemon")`, which isn't used since `autonomy_toolkit.utils.cache` imports the logger
+    # The directory is created by the daemon
+    if "ATK_CACHE_DIR" in os.environ:
+        root = Path(os.environ["ATK_CACHE_DIR"])
+    else:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+        root = Path(xdg_cache_home) / "autonomy-toolkit"
+    return root / "daemon" / "daemon.sock"
+
+
+def connect(timeout: Optional[float] = 5.0) -> Optional[socket.socket]:
+    """Connect to the daemon.
+
+    Returns:
+        Optional[socket.socket]: The connection or None if the daemon isn't running.
+    """
+    path = get_socket_path()
+    if not path.exists():
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any], fds: List[int] = []):
+    """Send a length prefixed JSON message, optionally passing file descriptors along with it."""
+    data = json.dumps(message).encode()
+    data = _HEADER.pack(len(data)) + data
+    if fds:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sent = sock.sendmsg([data], ancillary)
+        data = data[sent:]
+    sock.sendall(data)
+
+
+def recv_message(
+    sock: socket.socket, max_fds: int = 0
+) -> Tuple[Optional[Dict[str, Any]], List[int]]:
+    """Receive a message sent with :func:`send_message`.
+
+    Args:
+        sock (socket.socket): The connection.
+        max_fds (int): The maximum number of file descriptors to receive with the message.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], List[int]]: The message, or None if the connection was closed, and the received file descriptors.
+    """
+    # Read exactly one message, the next one may already be in the socket's buffer
+    fds = array.array("i")
+    data, ancillary, _, _ = sock.recvmsg(
+        _HEADER.size, socket.CMSG_SPACE(max_fds * fds.itemsize) if max_fds else 0
+    )
+    for level, kind, cmsg_data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[: len(cmsg_data) - len(cmsg_data) % fds.itemsize])
+
+    data = _recv_exactly(sock, _HEADER.size, data)
+    if data is None:
+        return None, list(fds)
+    data = _recv_exactly(sock, _HEADER.unpack(data)[0])
+    if data is None:
+        return None, list(fds)
+    return json.loads(data), list(fds)
+
+
+def _recv_exactly(sock: socket.socket, size: int, data: bytes = b"") -> Optional[bytes]:
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def forward_to_daemon(argv: List[str]) -> Optional[int]:
+    """Run the command in the daemon, if it's running.
+
+    Args:
+        argv (List[str]): The command line arguments, without the program name.
+
+    Returns:
+        Optional[int]: The returncode of the command or None if it wasn't run by the daemon.
+    """
+    if os.environ.get("ATK_NO_DAEMON", ""):
+        return None
+
+    # The daemon is never used to manage itself
+    from autonomy_toolkit._atk_base import _get_subcommand
+
+    if _get_subcommand(argv) == "daemon":
+        return None
+
+    sock = connect()
+    if sock is None:
+        return None
+
+    from autonomy_toolkit import __version__
+
+    with sock:
+        try:
+            request = {
+                "op": "run",
+                "version": __version__,
+                "argv": argv,
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+            }
+            send_message(sock, request, fds=[0, 1, 2])
+
+            # The daemon either tells us to run the command ourselves or sends the pid of the process that runs it
+            # Resolving the config may take a while, so don't time out (and run the command twice)
+            sock.settimeout(None)
+            reply, _ = recv_message(sock)
+            if reply is None or reply.get("fallback", False):
+                return None
+        except OSError:
+            return None
+
+        # From here on, the command is running and must not be run again in-process
+        # Forward ctrl+c to the process group of the command, like the terminal would if it ran in-process
+        pid = reply["pid"]
+        previous = signal.signal(
+            signal.SIGINT, lambda sig, frame: _kill(pid, signal.SIGINT)
+        )
+        try:
+            reply, _ = recv_message(sock)
+        except OSError:
+            reply = None
+        finally:
+            signal.signal(signal.SIGINT, previous)
+
+    return 1 if reply is None else int(reply.get("returncode", 1))
+
+
+def _kill(pid: int, sig: int):
+    try:
+        os.killpg(pid, sig)
+    except OSError:
+        pass
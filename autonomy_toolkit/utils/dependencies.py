@@ -0,0 +1,162 @@
+# SPDX-License-Identifier: MIT
+"""
+Finds the dependencies of services in a resolved config, such that the generated compose file can be pruned to the
+selected services.
+
+A service depends on the services it references through ``depends_on``, ``links``, ``network_mode: service:<name>``,
+``volumes_from``, ``extends`` (within the same file) and ``build.additional_contexts`` (``service:<name>``). It references the top-level networks, volumes, secrets and
+configs it uses. Services without ``networks`` (and ``network_mode``) implicitly use the ``default`` network.
+"""
+
+# External imports
+from typing import Any, Dict, List, Set
+
+# The top-level fields that services may reference
+RESOURCE_FIELDS = ("networks", "volumes", "secrets", "configs")
+
+
+def get_dependencies(service_config: Dict[str, Any]) -> List[str]:
+    """Get the services a service directly depends on.
+
+    Args:
+        service_config (Dict[str, Any]): The definition of the service.
+
+    Returns:
+        List[str]: The names of the services, in order of appearance and without duplicates.
+    """
+    dependencies = []
+
+    depends_on = service_config.get("depends_on", None) or []
+    dependencies.extend(depends_on)
+
+    for link in service_config.get("links", None) or []:
+        dependencies.append(str(link).split(":", 1)[0])
+
+    network_mode = str(service_config.get("network_mode", ""))
+    if network_mode.startswith("service:"):
+        dependencies.append(network_mode[len("service:") :])
+
+    for volumes_from in service_config.get("volumes_from", None) or []:
+        volumes_from = str(volumes_from)
+        if volumes_from.startswith("container:"):
+            continue
+        if volumes_from.startswith("service:"):
+            volumes_from = volumes_from[len("service:") :]
+        dependencies.append(volumes_from.split(":", 1)[0])
+
+    extends = service_config.get("extends", None)
+    if isinstance(extends, str):
+        dependencies.append(extends)
+    elif isinstance(extends, dict) and "file" not in extends:
+        dependencies.append(extends.get("service", ""))
+
+    build = service_config.get("build", None)
+    contexts = (
+        build.get("additional_contexts", None) if isinstance(build, dict) else None
+    )
+    contexts = contexts.values() if isinstance(contexts, dict) else contexts or []
+    for context in contexts:
+        context = str(context).split("=", 1)[-1]
+        if context.startswith("service:"):
+            dependencies.append(context[len("service:") :])
+
+    return [d for d in dict.fromkeys(dependencies) if d]
+
+
+def get_closure(config: Dict[str, Any], services: List[str]) -> List[str]:
+    """Get the services and, recursively, the services they depend on.
+
+    Args:
+        config (Dict[str, Any]): The resolved config.
+        services (List[str]): The selected services.
+
+    Returns:
+        List[str]: The services in the closure, in the order of the config. Services that aren't defined are omitted.
+    """
+    definitions = config.get("services", None) or {}
+    closure: Set[str] = set()
+    pending = list(services)
+    while pending:
+        service = pending.pop()
+        if service in closure or service not in definitions:
+            continue
+        closure.add(service)
+        pending.extend(get_dependencies(definitions[service] or {}))
+    return [s for s in definitions if s in closure]
+
+
+def get_references(service_config: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Get the top-level networks, volumes, secrets and configs a service references.
+
+    Args:
+        service_config (Dict[str, Any]): The definition of the service.
+
+    Returns:
+        Dict[str, Set[str]]: The names of the referenced resources, keyed by top-level field. As the config isn't
+        interpolated, names may contain variables.
+    """
+    references = {field: set() for field in RESOURCE_FIELDS}
+
+    networks = service_config.get("networks", None)
+    if networks:
+        references["networks"].update(networks)
+    elif "network_mode" not in service_config:
+        references["networks"].add("default")
+
+    for volume in service_config.get("volumes", None) or []:
+        if isinstance(volume, dict):
+            if volume.get("type", "volume") == "volume" and volume.get("source"):
+                references["volumes"].add(volume["source"])
+            continue
+        source, separator, _ = str(volume).partition(":")
+        if separator and not source.startswith(("/", ".", "~")):
+            references["volumes"].add(source)
+
+    build = service_config.get("build", None)
+    build_secrets = build.get("secrets", None) if isinstance(build, dict) else None
+    for field, entries in (
+        ("secrets", service_config.get("secrets", None)),
+        ("secrets", build_secrets),
+        ("configs", service_config.get("configs", None)),
+    ):
+        for entry in entries or []:
+            references[field].add(
+                entry.get("source", "") if isinstance(entry, dict) else entry
+            )
+
+    return references
+
+
+def prune_config(config: Dict[str, Any], services: List[str]) -> Dict[str, Any]:
+    """Prune a resolved config to the selected services, the services they depend on and the resources they reference.
+
+    Other top-level fields (e.g. ``name`` and ``x-`` extensions) are kept.
+
+    Args:
+        config (Dict[str, Any]): The resolved config. Not modified.
+        services (List[str]): The selected services.
+
+    Returns:
+        Dict[str, Any]: The pruned config. Shares the definitions with ``config``.
+    """
+    definitions = config.get("services", None) or {}
+    closure = get_closure(config, services)
+
+    references = {field: set() for field in RESOURCE_FIELDS}
+    for service in closure:
+        for field, names in get_references(definitions[service] or {}).items():
+            references[field].update(names)
+
+    pruned = dict(config)
+    pruned["services"] = {s: definitions[s] for s in closure}
+    for field in RESOURCE_FIELDS:
+        resources = config.get(field, None)
+        if not isinstance(resources, dict):
+            continue
+        if any("$" in name for name in references[field]):
+            # The referenced names are only known after interpolation
+            continue
+        pruned[field] = {k: v for k, v in resources.items() if k in references[field]}
+        if not pruned[field]:
+            del pruned[field]
+    return pruned
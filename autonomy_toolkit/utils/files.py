@@ -5,10 +5,15 @@ Provides helper methods for interacting with the filesystem.
 
 # Import some utils
 from autonomy_toolkit.utils.logger import LOGGER
+from autonomy_toolkit.utils.profiler import profile
+from autonomy_toolkit.utils.interpolation import InterpolationError, interpolate
 
 # External library imports
-from typing import Union
+from typing import Any, Union, Dict, List, Mapping, Optional
 from pathlib import Path
+import json
+import os
+import threading
 
 
 def file_exists(
@@ -37,30 +42,166 @@ def file_exists(
     return is_file
 
 
-def search_upwards_for_file(filename: Union[Path, str]) -> Path:
+SEARCH_BOUNDARIES = ["git", "home", "fs"]
+"""The boundaries at which :func:`search_upwards_for_file` can stop.
+
+- ``git``: the root of the git repository (i.e. the directory containing ``.git``)
+- ``home``: the user's home directory
+- ``fs``: the root of the filesystem (i.e. the search doesn't cross mount points)
+"""
+
+# The maximum number of entries in the on-disk discovery index
+_MAX_INDEX_ENTRIES = 256
+
+
+@profile()
+def search_upwards_for_file(
+    filename: Union[Path, str, List[Union[Path, str]]],
+    *,
+    boundaries: Optional[List[str]] = None,
+    use_cache: bool = False,
+) -> Optional[Path]:
     """Search in the current directory and all directories above it
     for a file of a particular name.
 
+    A single candidate filename is looked up with a stat per level. Several candidates are matched against a single
+    listing of each directory, regardless of their number, so that each level still costs one filesystem round trip.
+
     Arg:
-        filename (str): the filename to look for.
+        filename (Union[Path, str, List[Union[Path, str]]]): the filename to look for. If a list, the first candidate found at the lowest level is returned.
+        boundaries (Optional[List[str]]): the boundaries at which to stop searching, see :data:`SEARCH_BOUNDARIES`. The boundary directory itself is still searched. Defaults to ``$ATK_SEARCH_BOUNDARIES`` (comma separated) or none.
+        use_cache (bool): whether to use the on-disk index of previous results. A hit is validated with a stat of the found file and of every directory between the current directory and the hit, so a candidate created later in a nearer directory invalidates it.
 
     Returns:
         Path: the location of the first file found or None, if none was found
     """
+    candidates = filename if isinstance(filename, list) else [filename]
+    candidates = [str(candidate) for candidate in candidates]
+    if boundaries is None:
+        boundaries = os.environ.get("ATK_SEARCH_BOUNDARIES", "")
+        boundaries = [b.strip() for b in boundaries.split(",") if b.strip()]
+    for boundary in boundaries:
+        if boundary not in SEARCH_BOUNDARIES:
+            raise ValueError(
+                f"Unknown search boundary '{boundary}'. Must be one of {SEARCH_BOUNDARIES}."
+            )
+
     d = Path.cwd()
+    key = "\0".join([str(d), *candidates, *sorted(boundaries)])
+    if use_cache:
+        index = _read_discovery_index()
+        entry = index.get(key)
+        if isinstance(entry, list) and len(entry) == 2:
+            found, mtimes = Path(entry[0]), entry[1]
+            if found.is_file() and _get_dir_mtimes(d, found) == mtimes:
+                return found
+
+    attempt = _search_upwards(d, candidates, boundaries)
+
+    if use_cache and attempt is not None:
+        mtimes = _get_dir_mtimes(d, attempt)
+        if mtimes is not None:
+            index.pop(key, None)
+            index[key] = [str(attempt), mtimes]
+            _write_discovery_index(index)
+
+    return attempt
+
+
+def _search_upwards(
+    d: Path, candidates: List[str], boundaries: List[str]
+) -> Optional[Path]:
     root = Path(d.root)
+    home = Path.home() if "home" in boundaries else None
+    device = os.stat(d).st_dev if "fs" in boundaries else None
 
     while d != root:
-        attempt = d / filename
-        if attempt.exists():
-            return attempt
-        if d == d.parent:
+        if len(candidates) == 1:
+            # A single candidate is cheaper to stat than to find in the listing of a (possibly large) directory
+            if _stat_exists(d / candidates[0]):
+                return d / candidates[0]
+            at_git_root = "git" in boundaries and _stat_exists(d / ".git")
+        else:
+            try:
+                entries = set(os.listdir(d))
+            except OSError:
+                entries = set()
+
+            for candidate in candidates:
+                # Candidates with a directory component can't be matched against the listing
+                if os.sep in candidate or (os.altsep and os.altsep in candidate):
+                    if (d / candidate).exists():
+                        return d / candidate
+                elif candidate in entries:
+                    return d / candidate
+            at_git_root = "git" in boundaries and ".git" in entries
+
+        if d == d.parent or d == home or at_git_root:
             break
+        if device is not None:
+            try:
+                if os.stat(d.parent).st_dev != device:
+                    break
+            except OSError:
+                break
         d = d.parent
 
     return None
 
 
+def _stat_exists(path: Path) -> bool:
+    try:
+        os.stat(path)
+    except OSError:
+        return False
+    return True
+
+
+def _get_discovery_index_file() -> Path:
+    from autonomy_toolkit.utils.cache import get_cache_dir
+
+    return get_cache_dir("discovery") / "index.json"
+
+
+def _get_dir_mtimes(d: Path, found: Path) -> Optional[List[int]]:
+    # Creating a file changes the mtime of its directory, so these detect a candidate
+    # added to any level between the current directory and the hit (inclusive)
+    if found.parent != d and found.parent not in d.parents:
+        return None
+    dirs = [d, *d.parents]
+    try:
+        return [os.stat(p).st_mtime_ns for p in dirs[: dirs.index(found.parent) + 1]]
+    except OSError:
+        return None
+
+
+def _read_discovery_index() -> Dict[str, Any]:
+    try:
+        with open(_get_discovery_index_file(), "r") as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_discovery_index(index: Dict[str, Any]):
+    # Only keep the most recently added entries
+    while len(index) > _MAX_INDEX_ENTRIES:
+        index.pop(next(iter(index)))
+
+    index_file = _get_discovery_index_file()
+    try:
+        # The index may be written by several threads (e.g. `atk multi`) at once
+        temp_file = index_file.with_name(
+            f".{index_file.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(temp_file, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_file, index_file)
+    except OSError as e:
+        LOGGER.debug(f"Failed to write the discovery index: {e}")
+
+
 def read_file(filename: Union[Path, str]) -> str:
     """Read in the passed file and return it as a string.
 
@@ -81,3 +222,54 @@ def read_file(filename: Union[Path, str]) -> str:
     LOGGER.debug(f"Read '{filename}' as 'yaml'.")
 
     return text
+
+
+def read_env_file(filename: Union[Path, str]) -> Dict[str, str]:
+    """Read in the passed env file and return the variables it defines.
+
+    Lines are expected to be of the form ``KEY=VALUE``. Empty lines and lines starting with ``#`` are ignored, as is
+    a leading ``export``. Surrounding quotes are stripped from the values.
+
+    Args:
+        filename (str): the env file to read
+
+    Returns:
+        Dict[str, str]: the variables defined in the env file. Empty if the file does not exist.
+    """
+    if not file_exists(filename):
+        return {}
+
+    env = {}
+    with open(filename, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            key = key.strip()
+            if key.startswith("export "):
+                key = key[len("export ") :].strip()
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            env[key] = value
+    return env
+
+
+def expand_variables(value: str, env: Mapping[str, str]) -> str:
+    """Expand the variables in the passed string, like ``docker compose`` would. See :func:`interpolate`.
+
+    Variables that are not defined in ``env`` (and have no default) are left as is, as is a string that isn't a valid
+    template.
+
+    Args:
+        value (str): the string to expand
+        env (Mapping[str, str]): the variables to substitute
+
+    Returns:
+        str: the expanded string
+    """
+    try:
+        return interpolate(value, env, keep_undefined=True)
+    except InterpolationError:
+        return value
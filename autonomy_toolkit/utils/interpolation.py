@@ -0,0 +1,151 @@
+# SPDX-License-Identifier: MIT
+"""
+Interpolation of variables in strings and configs, following the rules of ``docker compose``:
+
+- ``$VAR`` and ``${VAR}`` are replaced by the value of ``VAR``.
+- ``${VAR:-default}`` and ``${VAR-default}`` use ``default`` if ``VAR`` is unset or empty (``:-``) or unset (``-``).
+- ``${VAR:?error}`` and ``${VAR?error}`` raise an :class:`InterpolationError` if ``VAR`` is unset or empty (``:?``) or unset (``?``).
+- ``${VAR:+alternative}`` and ``${VAR+alternative}`` use ``alternative`` if ``VAR`` is set and non-empty (``:+``) or set (``+``).
+- ``$$`` is a literal ``$``.
+
+Defaults, errors and alternatives may contain variables themselves.
+"""
+
+# External imports
+from typing import Any, Mapping, Tuple
+import re
+
+_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_OPERATORS = (":-", ":?", ":+", "-", "?", "+")
+
+
+class InterpolationError(ValueError):
+    """Raised if a variable is required but not set or a template is invalid."""
+
+
+def interpolate(
+    value: str, env: Mapping[str, str], *, keep_undefined: bool = False
+) -> str:
+    """Interpolate the variables in a string.
+
+    Args:
+        value (str): The string.
+        env (Mapping[str, str]): The variables.
+        keep_undefined (bool): Whether to leave variables that are not defined (and have no default) as is, instead of
+            replacing them with an empty string. Required variables that are not defined are then left as is, too.
+
+    Returns:
+        str: The interpolated string.
+
+    Raises:
+        InterpolationError: If a required variable is not defined or the string contains an invalid ``${...}``.
+    """
+    if "$" not in value:
+        return value
+
+    result = []
+    i = 0
+    while i < len(value):
+        start = value.find("$", i)
+        if start < 0:
+            result.append(value[i:])
+            break
+        result.append(value[i:start])
+
+        nxt = value[start + 1 : start + 2]
+        if nxt == "$":
+            result.append("$")
+            i = start + 2
+        elif nxt == "{":
+            replacement, i = _interpolate_braced(value, start, env, keep_undefined)
+            result.append(replacement)
+        else:
+            match = _NAME_PATTERN.match(value, start + 1)
+            if match is None:
+                # A lone `$` is kept
+                result.append("$")
+                i = start + 1
+                continue
+            name = match.group(0)
+            if name in env:
+                result.append(env[name])
+            elif keep_undefined:
+                result.append(f"${name}")
+            i = match.end()
+    return "".join(result)
+
+
+def interpolate_config(
+    config: Any, env: Mapping[str, str], *, keep_undefined: bool = False
+) -> Any:
+    """Interpolate the variables in all the string values of a config. Keys are left as is.
+
+    See :func:`interpolate`.
+    """
+    if isinstance(config, str):
+        return interpolate(config, env, keep_undefined=keep_undefined)
+    if isinstance(config, dict):
+        return {
+            k: interpolate_config(v, env, keep_undefined=keep_undefined)
+            for k, v in config.items()
+        }
+    if isinstance(config, list):
+        return [
+            interpolate_config(v, env, keep_undefined=keep_undefined) for v in config
+        ]
+    return config
+
+
+def _interpolate_braced(
+    value: str, start: int, env: Mapping[str, str], keep_undefined: bool
+) -> Tuple[str, int]:
+    # `start` points to the `$` of `${`. Find the matching `}`, skipping over nested `${...}`.
+    end, depth = start + 2, 1
+    while end < len(value):
+        if value.startswith("${", end):
+            depth += 1
+            end += 2
+            continue
+        if value[end] == "}":
+            depth -= 1
+            if depth == 0:
+                break
+        end += 1
+    if depth:
+        raise InterpolationError(f"Invalid template '{value[start:]}': missing '}}'.")
+
+    template = value[start + 2 : end]
+    match = _NAME_PATTERN.match(template)
+    if match is None:
+        raise InterpolationError(f"Invalid template '${{{template}}}'.")
+    name, rest = match.group(0), template[match.end() :]
+    operator = next((op for op in _OPERATORS if rest.startswith(op)), None)
+    if rest and operator is None:
+        raise InterpolationError(f"Invalid template '${{{template}}}'.")
+    argument = rest[len(operator) :] if operator else ""
+
+    # With a `:`, empty variables are treated like unset ones
+    if operator is not None and operator.startswith(":"):
+        missing = env.get(name, "") == ""
+    else:
+        missing = name not in env
+
+    end += 1
+    if operator in (":+", "+"):
+        if missing:
+            return "", end
+        return interpolate(argument, env, keep_undefined=keep_undefined), end
+    if not missing:
+        return env[name], end
+    if operator in (":-", "-"):
+        return interpolate(argument, env, keep_undefined=keep_undefined), end
+    if keep_undefined:
+        return value[start:end], end
+    if operator in (":?", "?"):
+        message = interpolate(argument, env, keep_undefined=keep_undefined)
+        raise InterpolationError(
+            f"Required variable '{name}' is missing a value: {message}"
+            if message
+            else f"Required variable '{name}' is missing a value."
+        )
+    return "", end
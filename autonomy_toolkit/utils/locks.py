@@ -0,0 +1,105 @@
+# SPDX-License-Identifier: MIT
+"""
+Advisory file locks, such that concurrent ``atk`` processes (e.g. parallel CI jobs in one checkout) can share state.
+
+Locks are only taken around the read-modify-write of shared files, such as the build fingerprints, and on the
+generated compose file that a process uses, such that it isn't garbage collected underneath it. On platforms without
+``fcntl``, locking is a no-op.
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External imports
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(
+    filename: Union[Path, str], *, shared: bool = False, blocking: bool = True
+) -> Iterator[bool]:
+    """Hold a lock on a lock file while in the context.
+
+    The lock file is created if it doesn't exist and never removed, as removing it would race with other processes.
+
+    Args:
+        filename (Union[Path, str]): The lock file, typically the shared file with a ``.lock`` suffix.
+        shared (bool): Whether to take a shared lock, which other shared locks don't exclude, instead of an exclusive one.
+        blocking (bool): Whether to wait for the lock. Otherwise, the context is entered without it.
+
+    Yields:
+        bool: Whether the lock is held. Always True if ``blocking`` is set.
+    """
+    try:
+        f = open(filename, "a")
+    except OSError as e:
+        LOGGER.debug("Failed to open lock file '%s': %s", filename, e)
+        yield True
+        return
+
+    with f:
+        if fcntl is not None:
+            flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(f, flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+
+
+def hold_file(filename: Union[Path, str]) -> Optional[IO]:
+    """Take a shared lock on a file, which is held until the returned file object is closed.
+
+    Args:
+        filename (Union[Path, str]): The file.
+
+    Returns:
+        Optional[IO]: The open file or None if the file doesn't exist (anymore).
+    """
+    try:
+        f = open(filename, "rb")
+    except OSError:
+        return None
+
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_SH)
+
+    # The file may have been removed or replaced before the lock was taken
+    try:
+        if os.stat(filename).st_ino != os.fstat(f.fileno()).st_ino:
+            raise FileNotFoundError(filename)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def try_remove(filename: Union[Path, str]) -> bool:
+    """Remove a file unless another process holds it (see :func:`hold_file`).
+
+    Args:
+        filename (Union[Path, str]): The file.
+
+    Returns:
+        bool: Whether the file was removed.
+    """
+    try:
+        with open(filename, "rb") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if os.stat(filename).st_ino != os.fstat(f.fileno()).st_ino:
+                # Replaced by a new file in the meantime, which is in use
+                return False
+            os.unlink(filename)
+    except OSError:
+        return False
+    return True
@@ -13,10 +13,23 @@ Should be used like the following:
     LOGGER.error("Error")
     LOGGER.warn("Warning")
     LOGGER.info("Information")
-    LOGGER.debug("Debug")
+    LOGGER.debug("Debug: %s", value)
+
+Prefer passing arguments (``%s``) over f-strings, such that messages below the logging level are never formatted.
+
+Logs are written to stderr as colored text by default. For automation, ``--log-format json`` (or ``$ATK_LOG_FORMAT=json``)
+writes one JSON object per line instead, without looking up the caller of each log call. With ``--log-queue``
+(or ``$ATK_LOG_QUEUE=1``), records are handed to a background thread, such that a slow consumer of stderr doesn't stall
+``atk``. See :func:`configure_logging`.
 """
 
 import logging
+import logging.handlers
+import json
+import os
+import queue
+import time
+from typing import Optional
 from colorlog import ColoredFormatter
 
 # Create logger
@@ -57,7 +70,93 @@ def set_verbosity(verbosity: int):
     level = DEFAULT_LOGGING_LEVEL - verbosity * 10
     LOGGER.setLevel(level)
     CONSOLE_HANDLER.setLevel(level)
-    LOGGER.log(level, f"Verbosity has been set to {logging.getLevelName(level)}")
+    LOGGER.log(level, "Verbosity has been set to %s", logging.getLevelName(level))
+
+
+# The attributes every LogRecord has. Any other attribute was passed with `extra` and is included in JSON logs.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats each record as a single line JSON object.
+
+    Each object has the ``time`` (ISO 8601, UTC), ``level``, ``logger`` and ``message`` keys, an ``exception`` key if
+    an exception was logged and any fields passed with ``extra``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+LOG_FORMATS = ["text", "json"]
+"""The available log formats."""
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(
+    log_format: Optional[str] = None, use_queue: Optional[bool] = None
+):
+    """
+    Configure how logs are written.
+
+    Args:
+        log_format (Optional[str]): One of :data:`LOG_FORMATS`. Defaults to ``$ATK_LOG_FORMAT`` or ``text``.
+        use_queue (Optional[bool]): Whether to write the logs from a background thread. Defaults to whether ``$ATK_LOG_QUEUE`` is set to a non-empty value.
+    """
+    global _LISTENER
+
+    log_format = log_format or os.environ.get("ATK_LOG_FORMAT", "") or "text"
+    if log_format not in LOG_FORMATS:
+        raise ValueError(
+            f"Log format should be one of {LOG_FORMATS}. Got '{log_format}'."
+        )
+    if use_queue is None:
+        use_queue = bool(os.environ.get("ATK_LOG_QUEUE", ""))
+
+    if log_format == "json":
+        CONSOLE_HANDLER.setFormatter(JSONFormatter())
+
+        # The caller, thread and process of a record are only needed by the text format. Looking up the caller
+        # walks the stack on every log call.
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+    if use_queue and _LISTENER is None:
+        records = queue.SimpleQueue()
+        LOGGER.removeHandler(CONSOLE_HANDLER)
+        LOGGER.addHandler(logging.handlers.QueueHandler(records))
+        _LISTENER = logging.handlers.QueueListener(
+            records, CONSOLE_HANDLER, respect_handler_level=True
+        )
+        _LISTENER.start()
+
+
+def flush_logging():
+    """Write the queued logs and stop the background thread, if :func:`configure_logging` started one."""
+    global _LISTENER
+
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+        for handler in list(LOGGER.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                LOGGER.removeHandler(handler)
+        LOGGER.addHandler(CONSOLE_HANDLER)
 
 
 def dumps_dict(dic: dict) -> str:
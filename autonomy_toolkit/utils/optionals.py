@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: MIT
+"""
+Merge engine for the ``x-optionals`` field of the ``atk.yml`` file.
+
+Each optional is compiled once into a flat list of :class:`Patch` objects, one per leaf of the optional. The patches of all
+selected optionals are then applied to each service in a single pass. The semantics match an additive deep merge,
+except that list entries that are already present in the service are not added again.
+
+An optional may contain an ``x-services`` field with the names of the services it should be applied to. By default, an
+optional is applied to all services.
+"""
+
+# External library imports
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+SERVICES_KEY = "x-services"
+"""The key in an optional that lists the services it targets."""
+
+
+@dataclass
+class Patch:
+    """A change at a single path in a service.
+
+    Args:
+        path (Tuple[str, ...]): The keys leading to the value that is changed.
+        op (str): One of ``set`` (replace the value), ``extend`` (add the list entries that aren't present yet) or
+            ``dict`` (make sure the value is a dict).
+        value (Any): The value to set or the list entries to add.
+        services (Optional[List[str]]): The services the patch applies to. None for all services.
+    """
+
+    path: Tuple[str, ...]
+    op: str
+    value: Any = None
+    services: Optional[List[str]] = None
+
+
+def compile_patches(optional: Any, services: Optional[List[str]] = None) -> List[Patch]:
+    """Compile an optional into a list of patches.
+
+    Args:
+        optional (Any): The optional, i.e. the value of an entry in ``x-optionals``. Usually a dict.
+        services (Optional[List[str]]): The services the patches apply to. Defaults to the optional's ``x-services`` field or all services.
+
+    Returns:
+        List[Patch]: The patches.
+
+    Raises:
+        ValueError: If the optional is not a dict or its ``x-services`` field is not a service name or a list of them.
+    """
+    if not isinstance(optional, dict):
+        raise ValueError(f"Expected a mapping, got '{type(optional).__name__}'.")
+
+    if SERVICES_KEY in optional:
+        optional = dict(optional)
+        targets = optional.pop(SERVICES_KEY)
+        services = [targets] if isinstance(targets, str) else targets
+        if not isinstance(services, list) or not all(
+            isinstance(s, str) for s in services
+        ):
+            raise ValueError(
+                f"Expected '{SERVICES_KEY}' to be a service name or a list of service names, got '{targets}'."
+            )
+
+    patches = []
+    _compile(optional, (), services, patches)
+    return patches
+
+
+def _compile(
+    value: Any,
+    path: Tuple[str, ...],
+    services: Optional[List[str]],
+    patches: List[Patch],
+):
+    if isinstance(value, dict):
+        if not value and path:
+            patches.append(Patch(path, "dict", services=services))
+        for key, child in value.items():
+            _compile(child, path + (key,), services, patches)
+    elif isinstance(value, list):
+        patches.append(Patch(path, "extend", value, services))
+    else:
+        patches.append(Patch(path, "set", value, services))
+
+
+def apply_patches(service_name: str, service: Dict[str, Any], patches: List[Patch]):
+    """Apply the patches to a service in place.
+
+    Args:
+        service_name (str): The name of the service. Used to filter the patches.
+        service (Dict[str, Any]): The service config.
+        patches (List[Patch]): The patches, see :func:`compile_patches`.
+    """
+    for patch in patches:
+        if patch.services is not None and service_name not in patch.services:
+            continue
+
+        # Walk to the parent of the patched value, replacing non-dicts along the way
+        parent = service
+        for key in patch.path[:-1]:
+            child = parent.get(key, None)
+            if not isinstance(child, dict):
+                child = parent[key] = {}
+            parent = child
+        key = patch.path[-1]
+        current = parent.get(key, None)
+
+        if patch.op == "dict":
+            if not isinstance(current, dict):
+                parent[key] = {}
+        elif patch.op == "extend":
+            if not isinstance(current, list):
+                current = parent[key] = []
+            for entry in patch.value:
+                if entry not in current:
+                    current.append(_copy(entry))
+        else:
+            parent[key] = _copy(patch.value)
+
+
+def _copy(value: Any) -> Any:
+    return deepcopy(value) if isinstance(value, (dict, list)) else value
@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: MIT
+"""
+Provides a streaming subprocess runner.
+
+The output of the process is read line-by-line as it is produced. Each line is either passed through to this process'
+stdout/stderr or logged, and the last lines are kept in a :class:`RingBuffer` of bounded size for error reports.
+"""
+
+# Import some utils
+from autonomy_toolkit.utils.logger import LOGGER
+
+# External library imports
+from collections import deque
+from dataclasses import dataclass
+from typing import IO, Callable, List, Optional
+import subprocess
+import threading
+import sys
+
+DEFAULT_TAIL_SIZE = 64 * 1024
+"""The default number of bytes of output kept for error reports."""
+
+
+class RingBuffer:
+    """Thread-safe buffer that keeps the last ``max_size`` bytes of the lines written to it.
+
+    Args:
+        max_size (int): The maximum number of bytes to keep.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_TAIL_SIZE):
+        self.max_size = max_size
+        self._lines = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, line: bytes):
+        """Append a line, dropping the oldest lines if the buffer is full."""
+        line = line[-self.max_size :]
+        with self._lock:
+            self._lines.append(line)
+            self._size += len(line)
+            while self._size > self.max_size:
+                self._size -= len(self._lines.popleft())
+
+    def getvalue(self) -> str:
+        """Get the contents of the buffer as a string."""
+        with self._lock:
+            return b"".join(self._lines).decode(errors="replace")
+
+
+@dataclass
+class StreamingResult:
+    """The result of :func:`run_streaming`.
+
+    Args:
+        returncode (int): The returncode of the process.
+        stdout (str): The complete stdout. Only set if ``capture`` was True.
+        stderr (str): The complete stderr. Only set if ``capture`` was True.
+        tail (str): The last bytes of the combined stdout and stderr.
+    """
+
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    tail: str = ""
+
+
+def run_streaming(
+    args: List[str],
+    *,
+    capture: bool = False,
+    passthrough: bool = True,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+    on_line: Optional[Callable[[bytes], None]] = None,
+    **kwargs,
+) -> StreamingResult:
+    """Run a process and stream its output.
+
+    Args:
+        args (List[str]): The command to run.
+        capture (bool): Whether to keep the complete stdout and stderr. Memory then grows with the output. Defaults to False.
+        passthrough (bool): Whether to write each line to this process' stdout/stderr. Otherwise, lines are logged at the DEBUG level. Defaults to True.
+        tail_size (int): The number of bytes of output to keep in :attr:`StreamingResult.tail`.
+        on_line (Optional[Callable[[bytes], None]]): Called with each line of stdout and stderr, from the threads that read them.
+
+    Other keyword arguments are passed to :class:`subprocess.Popen`.
+
+    Returns:
+        StreamingResult: The result.
+    """
+    tail = RingBuffer(tail_size)
+    outputs = {"stdout": [], "stderr": []}
+
+    def pump(name: str, stream: IO[bytes], sink: IO[bytes]):
+        for line in iter(stream.readline, b""):
+            tail.write(line)
+            if on_line is not None:
+                on_line(line)
+            if capture:
+                outputs[name].append(line)
+            if passthrough:
+                sink.write(line)
+                sink.flush()
+            else:
+                LOGGER.debug("%s", line.decode(errors="replace").rstrip("\n"))
+        stream.close()
+
+    process = subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs
+    )
+    threads = [
+        threading.Thread(
+            target=pump, args=("stdout", process.stdout, _binary(sys.stdout))
+        ),
+        threading.Thread(
+            target=pump, args=("stderr", process.stderr, _binary(sys.stderr))
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+    returncode = process.wait()
+    for thread in threads:
+        thread.join()
+
+    def join(lines: List[bytes]) -> str:
+        output = b"".join(lines).decode(errors="replace")
+        return output[:-1] if output.endswith("\n") else output
+
+    return StreamingResult(
+        returncode,
+        stdout=join(outputs["stdout"]),
+        stderr=join(outputs["stderr"]),
+        tail=tail.getvalue(),
+    )
+
+
+def _binary(stream: IO) -> Optional[IO[bytes]]:
+    return getattr(stream, "buffer", stream)
@@ -0,0 +1,161 @@
+# SPDX-License-Identifier: MIT
+"""
+Provides lightweight timing instrumentation for the phases of an ``atk`` invocation.
+
+Spans are only recorded if the :data:`PROFILER` is enabled (i.e. ``atk dev --profile``), otherwise they cost a single
+attribute lookup. Should be used like the following:
+
+.. highlight:: python
+.. code-block:: python
+
+    from autonomy_toolkit.utils.profiler import PROFILER, profile
+
+    @profile()
+    def read():
+        ...
+
+    with PROFILER.span("build", service="dev"):
+        ...
+"""
+
+# External library imports
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+
+@dataclass
+class Span:
+    """A timed phase.
+
+    Args:
+        name (str): The name of the phase.
+        start (float): The start time in seconds, relative to when the profiler was enabled.
+        duration (float): The duration in seconds.
+        depth (int): The number of enclosing spans in the same thread.
+        thread (int): The id of the thread the span was recorded in.
+        args (Dict[str, Any]): Additional information about the phase.
+    """
+
+    name: str
+    start: float
+    duration: float = 0.0
+    depth: int = 0
+    thread: int = 0
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class Profiler:
+    """Records :class:`Span` objects and reports them as a table or a Chrome trace."""
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Span] = []
+        self._origin = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """Start recording spans."""
+        self.enabled = True
+        self.spans = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Time the enclosed block. Does nothing if the profiler is disabled.
+
+        Args:
+            name (str): The name of the phase.
+
+        Other keyword arguments are stored in :attr:`Span.args`.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        depth = getattr(self._local, "depth", 0)
+        span = Span(
+            name,
+            time.perf_counter() - self._origin,
+            depth=depth,
+            thread=threading.get_ident(),
+            args={k: str(v) for k, v in args.items()},
+        )
+        with self._lock:
+            self.spans.append(span)
+
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            span.duration = time.perf_counter() - self._origin - span.start
+
+    def format_table(self) -> str:
+        """Format the recorded spans as a human-readable table, in the order they started."""
+        threads = {}
+        lines = [f"{'start (ms)':>10} {'time (ms)':>10}  phase"]
+        for span in sorted(self.spans, key=lambda s: s.start):
+            thread = threads.setdefault(span.thread, len(threads))
+            name = "  " * span.depth + span.name
+            if span.args:
+                name += f" ({', '.join(f'{k}={v}' for k, v in span.args.items())})"
+            if thread:
+                name += f" [thread {thread}]"
+            lines.append(
+                f"{span.start * 1e3:>10.1f} {span.duration * 1e3:>10.1f}  {name}"
+            )
+        return "\n".join(lines)
+
+    def write_trace(self, filename: str):
+        """Write the recorded spans as a Chrome trace (see ``chrome://tracing`` or https://ui.perfetto.dev).
+
+        The file is also machine-readable JSON: each event has a ``name``, a start (``ts``) and a duration (``dur``)
+        in microseconds and the span's ``args``.
+        """
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": os.getpid(),
+                "tid": span.thread,
+                "args": span.args,
+            }
+            for span in self.spans
+        ]
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, indent=1)
+
+
+PROFILER = Profiler()
+"""The global profiler."""
+
+
+def profile(name: Optional[str] = None) -> Callable:
+    """Decorator that records a span for each call of the decorated function.
+
+    Args:
+        name (Optional[str]): The name of the span. Defaults to the qualified name of the function.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
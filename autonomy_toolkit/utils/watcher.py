@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: MIT
+"""
+Polls for changes to files (or anything else that can be summarized by a token), with debouncing.
+
+Polling keeps ``autonomy-toolkit`` free of platform specific file notification dependencies and works on network
+filesystems and bind mounts, where notifications are often unreliable. Should be used like the following:
+
+.. highlight:: python
+.. code-block:: python
+
+    from autonomy_toolkit.utils.watcher import Watcher, stat_files
+
+    watcher = Watcher(lambda: stat_files(["atk.yml", "atk.env"]))
+    while True:
+        changed = watcher.wait()
+        ...
+"""
+
+# External library imports
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+import os
+import time
+
+# A function that returns a token per watched key. A key changed if its token changed.
+Snapshot = Callable[[], Dict[str, Any]]
+
+
+def stat_files(files: Iterable[Union[Path, str]]) -> Dict[str, Any]:
+    """Summarize files by their modification time and size. Missing files are summarized as None."""
+    tokens = {}
+    for filename in files:
+        try:
+            stat = os.stat(filename)
+            tokens[str(filename)] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            tokens[str(filename)] = None
+    return tokens
+
+
+class Watcher:
+    """Waits for the result of a snapshot function to change.
+
+    Args:
+        snapshot (Snapshot): Returns a token per watched key.
+        interval (float): The number of seconds between snapshots.
+        debounce (float): The number of seconds the snapshot must be unchanged before changes are reported, such that
+            a burst of edits (e.g. a save of many files or a ``git checkout``) is reported once.
+    """
+
+    def __init__(
+        self, snapshot: Snapshot, *, interval: float = 0.5, debounce: float = 0.5
+    ):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.debounce = debounce
+        self._baseline = snapshot()
+
+    def reset(self, snapshot: Optional[Snapshot] = None):
+        """Take a new baseline, optionally with a new snapshot function (e.g. if the watched files changed)."""
+        if snapshot is not None:
+            self.snapshot = snapshot
+        self._baseline = self.snapshot()
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Wait until the snapshot changed and then stayed unchanged for :attr:`debounce` seconds.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait. Waits forever if None.
+
+        Returns:
+            Set[str]: The keys whose tokens changed (or were added or removed). Empty if the timeout was reached.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        current = self._baseline
+        last_change = None
+        while True:
+            time.sleep(self.interval)
+            latest = self.snapshot()
+            if latest != current:
+                current, last_change = latest, time.monotonic()
+            elif (
+                last_change is not None
+                and time.monotonic() - last_change >= self.debounce
+            ):
+                break
+            if (
+                deadline is not None
+                and time.monotonic() > deadline
+                and last_change is None
+            ):
+                return set()
+
+        changed = _diff_keys(self._baseline, current)
+        self._baseline = current
+        return changed
+
+
+def diff_services(
+    old: Dict[str, Any], new: Dict[str, Any], services: List[str]
+) -> List[str]:
+    """Get the services whose definition differs between two resolved configs.
+
+    If any other top-level field that services may reference (e.g. ``networks`` or ``volumes``) changed,
+    all services are considered changed.
+
+    Args:
+        old (Dict[str, Any]): The previous resolved config.
+        new (Dict[str, Any]): The new resolved config.
+        services (List[str]): The services to compare.
+
+    Returns:
+        List[str]: The changed services, in the order of ``services``.
+    """
+    shared = ("networks", "volumes", "secrets", "configs")
+    if any(old.get(key, None) != new.get(key, None) for key in shared):
+        return list(services)
+
+    old_services = old.get("services", None) or {}
+    new_services = new.get("services", None) or {}
+    return [
+        s for s in services if old_services.get(s, None) != new_services.get(s, None)
+    ]
+
+
+def _diff_keys(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
@@ -0,0 +1,254 @@
+# SPDX-License-Identifier: MIT
+"""
+Benchmark of the overhead of ``atk`` itself, separated from docker.
+
+Each phase of ``atk dev`` (argument parsing, :class:`ATKConfig` construction, ``read``, ``load``,
+``update_services_with_optionals``, ``write`` and the full pipeline) is timed against a synthetic project. The ``docker``
+executable is replaced by a stub on ``PATH`` that returns a canned ``compose config`` output after a configurable latency,
+so only the cost of spawning it remains.
+
+The results can be saved and compared with the results of another commit:
+
+.. code-block:: bash
+
+    python benchmarks/cli_pipeline.py --services 200 --optionals 8 --include-depth 3 --save
+    git checkout <other commit>
+    python benchmarks/cli_pipeline.py --services 200 --optionals 8 --include-depth 3 --compare benchmarks/results/<commit>.json
+"""
+
+# External imports
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import timeit
+import yaml
+
+from yaml_io import generate_atk_yml
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Stub of the docker CLI. `compose config -o <file>` copies the canned resolved config, everything else succeeds.
+FAKE_DOCKER = """#!/bin/sh
+if [ -n "$ATK_BENCH_DOCKER_LATENCY" ] && [ "$ATK_BENCH_DOCKER_LATENCY" != "0" ]; then
+    sleep "$ATK_BENCH_DOCKER_LATENCY"
+fi
+is_config=0
+output=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        config) is_config=1 ;;
+        -o) shift; output="$1" ;;
+    esac
+    shift
+done
+if [ "$is_config" = 1 ] && [ -n "$output" ]; then
+    cp "$ATK_BENCH_RESOLVED" "$output"
+fi
+exit 0
+"""
+
+
+def generate_project(
+    root: Path, num_services: int, num_optionals: int, include_depth: int
+) -> List[str]:
+    """Generate a synthetic project with an ``atk.yml`` file and a chain of included files.
+
+    The canned output of ``compose config`` (i.e. the merged config) is written to ``.bench-resolved.yml``.
+
+    Args:
+        root (Path): The directory of the project.
+        num_services (int): The number of services in the ``atk.yml`` file.
+        num_optionals (int): The number of ``x-optionals``.
+        include_depth (int): The length of the chain of included files. Each included file adds a service.
+
+    Returns:
+        List[str]: The names of the services.
+    """
+    text = generate_atk_yml(num_services, num_optionals)
+    resolved = yaml.load(text, Loader=yaml.SafeLoader)
+    if include_depth:
+        text = "include:\n  - level1.yml\n" + text
+    for level in range(1, include_depth + 1):
+        included = {"services": {f"included{level}": {"image": f"atk/bench:{level}"}}}
+        if level < include_depth:
+            included = {"include": [f"level{level + 1}.yml"], **included}
+        (root / f"level{level}.yml").write_text(yaml.dump(included))
+        resolved["services"].update(included["services"])
+
+    (root / "atk.yml").write_text(text)
+    (root / ".bench-resolved.yml").write_text(yaml.dump(resolved))
+    return list(resolved["services"])
+
+
+def install_fake_docker(bin_dir: Path) -> Path:
+    """Write the docker stub to ``bin_dir`` and prepend it to ``PATH``."""
+    docker = bin_dir / "docker"
+    docker.write_text(FAKE_DOCKER)
+    docker.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    return docker
+
+
+def _bench(
+    stmt: Callable, repeat: int, setup: Optional[Callable] = None
+) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        times.append(timeit.timeit(stmt, number=1))
+    return {"min": min(times), "median": statistics.median(times)}
+
+
+def run_benchmarks(services: List[str], optionals: List[str], repeat: int):
+    from autonomy_toolkit import _atk_base
+    from autonomy_toolkit.utils.atk_config import ATKConfig
+    from autonomy_toolkit.utils.logger import CONSOLE_HANDLER
+    from autonomy_toolkit.containers.docker_client import DockerClient
+
+    # The logs are still formatted, but not printed in between the results
+    CONSOLE_HANDLER.setStream(open(os.devnull, "w"))
+
+    argv = ["dev", "-s", *services[:2], "-u", "--no-wait"]
+    argv += ["-o", *optionals] if optionals else []
+    parser = _atk_base._init(argv)
+    config = ATKConfig("atk.yml", services[:2])
+    client = DockerClient(config)
+    config.load(client, [])
+    resolved = deepcopy(config.config)
+    compose_file = Path(config.compose_file)
+
+    def reset_config():
+        config.config = deepcopy(resolved)
+
+    def remove_compose_file():
+        reset_config()
+        compose_file.unlink(missing_ok=True)
+
+    benchmarks = [
+        ("parse arguments", lambda: parser.parse_known_args(argv), None),
+        ("ATKConfig()", lambda: ATKConfig("atk.yml", services[:2]), None),
+        ("read", config.read, None),
+        ("load (cache miss)", lambda: config.load(client, [], use_cache=False), None),
+        ("load (cache hit)", lambda: config.load(client, []), None),
+        (
+            "update_services_with_optionals",
+            lambda: config.update_services_with_optionals(optionals),
+            reset_config,
+        ),
+        ("write (changed)", config.write, remove_compose_file),
+        ("write (unchanged)", config.write, reset_config),
+        ("atk dev (full pipeline)", lambda: _atk_base._run(argv), None),
+    ]
+
+    results = {}
+    print(f"{'phase':<34}{'min (ms)':>10}{'median (ms)':>13}")
+    for name, stmt, setup in benchmarks:
+        result = _bench(stmt, repeat, setup)
+        results[name] = result
+        print(f"{name:<34}{result['min'] * 1e3:>10.2f}{result['median'] * 1e3:>13.2f}")
+    return results
+
+
+def _get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _compare(results: Dict[str, Dict[str, float]], filename: str):
+    previous = json.loads(Path(filename).read_text())
+    print(f"\nCompared with {previous['commit']} (median):")
+    print(f"{'phase':<34}{'before (ms)':>12}{'after (ms)':>12}{'change':>9}")
+    for name, result in results.items():
+        if name not in previous["results"]:
+            continue
+        before = previous["results"][name]["median"]
+        after = result["median"]
+        change = f"{(after - before) / before:+.0%}" if before else "n/a"
+        print(f"{name:<34}{before * 1e3:>12.2f}{after * 1e3:>12.2f}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--optionals", type=int, default=8)
+    parser.add_argument("--include-depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="The seconds the docker stub sleeps per call.",
+    )
+    parser.add_argument(
+        "--save",
+        nargs="?",
+        const="",
+        help="Save the results to the passed file. Defaults to benchmarks/results/<commit>.json.",
+    )
+    parser.add_argument("--compare", help="Compare with previously saved results.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="atk-bench-") as temp_dir:
+        temp_dir = Path(temp_dir)
+        project, bin_dir = temp_dir / "project", temp_dir / "bin"
+        project.mkdir()
+        bin_dir.mkdir()
+
+        services = generate_project(
+            project, args.services, args.optionals, args.include_depth
+        )
+        install_fake_docker(bin_dir)
+        os.environ["ATK_BENCH_RESOLVED"] = str(project / ".bench-resolved.yml")
+        os.environ["ATK_BENCH_DOCKER_LATENCY"] = str(args.latency)
+        os.environ["ATK_CACHE_DIR"] = str(temp_dir / "cache")
+        os.environ["ATK_NO_DAEMON"] = "1"
+
+        cwd = os.getcwd()
+        os.chdir(project)
+        try:
+            print(
+                f"{args.services} services, {args.optionals} optionals, include depth {args.include_depth}, "
+                f"docker latency {args.latency * 1e3:.0f} ms, {args.repeat} runs"
+            )
+            optionals = [f"opt{i}" for i in range(args.optionals)]
+            results = run_benchmarks(services, optionals, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    if args.compare:
+        _compare(results, args.compare)
+
+    if args.save is not None:
+        commit = _get_commit()
+        filename = Path(args.save or RESULTS_DIR / f"{commit}.json")
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "commit": commit,
+            "python": platform.python_version(),
+            "parameters": {
+                k: v for k, v in vars(args).items() if k not in ("save", "compare")
+            },
+            "results": results,
+        }
+        filename.write_text(json.dumps(data, indent=4))
+        print(f"Saved the results to '{filename}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# SPDX-License-Identifier: MIT
+"""
+Benchmark of applying ``x-optionals`` to the services of a large synthetic config.
+
+Compares the patch based merge engine in :mod:`autonomy_toolkit.utils.optionals` with the previous approach of running
+``mergedeep.merge(..., Strategy.ADDITIVE)`` of each optional into every service. The ``mergedeep`` comparison is skipped if
+it isn't installed.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/optionals_merge.py --services 500 --optionals 8 --repeat 5
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.optionals import compile_patches, apply_patches
+
+# External imports
+from copy import deepcopy
+import argparse
+import timeit
+
+
+def generate_config(num_services: int, num_optionals: int, depth: int = 3) -> dict:
+    """Generate a synthetic resolved config.
+
+    Args:
+        num_services (int): The number of services.
+        num_optionals (int): The number of ``x-optionals``.
+        depth (int): The nesting depth of the dicts in each optional.
+
+    Returns:
+        dict: The config.
+    """
+
+    def nested(i: int, level: int) -> dict:
+        if level == 0:
+            return {f"key{i}": f"value{i}", "list": [f"entry{i}", "shared"]}
+        return {f"level{level}": nested(i, level - 1), f"scalar{level}": i}
+
+    optionals = {
+        f"opt{i}": {
+            "volumes": [f"/tmp/opt{i}:/tmp/opt{i}", "/tmp/shared:/tmp/shared"],
+            "environment": {f"OPT{i}": "yes", "SHARED": "yes"},
+            "x-nested": nested(i, depth),
+        }
+        for i in range(num_optionals)
+    }
+    services = {
+        f"service{i}": {
+            "image": f"atk/bench:service{i}",
+            "volumes": ["/tmp/shared:/tmp/shared"]
+            + [f"./data{j}:/data{j}" for j in range(10)],
+            "environment": {f"VAR{j}": f"value{j}" for j in range(20)},
+            "build": {
+                "context": "./",
+                "args": {f"ARG{j}": f"value{j}" for j in range(10)},
+            },
+        }
+        for i in range(num_services)
+    }
+    return {"name": "bench", "x-optionals": optionals, "services": services}
+
+
+def merge_patches(config: dict):
+    patches = [
+        p for opt in config["x-optionals"].values() for p in compile_patches(opt)
+    ]
+    for name, service in config["services"].items():
+        apply_patches(name, service, patches)
+
+
+def merge_mergedeep(config: dict):
+    import mergedeep
+
+    for opt in config["x-optionals"].values():
+        for service in config["services"].values():
+            mergedeep.merge(service, opt, strategy=mergedeep.Strategy.ADDITIVE)
+
+
+def _bench(func, config: dict, repeat: int) -> float:
+    # Each run needs a fresh copy, as the merges happen in place. The copy is not timed.
+    configs = [deepcopy(config) for _ in range(repeat)]
+    return min(timeit.repeat(lambda: func(configs.pop()), number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--optionals", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    config = generate_config(args.services, args.optionals, args.depth)
+
+    implementations = [("patches", merge_patches)]
+    try:
+        import mergedeep  # noqa: F401
+
+        implementations.append(("mergedeep", merge_mergedeep))
+    except ImportError:
+        print("mergedeep is not installed. Skipping the comparison.")
+
+    print(
+        f"{args.services} services, {args.optionals} optionals, depth {args.depth}, best of {args.repeat}"
+    )
+    print(f"{'implementation':<16}{'merge (ms)':>12}")
+    for name, func in implementations:
+        print(f"{name:<16}{_bench(func, config, args.repeat) * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: MIT
+"""
+Benchmark of the yaml parse and dump times of :class:`ATKConfig` for a synthetic ``atk.yml``.
+
+Compares the libyaml bindings (used by :class:`ATKConfig` when available) with the pure python implementation.
+
+Usage:
+
+.. code-block:: bash
+
+    python benchmarks/yaml_io.py --services 200 --repeat 5
+"""
+
+# External imports
+import argparse
+import timeit
+import yaml
+
+
+def generate_atk_yml(num_services: int, num_optionals: int = 4) -> str:
+    """Generate a synthetic ``atk.yml`` with anchor-expanded sections.
+
+    Args:
+        num_services (int): The number of services.
+        num_optionals (int): The number of ``x-optionals``.
+
+    Returns:
+        str: The contents of the ``atk.yml`` file.
+    """
+    lines = ["name: bench", "x-optionals:"]
+    for i in range(num_optionals):
+        lines += [
+            f"  opt{i}:",
+            "    volumes:",
+            f"      - '/tmp/opt{i}:/tmp/opt{i}'",
+            "    environment:",
+            f"      OPT{i}: 'yes'",
+        ]
+    lines += [
+        "x-common: &common",
+        "  network_mode: host",
+        "  tty: true",
+        "  environment: &common_env",
+        *[f"    VAR{i}: 'value{i}'" for i in range(20)],
+        "  volumes:",
+        *[f"    - './data{i}:/data{i}'" for i in range(10)],
+        "services:",
+    ]
+    for i in range(num_services):
+        lines += [
+            f"  service{i}:",
+            "    <<: *common",
+            f"    image: 'atk/bench:service{i}'",
+            f"    container_name: 'bench-service{i}'",
+            "    build:",
+            "      context: './'",
+            f"      dockerfile: './docker/service{i}.dockerfile'",
+            "      args:",
+            *[f"        ARG{j}: 'value{j}'" for j in range(10)],
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def _bench(stmt, repeat: int) -> float:
+    return min(timeit.repeat(stmt, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = generate_atk_yml(args.services)
+    config = yaml.load(text, Loader=yaml.SafeLoader)
+
+    implementations = [("python", yaml.SafeLoader, yaml.SafeDumper)]
+    if yaml.__with_libyaml__:
+        implementations.append(("libyaml", yaml.CSafeLoader, yaml.CSafeDumper))
+
+    print(
+        f"{args.services} services, {len(text) / 1024:.1f} KiB, best of {args.repeat}"
+    )
+    print(f"{'implementation':<16}{'parse (ms)':>12}{'dump (ms)':>12}")
+    for name, loader, dumper in implementations:
+        parse = _bench(lambda: yaml.load(text, Loader=loader), args.repeat)
+        dump = _bench(lambda: yaml.dump(config, Dumper=dumper), args.repeat)
+        print(f"{name:<16}{parse * 1e3:>12.1f}{dump * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# SPDX-License-Identifier: MIT
+"""Shared fixtures. Every test gets its own cache directory and never talks to a running ``atk daemon``."""
+
+# External imports
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("ATK_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("ATK_NO_DAEMON", "1")
+    monkeypatch.delenv("ATK_RESOLVER", raising=False)
+    monkeypatch.delenv("ATK_SEARCH_BOUNDARIES", raising=False)
@@ -0,0 +1,10 @@
+#!/bin/sh
+# Records the output of `docker compose config` for each fixture, in the form `ATKConfig.load` runs it.
+# Run from this directory after changing a fixture: ./record.sh
+set -e
+for dir in */; do
+    dir=${dir%/}
+    [ -f "$dir/compose-config.yml" ] || continue
+    docker compose -f "$dir/atk.yml" config -o "$dir/compose-config.yml" \
+        --no-interpolate --no-path-resolution --no-normalize --no-consistency
+done
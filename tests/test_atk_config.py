@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: MIT
+"""Loading, caching and writing the resolved config."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+
+# External imports
+from pathlib import Path
+import os
+import pytest
+import yaml
+
+
+class _FakeCompose:
+    """Resolves ``include`` like ``docker compose config`` would, for a single level of includes."""
+
+    dry_run = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def run_compose_cmd(self, *args, **kwargs) -> int:
+        self.calls += 1
+        args = [str(arg) for arg in args]
+        atk_yml = Path(args[args.index("-f") + 1])
+        config = yaml.safe_load(atk_yml.read_text())
+        for include in config.pop("include", []):
+            included = yaml.safe_load((atk_yml.parent / include).read_text())
+            config["services"].update(included["services"])
+        Path(args[args.index("-o") + 1]).write_text(yaml.safe_dump(config))
+        return 0
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / "atk.yml").write_text(
+        "include: [common.yml]\nservices:\n  dev:\n    image: ubuntu\n"
+    )
+    (tmp_path / "common.yml").write_text("services:\n  db:\n    image: postgres\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _load(compose, **kwargs) -> ATKConfig:
+    config = ATKConfig("atk.yml", ["dev"])
+    assert config.load(compose, [], **kwargs)
+    return config
+
+
+def test_cache_hit(project):
+    compose = _FakeCompose()
+    config = _load(compose)
+    assert not config.cache_hit and not config.resolved_in_process
+    assert sorted(config.config["services"]) == ["db", "dev"]
+
+    config = _load(compose)
+    assert config.cache_hit and compose.calls == 1
+    assert sorted(config.config["services"]) == ["db", "dev"]
+
+
+@pytest.mark.parametrize("changed", ["atk.yml", "common.yml", ".env"])
+def test_cache_miss_if_a_file_changed(project, changed):
+    compose = _FakeCompose()
+    _load(compose)
+    with open(project / changed, "a") as f:
+        f.write("\n# changed\n")
+    assert not _load(compose).cache_hit
+    assert compose.calls == 2
+
+
+def test_cache_can_be_bypassed_and_invalidated(project):
+    compose = _FakeCompose()
+    _load(compose)
+    assert not _load(compose, use_cache=False).cache_hit
+
+    assert ATKConfig("atk.yml", ["dev"]).invalidate_cache() == 1
+    assert not _load(compose).cache_hit
+    assert compose.calls == 3
+
+
+def test_corrupt_cache_entry_is_reloaded(project):
+    compose = _FakeCompose()
+    _load(compose)
+    cache_file = ATKConfig("atk.yml", ["dev"])._get_cache_file([])
+    assert cache_file.is_file()
+    cache_file.write_text("services: [")
+
+    config = _load(compose)
+    assert not config.cache_hit and compose.calls == 2
+    assert sorted(config.config["services"]) == ["db", "dev"]
+    assert _load(compose).cache_hit
+
+
+def test_simple_configs_are_resolved_in_process(tmp_path, monkeypatch):
+    (tmp_path / "atk.yml").write_text("services:\n  dev:\n    image: ubuntu\n")
+    monkeypatch.chdir(tmp_path)
+    compose = _FakeCompose()
+    config = _load(compose)
+    assert config.resolved_in_process and compose.calls == 0
+
+
+def test_write_skips_unchanged_files(project):
+    config = ATKConfig("atk.yml", ["dev"])
+    assert config.write() and config.written
+    compose_file = config.compose_file
+    mtime = compose_file.stat().st_mtime_ns
+
+    config = ATKConfig("atk.yml", ["dev"])
+    assert config.write() and not config.written
+    assert compose_file.stat().st_mtime_ns == mtime
+
+    assert config.write(force=True) and config.written
+    config.config["services"]["dev"]["tty"] = True
+    assert config.write() and config.written
+    assert yaml.safe_load(compose_file.read_text())["services"]["dev"]["tty"]
+
+
+def test_write_replaces_atomically(project, monkeypatch):
+    config = ATKConfig("atk.yml", ["dev"])
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(
+        os, "replace", lambda src, dst: replaced.append((src, dst)) or replace(src, dst)
+    )
+    assert config.write()
+    ((src, dst),) = replaced
+    assert Path(dst) == config.compose_file and Path(src).parent == project
+    assert not Path(src).exists()
+    assert list(project.glob("*.tmp")) == []
+
+
+def test_write_to_another_file(project):
+    config = ATKConfig("atk.yml", ["dev"])
+    assert config.write(project / "other.yml") and config.written
+    assert yaml.safe_load((project / "other.yml").read_text()) == config.config
+    assert not config.compose_file.exists()
+    assert config._held_compose_file is None
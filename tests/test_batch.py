@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: MIT
+"""Parsing the steps of ``atk batch`` and reporting the steps that fail."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.batch import (
+    _Step,
+    _config_key,
+    _conflicts,
+    _get_result,
+    _parse_steps,
+    _set_closures,
+)
+
+# External imports
+from concurrent.futures import Future
+from types import SimpleNamespace
+import pytest
+
+
+def test_parse_steps():
+    steps = _parse_steps(
+        ["# comment", "", "atk dev -u -s dev", "dev -s db --optionals gpus"], False
+    )
+    assert [(s.index, s.services) for s in steps] == [(1, ["dev"]), (2, ["db"])]
+    assert steps[1].args.optionals == ["gpus"]
+
+
+@pytest.mark.parametrize("flag", ["--watch", "--profile"])
+def test_parse_steps_rejects_flags(flag):
+    assert _parse_steps(["-u -s dev", f"-u -s dev {flag}"], False) is None
+
+
+def test_get_result_reports_exceptions():
+    step = _Step(1, "-u -s dev", None)
+    future = Future()
+    future.set_exception(RuntimeError("docker is gone"))
+    assert _get_result(future, step) is False
+    assert step.succeeded is False
+
+    step.succeeded = True
+    future = Future()
+    future.set_result(step)
+    assert _get_result(future, step) is True
+
+
+def test_steps_conflict_on_dependencies():
+    steps = _parse_steps(
+        ["-u -s db", "-u -s dev", "-u -s vnc", "-a -s sim", "-u -s unknown"], False
+    )
+    config = {
+        "services": {
+            "db": {},
+            "dev": {"depends_on": {"db": {"condition": "service_healthy"}}},
+            "vnc": {},
+            "sim": {},
+        }
+    }
+    clients = {
+        _config_key(steps[0].args): SimpleNamespace(
+            config=SimpleNamespace(config=config)
+        )
+    }
+    _set_closures(steps, clients)
+    db, dev, vnc, sim, unknown = steps
+
+    assert dev.closure == {"dev", "db"}
+    assert unknown.closure == {"unknown"}
+    assert _conflicts(dev, db) and _conflicts(db, dev)
+    assert not _conflicts(dev, vnc) and not _conflicts(unknown, db)
+    # Attaching needs the terminal
+    assert _conflicts(sim, vnc) and _conflicts(vnc, sim)
@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: MIT
+"""The shared build cache: injecting it into the config, counting cached build steps and evicting old caches."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.locks import file_lock
+from autonomy_toolkit.containers.build_cache import (
+    BuildCache,
+    BuildCounter,
+    get_build_cache,
+    get_cache_key,
+    parse_size,
+)
+
+# External imports
+from pathlib import Path
+import os
+import time
+import pytest
+
+FIXTURES = Path(__file__).parent / "fixtures" / "build_cache"
+
+
+def test_counter_parses_plain_progress():
+    counter = BuildCounter(["base", "dev"], "dev")
+    for line in (FIXTURES / "plain-progress.txt").read_bytes().splitlines(True):
+        counter.feed(line)
+
+    # FROM steps aren't counted, steps without a service are attributed to the default
+    assert counter.get_counts() == {"base": (2, 2), "dev": (4, 1)}
+
+
+def test_inject():
+    config = {
+        "services": {
+            "dev": {"build": "."},
+            "sim": {"build": {"context": ".", "cache_from": ["type=registry,ref=x"]}},
+            "db": {"image": "postgres"},
+        }
+    }
+    cache = BuildCache(Path("/cache"))
+    assert cache.inject(config, "my robot") == ["dev", "sim"]
+    assert cache.inject(config, "my robot") == ["dev", "sim"]
+
+    assert get_cache_key("my robot", "dev") == "my_robot-dev"
+    assert config["services"]["dev"]["build"] == {
+        "context": ".",
+        "cache_from": ["type=local,src=/cache/my_robot-dev"],
+        "cache_to": ["type=local,dest=/cache/my_robot-dev,mode=max"],
+    }
+    assert config["services"]["sim"]["build"]["cache_from"] == [
+        "type=registry,ref=x",
+        "type=local,src=/cache/my_robot-sim",
+    ]
+    assert "build" not in config["services"]["db"]
+
+
+def _fill(cache: BuildCache, key: str, size: int, age: float):
+    directory = cache.directory / key
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "blob").write_bytes(b"x" * size)
+    last_used = time.time() - age
+    os.utime(directory, (last_used, last_used))
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = BuildCache(tmp_path, max_size=250)
+    _fill(cache, "old", 100, 300)
+    _fill(cache, "kept", 100, 200)
+    _fill(cache, "new", 100, 100)
+    _fill(cache, "newest", 100, 0)
+
+    assert cache.evict(keep=["kept"]) == ["old", "new"]
+    assert sorted(e.key for e in cache.get_entries()) == ["kept", "newest"]
+    assert cache.evict() == []
+
+
+def test_evict_skips_caches_in_use(tmp_path):
+    cache = BuildCache(tmp_path, max_size=100)
+    _fill(cache, "old", 100, 200)
+    _fill(cache, "new", 100, 100)
+
+    with file_lock(tmp_path / ".old.lock", shared=True):
+        assert cache.evict() == ["new"]
+    assert [e.key for e in cache.get_entries()] == ["old"]
+
+
+def test_use_and_record(tmp_path):
+    cache = BuildCache(tmp_path)
+    with cache.use(["demo-dev"]):
+        assert (tmp_path / "demo-dev").is_dir()
+    cache.record({"demo-dev": (4, 3)})
+    cache.record({"demo-dev": (4, 1)})
+
+    (entry,) = cache.get_entries()
+    assert (entry.builds, entry.steps, entry.cached) == (2, 8, 4)
+    assert entry.hit_rate == 0.5 and entry.last_used > 0
+
+
+@pytest.mark.parametrize(
+    "value, size",
+    [
+        (1024, 1024),
+        ("512", 512),
+        ("1k", 1024),
+        ("1.5M", 1536 * 1024),
+        ("20GiB", 20 * 1024**3),
+    ],
+)
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+
+def test_parse_size_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_get_build_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_ROOT", str(tmp_path / "shared"))
+    (tmp_path / "atk.yml").write_text("services: {}\n")
+    config = ATKConfig(tmp_path / "atk.yml", [])
+    assert get_build_cache(config) is None
+
+    config.config["x-atk-build-cache"] = {
+        "dir": "${CACHE_ROOT}/cache",
+        "max_size": "1G",
+    }
+    cache = get_build_cache(config)
+    assert (cache.directory, cache.max_size) == (
+        tmp_path / "shared" / "cache",
+        1024**3,
+    )
+    assert get_build_cache(config, directory="local").directory == tmp_path / "local"
+
+    config.config["x-atk-build-cache"] = ["cache"]
+    with pytest.raises(ValueError):
+        get_build_cache(config)
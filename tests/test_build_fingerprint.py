@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: MIT
+"""Build fingerprints, which tell whether a service has to be rebuilt."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.containers.build_fingerprint import (
+    ContextCache,
+    DockerIgnore,
+    FingerprintStore,
+    compute_fingerprint,
+    get_store_key,
+    hash_context,
+)
+
+# External imports
+import os
+
+
+def _touch(path, content="", mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_hash_context_respects_dockerignore(tmp_path):
+    _touch(tmp_path / "src" / "main.py")
+    before = hash_context(tmp_path, DockerIgnore(["build", "**/*.log"]))
+
+    _touch(tmp_path / "build" / "out.o")
+    _touch(tmp_path / "src" / "run.log")
+    _touch(tmp_path / ".atk-compose.abc.yml")
+    assert hash_context(tmp_path, DockerIgnore(["build", "**/*.log"])) == before
+
+    _touch(tmp_path / "src" / "util.py")
+    assert hash_context(tmp_path, DockerIgnore(["build", "**/*.log"])) != before
+
+
+def test_context_cache_matches_uncached_walk(tmp_path):
+    _touch(tmp_path / "a" / "b" / "c.py")
+    _touch(tmp_path / "a" / "d.txt")
+    _touch(tmp_path / "e.py")
+    dockerignore = DockerIgnore(["*.txt", "!a/keep.txt"])
+    cache = ContextCache()
+
+    def check():
+        expected = hash_context(tmp_path, dockerignore)
+        assert hash_context(tmp_path, dockerignore, cache) == expected
+        return expected
+
+    first = check()
+    assert check() == first
+
+    # Modified in place, which doesn't update the directory
+    _touch(tmp_path / "a" / "b" / "c.py", "changed", mtime_ns=10**18)
+    second = check()
+    assert second != first
+
+    _touch(tmp_path / "a" / "keep.txt")
+    assert check() != second
+
+
+def test_fingerprint_depends_on_the_interpolated_image(tmp_path):
+    _touch(tmp_path / "Dockerfile", "FROM ubuntu:22.04\n")
+    _touch(
+        tmp_path / "atk.yml",
+        "services:\n  dev:\n    image: robot:${TAG}\n    build: .\n",
+    )
+    config = ATKConfig(tmp_path / "atk.yml", ["dev"])
+    assert compute_fingerprint(config, "dev", {"TAG": "1"}) != compute_fingerprint(
+        config, "dev", {"TAG": "2"}
+    )
+
+
+def test_fingerprint_store(tmp_path):
+    filename = tmp_path / ".atk-build-fingerprints.json"
+    a = get_store_key(tmp_path / ".atk-compose.a.yml", "dev")
+    b = get_store_key(tmp_path / ".atk-compose.b.yml", "dev")
+    FingerprintStore(filename).update(a, "fingerprint", "sha256:1")
+
+    store = FingerprintStore(filename)
+    assert store.is_unchanged(a, "fingerprint", "sha256:1")
+    assert not store.is_unchanged(b, "fingerprint", "sha256:1")
+    assert not store.is_unchanged(a, "other", "sha256:1")
+    # The image was rebuilt by another compose file or removed since
+    assert not store.is_unchanged(a, "fingerprint", "sha256:2")
+    assert not store.is_unchanged(a, "fingerprint", None)
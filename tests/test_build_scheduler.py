@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: MIT
+"""Planning the builds of the services and building them concurrently in dependency order."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.containers.build_scheduler import (
+    BuildScheduler,
+    get_service_image,
+    plan_builds,
+)
+
+# External imports
+import threading
+import time
+
+
+def _create_config(tmp_path, config) -> ATKConfig:
+    project = tmp_path / "My Robot"
+    project.mkdir(exist_ok=True)
+    (project / "atk.yml").write_text("services: {}\n")
+    (project / "base.Dockerfile").write_text("FROM ubuntu:22.04\n")
+    (project / "dev.Dockerfile").write_text(
+        "ARG BASE=myrobot-base\nFROM ${BASE} AS dev\nFROM dev\n"
+    )
+    atk_config = ATKConfig(project / "atk.yml", list(config["services"]))
+    atk_config.config = config
+    return atk_config
+
+
+def test_default_image_is_named_after_the_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAG", "1.0")
+    config = _create_config(
+        tmp_path,
+        {
+            "services": {
+                "base": {"build": {"dockerfile": "base.Dockerfile"}},
+                "tagged": {"build": ".", "image": "robot:${TAG}"},
+            }
+        },
+    )
+    assert get_service_image(config, "base") == "myrobot-base:latest"
+    assert get_service_image(config, "tagged") == "robot:1.0"
+
+    config.config["name"] = "${PROJECT:-Other}"
+    assert get_service_image(config, "base") == "other-base:latest"
+
+
+def test_plan_builds_orders_by_base_image(tmp_path):
+    config = _create_config(
+        tmp_path,
+        {
+            "services": {
+                "dev": {"build": {"dockerfile": "dev.Dockerfile"}},
+                "base": {"build": {"dockerfile": "base.Dockerfile"}},
+                "db": {"image": "postgres"},
+            }
+        },
+    )
+    plan = plan_builds(config, ["dev", "base", "db"])
+    assert sorted(plan) == ["base", "dev"]
+    assert plan["dev"].dependencies == {"base"}
+    assert plan["base"].dependencies == set()
+
+
+def _plan(tmp_path, services):
+    config = _create_config(
+        tmp_path,
+        {
+            "services": {
+                s: {"build": {"dockerfile": f"{s.rstrip('0123456789')}.Dockerfile"}}
+                for s in services
+            }
+        },
+    )
+    return plan_builds(config, services)
+
+
+def test_scheduler_builds_dependencies_first_and_concurrently(tmp_path):
+    plan = _plan(tmp_path, ["dev", "base", "base2"])
+    plan["base2"].dependencies = set()
+
+    lock = threading.Lock()
+    events, running, peak = [], [0], [0]
+
+    def build(service):
+        with lock:
+            events.append(("start", service))
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+            events.append(("end", service))
+        return 0
+
+    assert BuildScheduler(build, jobs=2).run(plan) == 0
+    assert peak[0] == 2
+    assert events.index(("end", "base")) < events.index(("start", "dev"))
+
+
+def test_scheduler_skips_dependents_of_failed_builds(tmp_path):
+    plan = _plan(tmp_path, ["dev", "base"])
+    built = []
+
+    def build(service):
+        built.append(service)
+        if service == "base":
+            raise RuntimeError("docker is gone")
+        return 0
+
+    assert BuildScheduler(build, jobs=2).run(plan) == 1
+    assert built == ["base"]
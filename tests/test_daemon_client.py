@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: MIT
+"""The thin client that forwards ``atk`` commands to ``atk daemon``."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit import _atk_base
+from autonomy_toolkit.utils import daemon_client
+
+# External imports
+import subprocess
+import sys
+import pytest
+
+
+@pytest.mark.parametrize("argv", [["--version"], ["-h"], ["dev", "--help"]])
+def test_informational_commands_are_not_forwarded(argv, monkeypatch, capsys):
+    monkeypatch.delenv("ATK_NO_DAEMON")
+    monkeypatch.setattr(sys, "argv", ["atk", *argv])
+
+    def forward_to_daemon(argv):
+        raise AssertionError("forwarded to the daemon")
+
+    monkeypatch.setattr(daemon_client, "forward_to_daemon", forward_to_daemon)
+    try:
+        _atk_base._main()
+    except SystemExit as e:
+        assert not e.code
+    assert capsys.readouterr().out
+
+
+def test_socket_path_respects_the_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("ATK_DAEMON_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setenv("ATK_CACHE_DIR", str(tmp_path))
+    assert daemon_client.get_socket_path() == tmp_path / "daemon" / "daemon.sock"
+
+
+def test_forwarding_does_not_import_the_logger(tmp_path):
+    # Checked in a fresh interpreter, since the tests import the logger anyway
+    code = (
+        "import sys\n"
+        "from autonomy_toolkit.utils.daemon_client import forward_to_daemon\n"
+        "assert forward_to_daemon(['dev', '-s', 'dev']) is None\n"
+        "print(sorted(m for m in sys.modules if m.startswith(('autonomy_toolkit.utils.logger', 'colorlog'))))\n"
+    )
+    env = {"ATK_CACHE_DIR": str(tmp_path), "PATH": ""}
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "[]"
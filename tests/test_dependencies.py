@@ -0,0 +1,114 @@
+# SPDX-License-Identifier: MIT
+"""Finding the services a service depends on and pruning the config to them."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.dependencies import (
+    get_closure,
+    get_dependencies,
+    get_references,
+    prune_config,
+)
+
+# External imports
+import pytest
+
+
+@pytest.mark.parametrize(
+    "service_config, dependencies",
+    [
+        ({"depends_on": ["db", "cache"]}, ["db", "cache"]),
+        ({"depends_on": {"db": {"condition": "service_healthy"}}}, ["db"]),
+        ({"links": ["db:database", "cache"]}, ["db", "cache"]),
+        ({"network_mode": "service:vpn"}, ["vpn"]),
+        ({"network_mode": "host"}, []),
+        (
+            {"volumes_from": ["data", "service:logs:ro", "container:other"]},
+            ["data", "logs"],
+        ),
+        ({"extends": "base"}, ["base"]),
+        ({"extends": {"service": "base"}}, ["base"]),
+        ({"extends": {"service": "base", "file": "common.yml"}}, []),
+        (
+            {"build": {"additional_contexts": {"base": "service:base", "src": "."}}},
+            ["base"],
+        ),
+        ({"build": {"additional_contexts": ["base=service:base"]}}, ["base"]),
+        ({"build": "."}, []),
+        ({"depends_on": ["db"], "links": ["db"]}, ["db"]),
+        ({}, []),
+    ],
+)
+def test_get_dependencies(service_config, dependencies):
+    assert get_dependencies(service_config) == dependencies
+
+
+CONFIG = {
+    "name": "demo",
+    "services": {
+        "dev": {"depends_on": ["db"], "networks": ["robot"], "volumes": ["home:/home"]},
+        "db": {"links": ["cache"], "secrets": ["password"]},
+        "cache": {"volumes": ["./cache:/cache", {"type": "volume", "source": "data"}]},
+        "vnc": {"network_mode": "service:dev"},
+        "sim": {"build": {"context": ".", "secrets": [{"source": "token"}]}},
+        "other": {},
+    },
+    "networks": {"robot": {}, "unused": {}},
+    "volumes": {"home": {}, "data": {}, "unused": {}},
+    "secrets": {"password": {}, "token": {}},
+    "x-optionals": {},
+}
+
+
+@pytest.mark.parametrize(
+    "services, closure",
+    [
+        (["dev"], ["dev", "db", "cache"]),
+        (["vnc"], ["dev", "db", "cache", "vnc"]),
+        (["sim", "cache"], ["cache", "sim"]),
+        (["unknown"], []),
+    ],
+)
+def test_get_closure(services, closure):
+    assert get_closure(CONFIG, services) == closure
+
+
+def test_get_closure_handles_cycles():
+    config = {"services": {"a": {"depends_on": ["b"]}, "b": {"links": ["a"]}}}
+    assert get_closure(config, ["a"]) == ["a", "b"]
+
+
+def test_get_references():
+    assert get_references(CONFIG["services"]["cache"]) == {
+        "networks": {"default"},
+        "volumes": {"data"},
+        "secrets": set(),
+        "configs": set(),
+    }
+    assert get_references(CONFIG["services"]["vnc"])["networks"] == set()
+
+
+def test_prune_config():
+    pruned = prune_config(CONFIG, ["dev"])
+    assert list(pruned["services"]) == ["dev", "db", "cache"]
+    assert pruned["networks"] == {"robot": {}}
+    assert pruned["volumes"] == {"home": {}, "data": {}}
+    assert pruned["secrets"] == {"password": {}}
+    assert pruned["name"] == "demo" and "x-optionals" in pruned
+    assert len(CONFIG["services"]) == 6
+
+
+def test_prune_config_keeps_interpolated_resources():
+    config = {
+        "services": {"dev": {"volumes": ["${VOLUME}:/data"]}},
+        "volumes": {"home": {}, "data": {}},
+    }
+    assert prune_config(config, ["dev"])["volumes"] == config["volumes"]
+
+
+def test_prune_keeps_the_dependencies(tmp_path):
+    (tmp_path / "atk.yml").write_text("services: {}\n")
+    config = ATKConfig(tmp_path / "atk.yml", ["vnc"])
+    config.config = CONFIG
+    config.prune()
+    assert sorted(config.config["services"]) == ["cache", "db", "dev", "vnc"]
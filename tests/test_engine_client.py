@@ -0,0 +1,415 @@
+# SPDX-License-Identifier: MIT
+"""The Engine API backend against a fake Docker Engine that serves the API on a unix socket."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.containers.docker_client import DockerClient
+from autonomy_toolkit.containers.engine_client import EngineClient, _parse_port
+from autonomy_toolkit.containers.plan import (
+    CONFIG_HASH_LABEL,
+    CREATE,
+    NOOP,
+    RECREATE,
+    stamp_config_hashes,
+)
+
+# External imports
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, unquote, urlparse
+import socketserver
+import threading
+import json
+import pytest
+
+
+class FakeEngine(socketserver.ThreadingUnixStreamServer):
+    """Serves the subset of the Engine API used by :class:`EngineClient` from memory."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        super().__init__(socket_path, _FakeEngineHandler)
+        self.requests = []
+        self.created = 0
+        self.containers = {}
+        self.networks = {}
+        self.volumes = {}
+        self.images = {"ubuntu:22.04": "sha256:1"}
+        self.lock = threading.Lock()
+
+    def handle(self, method: str, path: str, params: dict, body):
+        self.requests.append((method, path, params))
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+
+        if parts == ["containers", "json"]:
+            label = json.loads(params["filters"])["label"][0]
+            project = label.split("=", 1)[1]
+            return 200, [
+                c
+                for c in self.containers.values()
+                if c["Labels"]["com.docker.compose.project"] == project
+                and (params.get("all") == "true" or c["State"] == "running")
+            ]
+        if parts == ["containers", "create"]:
+            self.created += 1
+            container_id = f"id{self.created}"
+            self.containers[container_id] = {
+                "Id": container_id,
+                "Names": [f"/{params['name']}"],
+                "State": "created",
+                "Status": "Created",
+                "Labels": body["Labels"],
+                "ImageID": self.images[body["Image"]],
+                "Config": body,
+            }
+            return 201, {"Id": container_id}
+        if parts[0] == "containers" and len(parts) == 3:
+            container = self.containers[parts[1]]
+            container["State"] = "running" if parts[2] == "start" else "exited"
+            return 204, None
+        if parts[0] == "containers" and method == "DELETE":
+            return (204, None) if self.containers.pop(parts[1], None) else (404, None)
+
+        if parts == ["networks"]:
+            return 200, list(self.networks.values())
+        if parts == ["networks", "create"]:
+            self.networks[body["Name"]] = {
+                "Id": body["Name"],
+                "Name": body["Name"],
+                "Labels": body["Labels"],
+            }
+            return 201, {"Id": body["Name"]}
+        if parts[0] == "networks":
+            if method == "DELETE":
+                return (204, None) if self.networks.pop(parts[1], None) else (404, None)
+            return (
+                (200, self.networks[parts[1]])
+                if parts[1] in self.networks
+                else (404, None)
+            )
+
+        if parts == ["volumes", "create"]:
+            self.volumes[body["Name"]] = body
+            return 201, body
+        if parts[0] == "volumes":
+            return (
+                (200, self.volumes[parts[1]])
+                if parts[1] in self.volumes
+                else (404, None)
+            )
+
+        if parts[0] == "images" and parts[-1] == "json":
+            image = self.images.get("/".join(parts[1:-1]), None)
+            return (200, {"Id": image}) if image else (404, None)
+        if parts == ["images", "create"]:
+            image = f"{params['fromImage']}:{params['tag']}"
+            self.images[image] = f"sha256:{len(self.images) + 1}"
+            return 200, {"status": "Downloaded"}
+        return 404, {"message": f"{method} {path} isn't implemented"}
+
+
+class _FakeEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        with self.server.lock:
+            status, data = self.server.handle(self.command, url.path, params, body)
+
+        data = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+    def address_string(self):
+        return "fake-engine"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    server = FakeEngine(str(tmp_path / "docker.sock"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _create_client(
+    tmp_path, engine, services_config, services=None, **kwargs
+) -> EngineClient:
+    project = tmp_path / "project"
+    project.mkdir(exist_ok=True)
+    (project / "atk.yml").write_text("services: {}\n")
+    config = ATKConfig(project / "atk.yml", services or list(services_config))
+    config.config = {"name": "demo", "services": services_config}
+    stamp_config_hashes(config.config)
+    return EngineClient(config, socket_path=engine.server_address, wait=False, **kwargs)
+
+
+def test_up_creates_containers(tmp_path, engine, monkeypatch):
+    monkeypatch.setenv("GREETING", "hello")
+    monkeypatch.delenv("UNDEFINED", raising=False)
+    client = _create_client(
+        tmp_path,
+        engine,
+        {
+            "dev": {
+                "image": "ubuntu:22.04",
+                "command": "bash -c 'echo ${GREETING}; sleep infinity'",
+                "environment": {"GREETING": "${GREETING}", "DISPLAY": "${UNDEFINED}"},
+                "ports": ["127.0.0.1:8000-8001:9000-9001", "5900:5900/udp"],
+                "healthcheck": {
+                    "test": "true",
+                    "interval": "1m30s",
+                    "start_period": "500ms",
+                    "retries": 3,
+                },
+            }
+        },
+    )
+    assert client.up() == 0
+
+    (container,) = engine.containers.values()
+    body = container["Config"]
+    assert container["Names"] == ["/demo-dev-1"]
+    assert container["State"] == "running"
+    assert body["Cmd"] == ["bash", "-c", "echo hello; sleep infinity"]
+    assert sorted(body["Env"]) == ["DISPLAY=", "GREETING=hello"]
+    assert body["HostConfig"]["PortBindings"] == {
+        "9000/tcp": [{"HostIp": "127.0.0.1", "HostPort": "8000"}],
+        "9001/tcp": [{"HostIp": "127.0.0.1", "HostPort": "8001"}],
+        "5900/udp": [{"HostIp": "", "HostPort": "5900"}],
+    }
+    assert body["Healthcheck"] == {
+        "Test": ["CMD-SHELL", "true"],
+        "Interval": 90 * 10**9,
+        "StartPeriod": 500 * 10**6,
+        "Retries": 3,
+    }
+    assert container["Labels"][CONFIG_HASH_LABEL] == (
+        client.config.config["services"]["dev"]["labels"][CONFIG_HASH_LABEL]
+    )
+    assert "demo_default" in engine.networks
+
+
+def test_up_is_a_noop_if_up_to_date(tmp_path, engine):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    assert client.up() == 0
+    engine.requests.clear()
+
+    assert client.up() == 0
+    assert [r for r in engine.requests if r[0] != "GET"] == []
+
+
+def test_up_recreates_if_the_config_changed(tmp_path, engine):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    assert client.up() == 0
+    (old_id,) = engine.containers
+
+    client = _create_client(
+        tmp_path, engine, {"dev": {"image": "ubuntu:22.04", "tty": True}}
+    )
+    assert client.up() == 0
+    (new_id,) = engine.containers
+    assert new_id != old_id
+    assert engine.containers[new_id]["Config"]["Tty"] is True
+
+
+def test_up_reports_required_variables(tmp_path, engine, monkeypatch):
+    monkeypatch.delenv("REQUIRED", raising=False)
+    client = _create_client(
+        tmp_path,
+        engine,
+        {"dev": {"image": "ubuntu:22.04", "user": "${REQUIRED:?must be set}"}},
+    )
+    assert client.up() == 1
+    assert engine.containers == {}
+
+
+def test_up_falls_back_to_compose_for_unsupported_fields(tmp_path, engine, monkeypatch):
+    calls = []
+    monkeypatch.setattr(DockerClient, "up", lambda self: calls.append(self) or 0)
+    client = _create_client(
+        tmp_path,
+        engine,
+        {
+            "dev": {"image": "ubuntu:22.04", "depends_on": ["db"], "restart": "always"},
+            "db": {"image": "ubuntu:22.04"},
+        },
+    )
+    assert client.up() == 0
+    assert calls == [client]
+    assert engine.requests == []
+
+
+def test_down_keeps_anonymous_volumes(tmp_path, engine):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    assert client.up() == 0
+    assert client.down() == 0
+
+    assert engine.containers == {}
+    deletes = [r for r in engine.requests if r[0] == "DELETE"]
+    assert deletes and all(params == {} for _, _, params in deletes)
+
+
+@pytest.mark.parametrize(
+    "port, expected",
+    [
+        ("80", [("", "", "80/tcp")]),
+        ("8080:80", [("", "8080", "80/tcp")]),
+        ("8000-8010:80", [("", "8000-8010", "80/tcp")]),
+        (
+            "8000-8001:8000-8001/udp",
+            [("", "8000", "8000/udp"), ("", "8001", "8001/udp")],
+        ),
+        ("3000-3001", [("", "", "3000/tcp"), ("", "", "3001/tcp")]),
+        ("[::1]:8080:80", [("::1", "8080", "80/tcp")]),
+        ({"target": 80, "published": "8080"}, [("", "8080", "80/tcp")]),
+    ],
+)
+def test_parse_port(port, expected):
+    assert _parse_port(port) == expected
+
+
+def test_plan_includes_dependencies(tmp_path, engine):
+    services_config = {
+        "dev": {"image": "ubuntu:22.04", "depends_on": ["db"]},
+        "db": {"image": "ubuntu:22.04"},
+    }
+    client = _create_client(tmp_path, engine, services_config, ["dev"])
+    assert client.plan() == {"dev": CREATE, "db": CREATE}
+
+
+def test_plan_recreates_containers_of_changed_images(tmp_path, engine):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    assert client.up() == 0
+    assert client.plan() == {"dev": NOOP}
+
+    # e.g. pulled outside of atk
+    engine.images["ubuntu:22.04"] = "sha256:2"
+    assert client.plan() == {"dev": RECREATE}
+
+
+def test_plan_creates_all_if_the_containers_cant_be_listed(tmp_path, engine):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    client.api.socket_path = str(tmp_path / "missing.sock")
+    assert client.plan() == {"dev": CREATE}
+
+
+def test_up_names_volumes_and_networks_like_compose(tmp_path, engine):
+    engine.networks["shared"] = {"Id": "shared", "Name": "shared", "Labels": {}}
+    client = _create_client(
+        tmp_path,
+        engine,
+        {
+            "dev": {
+                "image": "ubuntu:22.04",
+                "volumes": ["data:/data", "cache:/cache", "home:/home"],
+                "networks": ["my_net", "lan", "shared"],
+            }
+        },
+    )
+    client.config.config["volumes"] = {
+        "data": None,
+        "cache": {"name": "atk-cache"},
+        "home": {"external": True},
+    }
+    client.config.config["networks"] = {
+        "my_net": None,
+        "lan": {"name": "robot-lan"},
+        "shared": {"external": True},
+    }
+    assert client.up() == 0
+
+    (container,) = engine.containers.values()
+    assert container["Config"]["HostConfig"]["Binds"] == [
+        "demo_data:/data",
+        "atk-cache:/cache",
+        "home:/home",
+    ]
+    assert sorted(engine.volumes) == ["atk-cache", "demo_data"]
+    assert engine.volumes["atk-cache"]["Labels"]["com.docker.compose.volume"] == (
+        "cache"
+    )
+    assert engine.networks["demo_my_net"]["Labels"]["com.docker.compose.network"] == (
+        "my_net"
+    )
+    assert engine.networks["robot-lan"]["Labels"]["com.docker.compose.network"] == (
+        "lan"
+    )
+
+
+def test_up_fails_if_an_external_network_is_missing(tmp_path, engine):
+    client = _create_client(
+        tmp_path, engine, {"dev": {"image": "ubuntu:22.04", "networks": ["shared"]}}
+    )
+    client.config.config["networks"] = {"shared": {"external": True}}
+    assert client.up() == 1
+    assert engine.networks == {} and engine.containers == {}
+
+
+@pytest.mark.parametrize(
+    "pull_policy, image, returncode, pulled",
+    [
+        ("missing", "ubuntu:22.04", 0, False),
+        ("missing", "ubuntu:24.04", 0, True),
+        ("always", "ubuntu:22.04", 0, True),
+        ("never", "ubuntu:22.04", 0, False),
+        ("never", "ubuntu:24.04", 1, False),
+    ],
+)
+def test_up_honors_pull_policy(
+    tmp_path, engine, pull_policy, image, returncode, pulled
+):
+    client = _create_client(
+        tmp_path, engine, {"dev": {"image": image, "pull_policy": pull_policy}}
+    )
+    assert client.up() == returncode
+    pulls = [r for r in engine.requests if r[1] == "/images/create"]
+    assert bool(pulls) == pulled
+
+
+def test_up_builds_missing_images(tmp_path, engine, monkeypatch):
+    built = []
+
+    def build(self):
+        built.append((self.services, self.force_build))
+        for service in self.services:
+            engine.images[f"demo-{service}"] = f"sha256:{service}"
+        return 0
+
+    monkeypatch.setattr(DockerClient, "build", build)
+    client = _create_client(
+        tmp_path,
+        engine,
+        {
+            "dev": {"build": "."},
+            "sim": {"build": ".", "pull_policy": "build"},
+            "vnc": {"build": ".", "image": "ubuntu:22.04"},
+        },
+    )
+    assert client.up() == 0
+    assert built == [(["sim"], True), (["dev"], False)]
+    assert [r for r in engine.requests if r[1] == "/images/create"] == []
+    assert len(engine.containers) == 3
+
+
+def test_images_are_only_present_if_inspected(tmp_path, engine, monkeypatch):
+    client = _create_client(tmp_path, engine, {"dev": {"image": "ubuntu:22.04"}})
+    assert client._get_present_images(["ubuntu:22.04", "ubuntu:24.04"]) == {
+        "ubuntu:22.04"
+    }
+
+    monkeypatch.setattr(engine, "handle", lambda *args: (500, {"message": "oops"}))
+    assert client._get_present_images(["ubuntu:22.04"]) == set()
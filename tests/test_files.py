@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: MIT
+"""Searching upwards for the ATK config file."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils import files
+from autonomy_toolkit.utils.files import search_upwards_for_file
+
+# External imports
+import os
+import pytest
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    nested = tmp_path / "repo" / "a" / "b"
+    nested.mkdir(parents=True)
+    (tmp_path / "atk.yml").write_text("")
+    (tmp_path / "repo" / "a" / "robot.yml").write_text("")
+    monkeypatch.chdir(nested)
+    return tmp_path
+
+
+def test_single_candidate_is_stat(tree, monkeypatch):
+    def listdir(path):
+        raise AssertionError(f"listed '{path}'")
+
+    monkeypatch.setattr(os, "listdir", listdir)
+    assert search_upwards_for_file("atk.yml") == tree / "atk.yml"
+    assert search_upwards_for_file("missing.yml") is None
+
+
+def test_multiple_candidates_prefer_the_lowest_level(tree):
+    found = search_upwards_for_file(["atk.yml", "robot.yml"])
+    assert found == tree / "repo" / "a" / "robot.yml"
+
+
+@pytest.mark.parametrize("candidates", ["atk.yml", ["atk.yml", "other.yml"]])
+def test_git_boundary(tree, candidates):
+    (tree / "repo" / ".git").mkdir()
+    assert search_upwards_for_file(candidates, boundaries=["git"]) is None
+
+
+def test_cached_hit_is_reused(tree, monkeypatch):
+    assert search_upwards_for_file("atk.yml", use_cache=True) == tree / "atk.yml"
+
+    def search(d, candidates, boundaries):
+        raise AssertionError(f"searched from '{d}'")
+
+    monkeypatch.setattr(files, "_search_upwards", search)
+    assert search_upwards_for_file("atk.yml", use_cache=True) == tree / "atk.yml"
+
+
+def test_cached_hit_finds_a_nearer_file(tree):
+    assert search_upwards_for_file("atk.yml", use_cache=True) == tree / "atk.yml"
+
+    nearer = tree / "repo" / "a" / "atk.yml"
+    nearer.write_text("")
+    assert search_upwards_for_file("atk.yml", use_cache=True) == nearer
+
+    nearer.unlink()
+    assert search_upwards_for_file("atk.yml", use_cache=True) == tree / "atk.yml"
@@ -0,0 +1,52 @@
+# SPDX-License-Identifier: MIT
+"""Regression test for the number of modules ``atk --version`` and ``atk --help`` import.
+
+Both are answered without importing any subcommand module or heavy dependency. The modules are counted with
+``python -X importtime`` in a fresh interpreter.
+"""
+
+# External imports
+import subprocess
+import sys
+import pytest
+
+# The standard library modules argparse needs account for most of them
+MAX_MODULES = 90
+
+# Modules that must not be imported just to print the version or the help
+HEAVY_MODULES = [
+    "autonomy_toolkit.dev",
+    "autonomy_toolkit.utils.atk_config",
+    "autonomy_toolkit.utils.logger",
+    "autonomy_toolkit.utils.daemon_client",
+    "colorlog",
+    "mergedeep",
+    "yaml",
+]
+
+
+def _get_imported_modules(*argv: str) -> list:
+    code = (
+        "import sys\n"
+        f"sys.argv = ['atk', *{list(argv)!r}]\n"
+        "from autonomy_toolkit._atk_base import _main\n"
+        "_main()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Each line is `import time: <self> | <cumulative> | <indented module name>`, after a header line
+    lines = [
+        line for line in result.stderr.splitlines() if line.startswith("import time:")
+    ]
+    return [line.rsplit("|", 1)[1].strip() for line in lines[1:]]
+
+
+@pytest.mark.parametrize("argv", [["--version"], ["--help"]])
+def test_informational_commands_import_few_modules(argv):
+    modules = _get_imported_modules(*argv)
+    assert not [m for m in HEAVY_MODULES if m in modules]
+    assert len(modules) <= MAX_MODULES, f"{len(modules)} modules were imported"
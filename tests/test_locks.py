@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: MIT
+"""Advisory locks on shared files and the garbage collection of generated compose files."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import MAX_COMPOSE_FILE_AGE, ATKConfig
+from autonomy_toolkit.utils.locks import file_lock, hold_file, try_remove
+
+# External imports
+import os
+import time
+import pytest
+
+pytest.importorskip("fcntl")
+
+
+def test_held_files_arent_removed(tmp_path):
+    filename = tmp_path / "compose.yml"
+    assert hold_file(filename) is None
+
+    filename.write_text("services: {}\n")
+    held = hold_file(filename)
+    assert held is not None
+    assert not try_remove(filename) and filename.exists()
+
+    held.close()
+    assert try_remove(filename) and not filename.exists()
+    assert not try_remove(filename)
+
+
+def test_replaced_files_arent_held(tmp_path, monkeypatch):
+    filename = tmp_path / "compose.yml"
+    filename.write_text("old\n")
+    stat = os.stat
+
+    # The file is replaced between opening and locking it
+    def replace_then_stat(path, *args, **kwargs):
+        if str(path) == str(filename) and not (tmp_path / "new").exists():
+            (tmp_path / "new").write_text("new\n")
+            os.replace(tmp_path / "new", filename)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", replace_then_stat)
+    assert hold_file(filename) is None
+
+
+def test_file_lock(tmp_path):
+    lock = tmp_path / "shells.json.lock"
+    with file_lock(lock) as locked:
+        assert locked
+        with file_lock(lock, blocking=False) as other:
+            assert not other
+    with file_lock(lock, shared=True) as first, file_lock(
+        lock, shared=True, blocking=False
+    ) as second:
+        assert first and second
+
+
+def test_remove_stale_compose_files(tmp_path, monkeypatch):
+    (tmp_path / "atk.yml").write_text("services: {}\n")
+    monkeypatch.chdir(tmp_path)
+    config = ATKConfig("atk.yml", ["dev"], compose_file=".atk-compose.own.yml")
+    assert config.write()
+
+    old = time.time() - MAX_COMPOSE_FILE_AGE - 60
+    files = {}
+    for name in ("own", "stale", "held", "fresh"):
+        files[name] = tmp_path / f".atk-compose.{name}.yml"
+        files[name].touch()
+        if name != "fresh":
+            os.utime(files[name], (old, old))
+    files["tmp"] = tmp_path / "..atk-compose.held.yml.123.tmp"
+    files["tmp"].touch()
+    os.utime(files["tmp"], (old, old))
+
+    held = hold_file(files["held"])
+    try:
+        assert config.remove_stale_compose_files() == 2
+    finally:
+        held.close()
+    assert {name for name, f in files.items() if f.exists()} == {"own", "held", "fresh"}
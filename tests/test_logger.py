@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: MIT
+"""The JSON log format and the background log queue."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils import logger
+from autonomy_toolkit.utils.logger import (
+    CONSOLE_HANDLER,
+    LOGGER,
+    JSONFormatter,
+    configure_logging,
+    flush_logging,
+)
+
+# External imports
+import io
+import json
+import logging
+import pytest
+import sys
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    # `configure_logging` changes global state, which is restored afterwards
+    for name in ("_srcfile", "logThreads", "logProcesses", "logMultiprocessing"):
+        monkeypatch.setattr(logging, name, getattr(logging, name))
+    formatter = CONSOLE_HANDLER.formatter
+    stream = io.StringIO()
+    old_stream = CONSOLE_HANDLER.setStream(stream)
+    yield stream
+    flush_logging()
+    CONSOLE_HANDLER.setStream(old_stream)
+    CONSOLE_HANDLER.setFormatter(formatter)
+
+
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "atk",
+            "levelname": "WARNING",
+            "msg": "Pulled '%s' in %.2fs.",
+            "args": ("ubuntu", 1.5),
+            "created": 0.25,
+            "msecs": 250,
+            "command": ["docker", "pull"],
+        }
+    )
+    assert json.loads(JSONFormatter().format(record)) == {
+        "time": "1970-01-01T00:00:00.250Z",
+        "level": "WARNING",
+        "logger": "atk",
+        "message": "Pulled 'ubuntu' in 1.50s.",
+        "command": ["docker", "pull"],
+    }
+
+
+def test_json_formatter_includes_exceptions():
+    try:
+        raise RuntimeError("docker is gone")
+    except RuntimeError:
+        record = logging.makeLogRecord({"msg": "failed"})
+        record.exc_info = sys.exc_info()
+    entry = json.loads(JSONFormatter().format(record))
+    assert "RuntimeError: docker is gone" in entry["exception"]
+
+
+def test_configure_json(stream):
+    configure_logging("json", use_queue=False)
+    LOGGER.error("Failed to build '%s'.", "dev", extra={"returncode": 2})
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Failed to build 'dev'."
+    assert (entry["level"], entry["returncode"]) == ("ERROR", 2)
+
+
+def test_configure_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        configure_logging("xml")
+
+
+def test_queue_is_flushed(stream):
+    configure_logging("json", use_queue=True)
+    assert logger._LISTENER is not None
+    assert CONSOLE_HANDLER not in LOGGER.handlers
+    for i in range(100):
+        LOGGER.error("Line %s", i)
+
+    flush_logging()
+    assert logger._LISTENER is None
+    assert LOGGER.handlers == [CONSOLE_HANDLER]
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [
+        f"Line {i}" for i in range(100)
+    ]
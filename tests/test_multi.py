@@ -0,0 +1,29 @@
+# SPDX-License-Identifier: MIT
+"""The arguments of ``atk multi``."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.multi import _init
+
+# External imports
+import argparse
+import pytest
+
+
+def _parse(*args) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    _init(parser)
+    return parser.parse_args(["robots/*", "--dev-args=-s dev -u", *args])
+
+
+def test_limits_default_to_max_parallel():
+    args = _parse("-p", "2", "--max-builds", "1")
+    assert (args.max_parallel, args.max_builds, args.max_ups) == (2, 1, None)
+
+
+@pytest.mark.parametrize(
+    "option", ["-p", "--max-downs", "--max-builds", "--resolve-workers"]
+)
+@pytest.mark.parametrize("value", ["0", "-1", "two"])
+def test_limits_must_be_positive(option, value):
+    with pytest.raises(SystemExit):
+        _parse(option, value)
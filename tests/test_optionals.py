@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: MIT
+"""Merging the ``x-optionals`` of the ATK config file into the services."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.utils.optionals import apply_patches, compile_patches
+
+# External imports
+import logging
+import pytest
+
+
+def _merge(service, *optionals, name="dev"):
+    patches = [patch for optional in optionals for patch in compile_patches(optional)]
+    apply_patches(name, service, patches)
+    return service
+
+
+@pytest.mark.parametrize(
+    "service, optional, expected",
+    [
+        # Lists are extended with the entries that aren't present yet
+        (
+            {"volumes": ["/a:/a"]},
+            {"volumes": ["/a:/a", "/b:/b"]},
+            {"volumes": ["/a:/a", "/b:/b"]},
+        ),
+        ({}, {"devices": ["/dev/dri"]}, {"devices": ["/dev/dri"]}),
+        # Dicts are merged recursively, scalars replaced
+        (
+            {"environment": {"A": "1", "B": "2"}},
+            {"environment": {"B": "3", "C": "4"}},
+            {"environment": {"A": "1", "B": "3", "C": "4"}},
+        ),
+        (
+            {"deploy": {"resources": {"limits": {"cpus": "1"}}}},
+            {"deploy": {"resources": {"reservations": {"devices": [{"count": 1}]}}}},
+            {
+                "deploy": {
+                    "resources": {
+                        "limits": {"cpus": "1"},
+                        "reservations": {"devices": [{"count": 1}]},
+                    }
+                }
+            },
+        ),
+        # Non-dicts along the path are replaced and empty dicts are kept
+        (
+            {"environment": ["A=1"]},
+            {"environment": {"B": "2"}},
+            {"environment": {"B": "2"}},
+        ),
+        ({}, {"ulimits": {}}, {"ulimits": {}}),
+        ({"tty": False}, {"tty": True}, {"tty": True}),
+    ],
+)
+def test_merge(service, optional, expected):
+    assert _merge(service, optional) == expected
+
+
+def test_merged_values_are_copies():
+    optional = {"volumes": [{"type": "bind", "source": "/a"}], "labels": {"a": "b"}}
+    first, second = _merge({}, optional), _merge({}, optional)
+    first["volumes"][0]["source"] = "/b"
+    assert second["volumes"][0]["source"] == "/a"
+    assert optional["volumes"][0]["source"] == "/a"
+
+
+@pytest.mark.parametrize("targets", ["sim", ["sim"], ["sim", "vnc"]])
+def test_services_targeting(targets):
+    optional = {"x-services": targets, "tty": True}
+    assert _merge({}, optional, name="dev") == {}
+    assert _merge({}, optional, name="sim") == {"tty": True}
+
+
+@pytest.mark.parametrize(
+    "optional", [None, ["tty"], {"x-services": None}, {"x-services": [1]}]
+)
+def test_invalid_optionals(optional):
+    with pytest.raises(ValueError):
+        compile_patches(optional)
+
+
+def _create_config(tmp_path, optionals) -> ATKConfig:
+    (tmp_path / "atk.yml").write_text("services: {}\n")
+    config = ATKConfig(tmp_path / "atk.yml", ["dev"])
+    config.config = {
+        "services": {"dev": {"image": "ubuntu"}, "sim": {"image": "ubuntu"}},
+        "x-optionals": optionals,
+    }
+    return config
+
+
+def test_update_services_with_optionals(tmp_path, caplog):
+    config = _create_config(
+        tmp_path,
+        {
+            "gpus": {"x-services": ["sim", "simulator"], "runtime": "nvidia"},
+            "vnc": {"environment": {"DISPLAY": ":1"}},
+        },
+    )
+    with caplog.at_level(logging.WARNING):
+        assert config.update_services_with_optionals(["gpus", "vnc"])
+    assert config.config["services"] == {
+        "dev": {"image": "ubuntu", "environment": {"DISPLAY": ":1"}},
+        "sim": {
+            "image": "ubuntu",
+            "runtime": "nvidia",
+            "environment": {"DISPLAY": ":1"},
+        },
+    }
+    assert "'simulator'" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "optionals", [{"gpus": {"x-services": None}}, {"gpus": None}, {"other": {}}]
+)
+def test_update_services_with_invalid_optionals(tmp_path, optionals):
+    config = _create_config(tmp_path, optionals)
+    assert not config.update_services_with_optionals(["gpus"])
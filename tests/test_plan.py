@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: MIT
+"""The digests that tell whether a container is out of date."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.containers.plan import (
+    CONFIG_HASH_LABEL,
+    CREATE,
+    NOOP,
+    RECREATE,
+    START,
+    get_config_hash,
+    plan_services,
+    stamp_config_hashes,
+)
+
+
+def _config(**service):
+    return {"services": {"dev": {"image": "ubuntu:22.04", **service}}}
+
+
+def test_hash_ignores_the_stamped_label():
+    config = _config()
+    config_hash = get_config_hash(config, "dev", {})
+    stamp_config_hashes(config, {})
+    assert config["services"]["dev"]["labels"][CONFIG_HASH_LABEL] == config_hash
+    assert get_config_hash(config, "dev", {}) == config_hash
+
+
+def test_hash_depends_on_the_interpolated_config():
+    config = _config(environment={"DISPLAY": "${DISPLAY}"})
+    assert get_config_hash(config, "dev", {"DISPLAY": ":0"}) != get_config_hash(
+        config, "dev", {"DISPLAY": ":1"}
+    )
+    assert get_config_hash(config, "dev", {"DISPLAY": ":0"}) == get_config_hash(
+        config, "dev", {"DISPLAY": ":0", "UNUSED": "1"}
+    )
+
+
+def test_hash_depends_on_env_files(tmp_path):
+    config = _config(env_file=["${ENV_FILE}"])
+    env = {"ENV_FILE": "dev.env"}
+    (tmp_path / "dev.env").write_text("KEY=1\n")
+    before = get_config_hash(config, "dev", env, tmp_path)
+    (tmp_path / "dev.env").write_text("KEY=2\n")
+    assert get_config_hash(config, "dev", env, tmp_path) != before
+
+
+def test_plan_services():
+    config = {"services": {s: {"image": "ubuntu:22.04"} for s in ("a", "b", "c", "d")}}
+    stamp_config_hashes(config, {})
+    label = config["services"]["a"]["labels"][CONFIG_HASH_LABEL]
+    up_to_date = {"State": "running", "Labels": {CONFIG_HASH_LABEL: label}}
+    containers = {
+        "a": up_to_date,
+        "b": {**up_to_date, "State": "exited"},
+        "c": {"State": "running", "Labels": {CONFIG_HASH_LABEL: "other"}},
+        "d": up_to_date,
+    }
+    assert plan_services(config, ["a", "b", "c", "d", "e"], containers, ["d"]) == {
+        "a": NOOP,
+        "b": START,
+        "c": RECREATE,
+        "d": RECREATE,
+        "e": CREATE,
+    }
@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: MIT
+"""Streaming the output of subprocesses."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.process import RingBuffer, run_streaming
+
+# External imports
+import sys
+
+# Alternates between stdout and stderr, waiting for each line to be read before writing the next
+SCRIPT = """
+import sys, time
+for i in range(4):
+    stream = sys.stdout if i % 2 == 0 else sys.stderr
+    stream.write(f"line {i}\\n")
+    stream.flush()
+    time.sleep(0.05)
+sys.exit(3)
+"""
+
+
+def test_ring_buffer_keeps_the_tail():
+    buffer = RingBuffer(10)
+    for line in (b"first\n", b"second\n", b"third\n"):
+        buffer.write(line)
+    assert buffer.getvalue() == "third\n"
+
+    buffer.write(b"a very long line\n")
+    assert buffer.getvalue() == "long line\n"
+
+
+def test_ring_buffer_keeps_lines_that_fit():
+    buffer = RingBuffer(16)
+    for line in (b"a\n", b"b\n", b"c\n"):
+        buffer.write(line)
+    assert buffer.getvalue() == "a\nb\nc\n"
+
+
+def test_run_streaming_captures_both_streams():
+    lines = []
+    result = run_streaming(
+        [sys.executable, "-c", SCRIPT],
+        capture=True,
+        passthrough=False,
+        on_line=lines.append,
+    )
+    assert result.returncode == 3
+    assert result.stdout == "line 0\nline 2"
+    assert result.stderr == "line 1\nline 3"
+    assert result.tail == "line 0\nline 1\nline 2\nline 3\n"
+    assert lines == [b"line 0\n", b"line 1\n", b"line 2\n", b"line 3\n"]
+
+
+def test_run_streaming_truncates_the_tail():
+    result = run_streaming(
+        [sys.executable, "-c", SCRIPT], passthrough=False, tail_size=14
+    )
+    assert result.returncode == 3
+    assert result.stdout == result.stderr == ""
+    assert result.tail == "line 2\nline 3\n"
+
+
+def test_run_streaming_passes_the_output_through(capfd):
+    result = run_streaming([sys.executable, "-c", SCRIPT])
+    assert result.returncode == 3
+    captured = capfd.readouterr()
+    assert captured.out == "line 0\nline 2\n"
+    assert captured.err == "line 1\nline 3\n"
@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: MIT
+"""Recording the timing spans of ``atk dev --profile`` and reporting them."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.profiler import PROFILER, Profiler, profile
+
+# External imports
+import json
+import threading
+import pytest
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.span("load"):
+        pass
+    assert profiler.spans == []
+
+
+def test_spans_nest_per_thread():
+    profiler = Profiler()
+    profiler.enable()
+
+    def up():
+        with profiler.span("up"):
+            pass
+
+    with profiler.span("dev"):
+        with profiler.span("load", services=["dev"]):
+            thread = threading.Thread(target=up)
+            thread.start()
+            thread.join()
+        with pytest.raises(RuntimeError), profiler.span("build"):
+            raise RuntimeError()
+
+    spans = {span.name: span for span in profiler.spans}
+    assert [(s.name, s.depth) for s in profiler.spans] == [
+        ("dev", 0),
+        ("load", 1),
+        ("up", 0),
+        ("build", 1),
+    ]
+    assert spans["load"].args == {"services": "['dev']"}
+    assert spans["up"].thread != spans["dev"].thread
+    assert spans["dev"].duration >= spans["load"].duration + spans["build"].duration
+    assert spans["build"].start >= spans["load"].start + spans["load"].duration
+
+    table = profiler.format_table().splitlines()
+    assert table[0].split() == ["start", "(ms)", "time", "(ms)", "phase"]
+    assert table[2].endswith("  load (services=['dev'])")
+    assert table[3].endswith("up [thread 1]")
+
+
+def test_write_trace(tmp_path):
+    profiler = Profiler()
+    profiler.enable()
+    with profiler.span("dev"), profiler.span("build", service="dev"):
+        pass
+    profiler.write_trace(tmp_path / "trace.json")
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    dev, build = trace["traceEvents"]
+    assert (dev["name"], dev["ph"], build["args"]) == ("dev", "X", {"service": "dev"})
+    assert dev["ts"] <= build["ts"]
+    assert build["ts"] + build["dur"] <= dev["ts"] + dev["dur"]
+    assert dev["tid"] == build["tid"]
+
+
+def test_profile_decorator():
+    @profile()
+    def load():
+        return 42
+
+    @profile("write")
+    def write():
+        return load()
+
+    try:
+        assert write() == 42
+        assert PROFILER.spans == []
+        PROFILER.enable()
+        assert write() == 42
+        assert [(s.name, s.depth) for s in PROFILER.spans] == [
+            ("write", 0),
+            ("test_profile_decorator.<locals>.load", 1),
+        ]
+    finally:
+        PROFILER.enabled = False
+        PROFILER.spans = []
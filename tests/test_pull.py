@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: MIT
+"""Collecting the images of the services and pulling them concurrently."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.containers.pull import (
+    get_always_pulled,
+    get_digest_reference,
+    get_pull_images,
+    pull_images,
+    report_pulls,
+)
+
+# External imports
+import threading
+import time
+
+
+CONFIG = {
+    "services": {
+        "dev": {"image": "ubuntu:${TAG}"},
+        "sim": {"image": "docker.io/library/ubuntu:22.04", "pull_policy": "always"},
+        "vnc": {"image": "novnc"},
+        "db": {"image": "postgres", "pull_policy": "never"},
+        "app": {"image": "app", "build": "."},
+    }
+}
+
+
+def test_get_pull_images_deduplicates():
+    images = get_pull_images(CONFIG, CONFIG["services"], {"TAG": "22.04"})
+    assert images == {"ubuntu:22.04": ["dev", "sim"], "novnc:latest": ["vnc"]}
+    assert get_always_pulled(CONFIG, images) == {"ubuntu:22.04"}
+
+
+def test_get_digest_reference():
+    digest = "sha256:" + "0" * 64
+    assert get_digest_reference(f"ubuntu:22.04@{digest}") == f"ubuntu@{digest}"
+    assert get_digest_reference(f"host:5000/ubuntu@{digest}") == (
+        f"host:5000/ubuntu@{digest}"
+    )
+    assert get_digest_reference("ubuntu:22.04") == "ubuntu:22.04"
+
+
+def test_pull_images_is_bounded_and_skips_present():
+    lock = threading.Lock()
+    pulled, running, peak = [], [0], [0]
+
+    def pull(image):
+        with lock:
+            pulled.append(image)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return 0
+
+    images = {f"image{i}:latest": [f"service{i}"] for i in range(5)}
+    results = pull_images(pull, images, {"image0:latest"}, jobs=2)
+
+    assert sorted(pulled) == [f"image{i}:latest" for i in range(1, 5)]
+    assert peak[0] == 2
+    assert [r.image for r in results] == list(images)
+    assert [r.status for r in results] == ["present"] + ["pulled"] * 4
+    assert report_pulls(results) == 0
+
+
+def test_pull_images_reports_failures():
+    images = {"ubuntu:22.04": ["dev"], "missing:latest": ["sim"]}
+    results = pull_images(lambda image: int(image == "missing:latest"), images, set())
+
+    assert [r.status for r in results] == ["pulled", "failed"]
+    assert report_pulls(results) == 1
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: MIT
+"""Waiting for the services to become ready after they were brought up."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.containers.readiness import (
+    ServiceReadiness,
+    has_healthcheck,
+    report_readiness,
+    wait_for_services,
+)
+
+# External imports
+import logging
+
+
+def test_wait_for_services():
+    polls = iter(
+        [
+            {
+                "dev": {"State": "created"},
+                "db": {"State": "running", "Health": "starting"},
+            },
+            {
+                "dev": {"State": "running"},
+                "db": {"State": "running", "Health": "healthy"},
+            },
+        ]
+    )
+    results = wait_for_services(
+        lambda services: next(polls), ["dev", "db"], ["db"], min_interval=0
+    )
+    assert [(r.service, r.status, r.health) for r in results] == [
+        ("dev", "ready", ""),
+        ("db", "ready", "healthy"),
+    ]
+
+
+def test_wait_for_services_fails_and_times_out():
+    states = {
+        "task": {"State": "exited", "ExitCode": 0},
+        "crash": {"State": "exited", "ExitCode": 1},
+        "db": {"State": "running", "Health": "starting"},
+    }
+    results = wait_for_services(
+        lambda services: states,
+        ["task", "crash", "db"],
+        [],
+        timeout=0.05,
+        min_interval=0.01,
+    )
+    assert [r.status for r in results] == ["ready", "failed", "timeout"]
+    assert results[2].state == "running"
+
+
+def test_has_healthcheck():
+    assert has_healthcheck({"healthcheck": {"test": ["CMD", "true"]}})
+    assert not has_healthcheck({"healthcheck": {"test": ["NONE"]}})
+    assert not has_healthcheck({"healthcheck": {"test": "true", "disable": True}})
+    assert not has_healthcheck({})
+
+
+def test_report_readiness_prints_the_ready_services(capsys, caplog):
+    results = [
+        ServiceReadiness("dev", "ready", 1.5, "running"),
+        ServiceReadiness("db", "timeout", 120.0, "running", "starting"),
+    ]
+    with caplog.at_level(logging.WARNING):
+        assert report_readiness(results) == 1
+    assert capsys.readouterr().out == "'dev' is ready (running) after 1.50s.\n"
+    assert "'db' timed out (running, starting) after 120.00s." in caplog.text
+    assert report_readiness(results[:1]) == 0
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: MIT
+"""Conformance of the in-process resolver with ``docker compose config``.
+
+Each fixture directory in ``fixtures/resolver`` has an ``atk.yml`` file and, if it can be resolved in-process, the
+output of ``docker compose config`` for it in ``compose-config.yml`` (see ``record.sh``).
+"""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig, _ComposeLoader
+
+# External imports
+from pathlib import Path
+import pytest
+import yaml
+
+FIXTURES = Path(__file__).parent / "fixtures" / "resolver"
+CONFORMANCE_CASES = sorted(
+    p.name for p in FIXTURES.iterdir() if (p / "compose-config.yml").is_file()
+)
+
+
+def _load_compose_yaml(filename: Path) -> dict:
+    loader = _ComposeLoader(filename.read_text())
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def _resolve(directory: Path) -> ATKConfig:
+    config = ATKConfig(directory / "atk.yml", [])
+    config.config = config._resolve_in_process([])
+    return config
+
+
+@pytest.mark.parametrize("case", CONFORMANCE_CASES)
+def test_resolver_matches_compose_config(case):
+    resolved = _resolve(FIXTURES / case).config
+    expected = _load_compose_yaml(FIXTURES / case / "compose-config.yml")
+
+    # `docker compose config` sets the project name, which the in-process resolver leaves to `docker compose`
+    resolved.pop("name", None)
+    expected.pop("name", None)
+    assert resolved == expected
+
+
+@pytest.mark.parametrize("case", CONFORMANCE_CASES)
+def test_written_compose_file_reads_back_the_same(case, tmp_path):
+    config = _resolve(FIXTURES / case)
+    assert config.write(tmp_path / "compose.yml")
+    assert _load_compose_yaml(tmp_path / "compose.yml") == config.config
+
+
+def test_octal_modes_are_not_decimal():
+    config = _resolve(FIXTURES / "scalars").config
+    assert config["services"]["dev"]["secrets"][0]["mode"] == 0o440
+    assert config["services"]["dev"]["configs"][0]["mode"] == 0o644
+
+
+def test_timestamps_fall_back_to_compose():
+    config = ATKConfig(FIXTURES / "timestamps" / "atk.yml", [])
+    assert config._resolve_in_process([]) is None
+
+
+@pytest.mark.parametrize(
+    "scalar, value",
+    [
+        ("0440", 0o440),
+        ("-0440", -0o440),
+        ("0o17", 0o17),
+        ("0x1F", 0x1F),
+        ("0b101", 0b101),
+        ("1_000", 1000),
+        ("+5", 5),
+        ("09", 9.0),
+        ("1e3", 1000.0),
+        (".5", 0.5),
+        ("22:22", "22:22"),
+        ("1.2.3", "1.2.3"),
+        ("yes", "yes"),
+        ("on", "on"),
+        ("TRUE", True),
+        ("'0440'", "0440"),
+    ],
+)
+def test_go_yaml_scalars(scalar, value):
+    loaded = yaml.load(f"key: {scalar}", Loader=_ComposeLoader)["key"]
+    assert loaded == value and type(loaded) is type(value)
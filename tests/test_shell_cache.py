@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: MIT
+"""Detecting and caching the login shell that ``atk dev --attach`` executes."""
+
+# Imports from autonomy_toolkit
+from autonomy_toolkit.utils.atk_config import ATKConfig
+from autonomy_toolkit.containers.docker_client import DockerClient
+from autonomy_toolkit.containers.shell_cache import (
+    FALLBACK_SHELL_CMD,
+    MAX_CACHED_SHELLS,
+    ShellCache,
+    get_shell_override,
+)
+
+# External imports
+import pytest
+
+
+class _FakeDocker:
+    def __init__(self, image_id="sha256:1", shell="/bin/zsh"):
+        self.image_id = image_id
+        self.shell = shell
+        self.commands = []
+
+    def __call__(self, *args, **kwargs):
+        self.commands.append(args)
+        if args[1:3] == ("container", "inspect"):
+            return f"{self.image_id}\n" if self.image_id else "", ""
+        if "exec" in args:
+            return f"{self.shell}\n", ""
+        raise AssertionError(f"Unexpected command {args}")
+
+    @property
+    def compose_commands(self):
+        return [c for c in self.commands if c[1] == "compose"]
+
+
+@pytest.fixture
+def docker(tmp_path, monkeypatch):
+    (tmp_path / "atk.yml").write_text("services: {}\n")
+    config = ATKConfig(tmp_path / "atk.yml", ["dev"])
+    config.config = {"name": "demo", "services": {"dev": {"image": "ubuntu"}}}
+    client = DockerClient(config)
+    fake = _FakeDocker()
+    monkeypatch.setattr(client, "_run_cmd", fake)
+    fake.client = client
+    return fake
+
+
+def test_miss_detects_and_caches(docker):
+    assert docker.client.get_shell("dev") == ["/bin/zsh"]
+    assert docker.commands[0][-1] == "demo-dev-1"
+    assert len(docker.compose_commands) == 1
+    assert ShellCache().get("sha256:1") == "/bin/zsh"
+
+
+def test_hit_doesnt_run_compose(docker):
+    ShellCache().set("sha256:1", "", "/bin/fish")
+    assert docker.client.get_shell("dev") == ["/bin/fish"]
+    assert docker.compose_commands == []
+    assert len(docker.commands) == 1
+
+
+def test_rebuilt_image_is_detected_again(docker):
+    assert docker.client.get_shell("dev") == ["/bin/zsh"]
+    docker.image_id, docker.shell = "sha256:2", "/bin/bash"
+    assert docker.client.get_shell("dev") == ["/bin/bash"]
+    assert ShellCache().get("sha256:1") == "/bin/zsh"
+
+
+def test_user_is_part_of_the_key(docker):
+    ShellCache().set("sha256:1", "", "/bin/fish")
+    docker.client.config.config["services"]["dev"]["user"] = "robot"
+    assert docker.client.get_shell("dev") == ["/bin/zsh"]
+    assert ShellCache().get("sha256:1", "robot") == "/bin/zsh"
+
+
+@pytest.mark.parametrize(
+    "image_id, shell", [("", "/bin/zsh"), ("sha256:1", "/usr/sbin/nologin")]
+)
+def test_fallback(docker, image_id, shell):
+    docker.image_id, docker.shell = image_id, shell
+    assert docker.client.get_shell("dev") == FALLBACK_SHELL_CMD
+    assert ShellCache().get("sha256:1") is None
+
+
+def test_container_name(docker, monkeypatch):
+    monkeypatch.setenv("ROBOT", "art")
+    docker.client.config.config["services"]["dev"]["container_name"] = "${ROBOT}-dev"
+    docker.client.get_shell("dev")
+    assert docker.commands[0][-1] == "art-dev"
+
+
+def test_override(docker):
+    config = docker.client.config.config
+    config["x-atk-shell"] = "/bin/bash -l"
+    assert get_shell_override(config, "dev") == ["/bin/bash", "-l"]
+    config["services"]["dev"]["x-atk-shell"] = ["/bin/zsh"]
+    assert docker.client.get_shell("dev") == ["/bin/zsh"]
+    assert docker.commands == []
+
+
+def test_cache_keeps_the_newest_entries(tmp_path):
+    cache = ShellCache(tmp_path / "shells.json")
+    for i in range(MAX_CACHED_SHELLS + 1):
+        cache.set(f"sha256:{i}", "", "/bin/sh")
+    cache = ShellCache(tmp_path / "shells.json")
+    assert cache.get("sha256:0") is None
+    assert cache.get(f"sha256:{MAX_CACHED_SHELLS}") == "/bin/sh"
+
+
+def test_corrupt_cache_is_empty(tmp_path):
+    (tmp_path / "shells.json").write_text("{")
+    assert ShellCache(tmp_path / "shells.json").get("sha256:1") is None